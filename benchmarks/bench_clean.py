@@ -0,0 +1,110 @@
+'''
+Benchmarks for cleaning data with bipartitepandas. Benchmarks follow the airspeed velocity (asv) conventions: `time_*` methods are timed, `peakmem_*` methods record peak memory, and `track_*` methods record the size of the cleaned data, so changes in the selected connected set are caught along with changes in speed. Run all benchmarks on the current environment with
+
+    make benchmark
+
+which installs bipartitepandas in development mode and calls `asv run --python=same`. Run only the connectedness benchmarks with
+
+    asv run --python=same --bench Connectedness
+'''
+import numpy as np
+import bipartitepandas as bpd
+
+# Connectedness measures
+connectedness_options = [None, 'connected', 'strongly_connected', 'leave_out_observation', 'leave_out_spell', 'leave_out_match', 'leave_out_worker', 'leave_out_firm', 'strongly_leave_out_observation', 'strongly_leave_out_spell', 'strongly_leave_out_match', 'strongly_leave_out_worker']
+# Component size variables (without the 'length' aliases)
+component_size_variable_options = ['len', 'firms', 'workers', 'stayers', 'movers', 'firms_plus_workers', 'firms_plus_stayers', 'firms_plus_movers', 'len_stayers', 'len_movers', 'stays', 'moves']
+
+# Cache simulated data, since it is shared across benchmarks
+_sim_cache = {}
+
+def _simulate(n_workers, p_move, seed=1234):
+    '''
+    Simulate bipartite data, reusing data that was already simulated.
+
+    Arguments:
+        n_workers (int): number of workers
+        p_move (float): probability a worker moves firms in any period
+        seed (int): seed for simulation
+
+    Returns:
+        (BipartiteLong): simulated data
+    '''
+    key = (n_workers, p_move, seed)
+    if key not in _sim_cache:
+        sim_params = bpd.sim_params({'n_workers': n_workers, 'firm_size': 10, 'p_move': p_move})
+        sim_data = bpd.SimBipartite(sim_params).simulate(rng=np.random.default_rng(seed))
+        _sim_cache[key] = bpd.BipartiteDataFrame(i=sim_data['i'], j=sim_data['j'], y=sim_data['y'], t=sim_data['t'], log=False)
+    return _sim_cache[key]
+
+def _clean_params(connectedness, component_size_variable='firms', collapse=False):
+    '''
+    Construct parameters for cleaning.
+
+    Arguments:
+        connectedness (str or None): connectedness measure
+        component_size_variable (str): how to determine largest connected component
+        collapse (bool): value for 'collapse_at_connectedness_measure'
+
+    Returns:
+        (ParamsDict): parameters for cleaning
+    '''
+    return bpd.clean_params(
+        {
+            'connectedness': connectedness,
+            'component_size_variable': component_size_variable,
+            'collapse_at_connectedness_measure': collapse,
+            'copy': True,
+            'verbose': False
+        }
+    )
+
+class Connectedness:
+    '''
+    Time cleaning for every connectedness measure, for several data sizes and mobility rates.
+    '''
+    params = (
+        connectedness_options,
+        [False, True],
+        [1000, 10000, 100000],
+        [0.05, 0.2, 0.5]
+    )
+    param_names = ['connectedness', 'collapse_at_connectedness_measure', 'n_workers', 'p_move']
+    timeout = 600
+
+    def setup(self, connectedness, collapse, n_workers, p_move):
+        self.bdf = _simulate(n_workers, p_move)
+        self.clean_params = _clean_params(connectedness, collapse=collapse)
+
+    def time_clean(self, connectedness, collapse, n_workers, p_move):
+        self.bdf.clean(self.clean_params)
+
+    def peakmem_clean(self, connectedness, collapse, n_workers, p_move):
+        self.bdf.clean(self.clean_params)
+
+    def track_n_firms(self, connectedness, collapse, n_workers, p_move):
+        return self.bdf.clean(self.clean_params).n_firms()
+
+    track_n_firms.unit = 'firms'
+
+class ComponentSizeVariable:
+    '''
+    Time cleaning for every combination of connectedness measure and component size variable.
+    '''
+    params = (
+        connectedness_options[1:],
+        component_size_variable_options,
+        [False, True]
+    )
+    param_names = ['connectedness', 'component_size_variable', 'collapse_at_connectedness_measure']
+    timeout = 600
+
+    def setup(self, connectedness, component_size_variable, collapse):
+        self.bdf = _simulate(10000, 0.05)
+        self.clean_params = _clean_params(connectedness, component_size_variable=component_size_variable, collapse=collapse)
+
+    def time_clean(self, connectedness, component_size_variable, collapse):
+        self.bdf.clean(self.clean_params)
+
+    def peakmem_clean(self, connectedness, component_size_variable, collapse):
+        self.bdf.clean(self.clean_params)
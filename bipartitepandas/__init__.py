@@ -7,6 +7,10 @@ from .bipartitelongbase import BipartiteLongBase
 from .bipartitelong import BipartiteLong
 from .bipartitelongcollapsed import BipartiteLongCollapsed
 from .bipartiteeventstudybase import BipartiteEventStudyBase
+from .crosssection import CrossSection
+from .lazyrestriction import LazyRestriction
+from .clustermeasures import ClusterMeasures
+from .clustergrid import ClusterGrid
 from .bipartiteeventstudy import BipartiteEventStudy
 from .bipartiteeventstudycollapsed import BipartiteEventStudyCollapsed
 from .bipartiteextendedeventstudybase import BipartiteExtendedEventStudyBase
@@ -15,8 +15,16 @@ from igraph import Graph
 from sklearn.metrics import silhouette_samples
 import warnings
 from functools import wraps
+from multiprocessing import Pool
 import bipartitepandas as bpd
 from bipartitepandas.util import update_dict, to_list
+from bipartitepandas.clustergrid import _init_worker, _fit_config, _fit_config_worker
+
+# NOTE: multiprocessing isn't compatible with lambda functions
+def _gteq1(a):
+    return a >= 1
+def _gteq2(a):
+    return a >= 2
 
 def _recollapse_loop(force=False):
     '''
@@ -77,6 +85,10 @@ clean_params = ParamsDict({
         '''
             (default=False) Applies only if 'drop_returns' is set to False. If True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer).
         ''', None),
+    'leave_out_worker_block_cut_tree': (True, 'type', bool,
+        '''
+            (default=True) If True, compute the largest leave-one-worker-out connected set in one pass over the block-cut tree of the worker-firm graph; if False, use the recursive method (which drops articulation workers and recomputes connected components until none remain). Applies only if 'connectedness' is set to 'leave_out_worker'.
+        ''', None),
     'is_sorted': (False, 'type', bool,
         '''
             (default=False) If False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
@@ -100,7 +112,7 @@ cluster_params = ParamsDict({
         '''
             (default=bpd.measures.CDFs()) How to compute measures for clustering. Options can be seen in bipartitepandas.measures.
         ''', None),
-    'grouping': (bpd.grouping.KMeans(), 'type', (bpd.grouping.KMeans, bpd.grouping.Quantiles),
+    'grouping': (bpd.grouping.KMeans(), 'type', (bpd.grouping.KMeans, bpd.grouping.MiniBatchKMeans, bpd.grouping.Quantiles),
         '''
             (default=bpd.grouping.KMeans()) How to group firms based on measures. Options can be seen in bipartitepandas.grouping.
         ''', None),
@@ -116,6 +128,14 @@ cluster_params = ParamsDict({
         '''
             (default=False) If True, return silhouette score for each firm (only set to True if grouping using KMeans).
         ''', None),
+    'silhouette_sample_size': (None, 'type_constrained_none', (int, _gteq2),
+        '''
+            (default=None) If None, compute exact silhouette scores (this requires computing distances between all pairs of firms); if int, estimate silhouette scores using a sample of at most this many firms from each cluster (at least 2 firms must be sampled, so that each sampled firm has another sampled firm in its cluster), and also return the standard error of each firm's estimated silhouette score. Used only if silhouette=True.
+        ''', '>= 2'),
+    'silhouette_chunk_size': (10000, 'type_constrained', (int, _gteq1),
+        '''
+            (default=10000) When estimating silhouette scores using a sample of firms, compute distances for this many firms at a time (memory use is bounded by this times the number of sampled firms). Used only if silhouette=True and silhouette_sample_size is not None.
+        ''', '>= 1'),
     'weighted': (True, 'type', bool,
         '''
             (default=True) If True, weight firm clusters by firm size (if a weight column is included, firm weight is computed using this column; otherwise, each observation is given weight 1).
@@ -138,6 +158,100 @@ cluster_params = ParamsDict({
         ''', None)
 })
 
+def _component_size(cc_table, component_size_variable='firms'):
+    '''
+    Extract the size of each component from a component table.
+
+    Arguments:
+        cc_table (Pandas DataFrame): component table, as generated by BipartiteBase.component_table()
+        component_size_variable (str): how to determine component size. Options are 'len'/'length' (length of frames), 'firms' (number of unique firms), 'workers' (number of unique workers), 'stayers' (number of unique stayers), 'movers' (number of unique movers), 'firms_plus_workers' (number of unique firms + number of unique workers), 'firms_plus_stayers' (number of unique firms + number of unique stayers), 'firms_plus_movers' (number of unique firms + number of unique movers), 'len_stayers'/'length_stayers' (number of stayer observations), 'len_movers'/'length_movers' (number of mover observations), 'stays' (number of stay observations), and 'moves' (number of move observations).
+
+    Returns:
+        (NumPy Array): size of each component
+    '''
+    size_dict = {
+        'len': lambda a: a.loc[:, 'len'],
+        'length': lambda a: a.loc[:, 'len'],
+        'firms': lambda a: a.loc[:, 'firms'],
+        'workers': lambda a: a.loc[:, 'workers'],
+        'stayers': lambda a: a.loc[:, 'stayers'],
+        'movers': lambda a: a.loc[:, 'movers'],
+        'firms_plus_workers': lambda a: a.loc[:, 'firms'] + a.loc[:, 'workers'],
+        'firms_plus_stayers': lambda a: a.loc[:, 'firms'] + a.loc[:, 'stayers'],
+        'firms_plus_movers': lambda a: a.loc[:, 'firms'] + a.loc[:, 'movers'],
+        'len_stayers': lambda a: a.loc[:, 'len_stayers'],
+        'length_stayers': lambda a: a.loc[:, 'len_stayers'],
+        'len_movers': lambda a: a.loc[:, 'len_movers'],
+        'length_movers': lambda a: a.loc[:, 'len_movers'],
+        'stays': lambda a: a.loc[:, 'stays'],
+        'moves': lambda a: a.loc[:, 'moves']
+    }
+    if component_size_variable not in size_dict.keys():
+        raise NotImplementedError(f'Component size variable {component_size_variable!r} is invalid: it must be one of {list(size_dict.keys())!r}.')
+
+    return size_dict[component_size_variable](cc_table).to_numpy()
+
+def _component_table(i_col, j_col, firm_cc, recollapse=False):
+    '''
+    Compute the size of every component of firms in one grouped pass, where sizes are computed as if the data were restricted to each component.
+
+    Arguments:
+        i_col (NumPy Array): worker ids, sorted by i (and t, if included)
+        j_col (NumPy Array): firm ids
+        firm_cc (NumPy Array): component label for each firm id
+        recollapse (bool): if True, data is collapsed at the spell level, so consecutive spells at the same firm are recollapsed when computing sizes
+
+    Returns:
+        (Pandas DataFrame): table with one row per component
+    '''
+    n_cc = firm_cc.max() + 1
+    obs_cc = firm_cc[j_col]
+
+    # Group observations by component, keeping each worker's observations in order (this is the data that would remain if the frame were restricted to a single component)
+    cc_order = np.argsort(obs_cc, kind='stable')
+    i_col = i_col[cc_order]
+    j_col = j_col[cc_order]
+    cc_col = obs_cc[cc_order]
+    same_prev = (i_col == bpd.util.fast_shift(i_col, 1, fill_value=-2)) & (cc_col == bpd.util.fast_shift(cc_col, 1, fill_value=-2))
+    if recollapse:
+        # Recollapse consecutive spells at the same firm
+        new_spell = ~(same_prev & (j_col == bpd.util.fast_shift(j_col, 1, fill_value=-2)))
+        i_col = i_col[new_spell]
+        j_col = j_col[new_spell]
+        cc_col = cc_col[new_spell]
+        same_prev = same_prev[new_spell]
+    same_next = bpd.util.fast_shift(same_prev, -1, fill_value=False)
+
+    # Recompute 'm'
+    m = (same_prev & (j_col != bpd.util.fast_shift(j_col, 1, fill_value=-2))).astype(int, copy=False) + (same_next & (j_col != bpd.util.fast_shift(j_col, -1, fill_value=-2))).astype(int, copy=False)
+    stays = (m == 0)
+
+    # Worker-level information (within each component)
+    worker_id = np.cumsum(~same_prev) - 1
+    worker_cc = cc_col[~same_prev]
+    worker_any_stay = (np.bincount(worker_id, weights=stays) > 0)
+    worker_m = (np.bincount(worker_id, weights=~stays) > 0)
+
+    # Firm-level information
+    firms = np.unique(j_col)
+
+    cc_table = pd.DataFrame(
+        {
+            'firms': np.bincount(firm_cc[firms], minlength=n_cc),
+            'workers': np.bincount(worker_cc, minlength=n_cc),
+            'stayers': np.bincount(worker_cc[worker_any_stay], minlength=n_cc),
+            'movers': np.bincount(worker_cc[worker_m], minlength=n_cc),
+            'len': np.bincount(cc_col, minlength=n_cc),
+            'len_stayers': np.bincount(cc_col[~worker_m[worker_id]], minlength=n_cc),
+            'len_movers': np.bincount(cc_col[worker_m[worker_id]], minlength=n_cc),
+            'stays': np.bincount(cc_col[stays], minlength=n_cc),
+            'moves': np.bincount(cc_col[~stays], minlength=n_cc)
+        }
+    )
+    cc_table.index.name = 'cc'
+
+    return cc_table
+
 class BipartiteBase(DataFrame):
     '''
     Base class for BipartitePandas, where BipartitePandas gives a bipartite network of firms and workers. Contains generalized methods. Inherits from DataFrame.
@@ -1177,7 +1291,45 @@ class BipartiteBase(DataFrame):
                 self.log(error_msg, level='info')
                 raise ValueError(error_msg)
 
-    def _connected_components(self, connectedness='connected', component_size_variable='firms', drop_single_stayers=False, drop_returns_to_stays=False, is_sorted=False, copy=True):
+    def component_table(self, connectedness='connected', add_labels=False, is_sorted=False, copy=True):
+        '''
+        Compute the size of every component of firms connected by movers. Sizes are computed for the subset of the data that would be kept if the component were selected (i.e. as if the data were restricted to the firms in the component, with 'm' recomputed and collapsed data recollapsed). Event study data is measured on its long format representation.
+
+        Arguments:
+            connectedness (str): if 'connected', compute connected components of firms; if 'strongly_connected', compute strongly connected components of firms
+            add_labels (bool): if True, also return the dataframe with the column 'cc' (split into 'cc1' and 'cc2' for event study format) labeling the component of each firm
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (Pandas DataFrame or tuple of (Pandas DataFrame, BipartiteBase)): table with one row per component (indexed by component label) giving the number of firms, workers, stayers, movers, observations ('len'), observations of stayers ('len_stayers'), observations of movers ('len_movers'), stay observations ('stays'), and move observations ('moves'); if add_labels=True, also return dataframe with component labels
+        '''
+        if connectedness not in ['connected', 'strongly_connected']:
+            raise NotImplementedError(f"Connectedness measure {connectedness!r} is invalid for component tables: it must be one of 'connected' or 'strongly_connected'.")
+
+        # Sort and copy
+        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+
+        # Label firms by connected component
+        G, max_j = frame._construct_graph(connectedness, is_sorted=True, copy=False)
+        firm_cc = frame._firm_components(G, max_j, connectedness)
+
+        # Compute the size of every component
+        cc_table = frame._component_table(firm_cc, is_sorted=True)
+
+        if add_labels:
+            # Label the component of each firm
+            cc_data = [firm_cc[frame.loc[:, subcol].to_numpy()] for subcol in to_list(frame.col_reference_dict['j'])]
+            if frame._col_included('cc'):
+                # If labels already included, drop them
+                frame = frame.drop('cc', axis=1, inplace=False)
+            frame = frame.add_column('cc', cc_data, dtype='int', how_collapse='first', long_es_split=True, copy=False)
+
+            return cc_table, frame
+
+        return cc_table
+
+    def _connected_components(self, connectedness='connected', component_size_variable='firms', drop_single_stayers=False, drop_returns_to_stays=False, leave_out_worker_block_cut_tree=True, is_sorted=False, copy=True):
         '''
         Update data to include only the largest component connected by movers.
 
@@ -1186,6 +1338,7 @@ class BipartiteBase(DataFrame):
             component_size_variable (str): how to determine largest connected component. Options are 'len'/'length' (length of frames), 'firms' (number of unique firms), 'workers' (number of unique workers), 'stayers' (number of unique stayers), 'movers' (number of unique movers), 'firms_plus_workers' (number of unique firms + number of unique workers), 'firms_plus_stayers' (number of unique firms + number of unique stayers), 'firms_plus_movers' (number of unique firms + number of unique movers), 'len_stayers'/'length_stayers' (number of stayer observations), 'len_movers'/'length_movers' (number of mover observations), 'stays' (number of stay observations), and 'moves' (number of move observations).
             drop_single_stayers (bool): if True, drop stayers who have <= 1 observation weight (check number of observations if data is unweighted)
             drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            leave_out_worker_block_cut_tree (bool): if True, compute the largest leave-one-worker-out connected set in one pass over the block-cut tree of the worker-firm graph; if False, use the recursive method. Applies only if connectedness='leave_out_worker'.
             is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe is not guaranteed to be sorted if original dataframe is not sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
             copy (bool): if False, avoid copy
 
@@ -1210,31 +1363,19 @@ class BipartiteBase(DataFrame):
 
         # Update data
         # Find largest connected set of firms
-        # First, create graph
-        G, max_j = frame._construct_graph(connectedness, is_sorted=is_sorted, copy=False)
+        # First, create graph (the block-cut tree method for leave-one-worker-out connectedness constructs its own graph)
+        block_cut_tree = ((connectedness == 'leave_out_worker') and leave_out_worker_block_cut_tree)
+        if not block_cut_tree:
+            G, max_j = frame._construct_graph(connectedness, is_sorted=is_sorted, copy=False)
         if connectedness in ['connected', 'strongly_connected']:
-            # Compute all connected components of firms (each entry is a connected component)
-            components_mode_dict = {
-                'connected': 'weak',
-                'strongly_connected': 'strong'
-            }
-            cc_list = sorted(G.components(mode=components_mode_dict[connectedness]), reverse=True, key=len)
-            # Iterate over connected components to find the largest
-            largest_cc = cc_list[0]
-            frame_largest_cc = frame.keep_ids('j', largest_cc, is_sorted=is_sorted, copy=False)
-            if component_size_variable != 'firms':
-                # If component_size_variable is firms, no need to iterate
-                for cc in cc_list[1:]:
-                    frame_cc = frame.keep_ids('j', cc, is_sorted=is_sorted, copy=False)
-                    replace = bpd.util.compare_frames(frame_largest_cc, frame_cc, size_variable=component_size_variable, operator='lt', save_to_frame1=True, is_sorted=is_sorted)
-                    if replace:
-                        frame_largest_cc = frame_cc
-            frame = frame_largest_cc
-            try:
-                # Remove comp_size attribute
-                del frame.comp_size
-            except AttributeError:
-                pass
+            # Label firms by connected component
+            firm_cc = frame._firm_components(G, max_j, connectedness)
+            # Compute the size of every component in one pass
+            cc_table = frame._component_table(firm_cc, is_sorted=is_sorted)
+            # Find the largest component (ties go to the component with more firms, then the component found first)
+            cc_table = cc_table.sort_values('firms', ascending=False, kind='stable')
+            largest_cc = cc_table.index[np.argmax(_component_size(cc_table, component_size_variable))]
+            frame = frame.keep_ids('j', np.where(firm_cc == largest_cc)[0], is_sorted=is_sorted, copy=False)
         elif connectedness in ['leave_out_observation', 'leave_out_spell', 'leave_out_match', 'strongly_leave_out_observation', 'strongly_leave_out_spell', 'strongly_leave_out_match']:
             # Extract information about group and strong/weak connectedness
             strongly_connected, leave_out_group = (connectedness.split('_')[0] == 'strongly'), connectedness.split('_')[-1]
@@ -1242,6 +1383,9 @@ class BipartiteBase(DataFrame):
             cc_list = G.components(mode={False: 'weak', True: 'strong'}[strongly_connected])
             # Keep largest leave-one-(observation/spell/match)-out component
             frame = frame._leave_out_observation_spell_match(cc_list=cc_list, max_j=max_j, leave_out_group=leave_out_group, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, is_sorted=is_sorted, copy=False)
+        elif block_cut_tree:
+            # Keep largest leave-one-worker-out set of firms, using the block-cut tree
+            frame = frame._leave_out_worker_block_cut_tree(component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, is_sorted=is_sorted, copy=False)
         elif connectedness in ['leave_out_worker', 'strongly_leave_out_worker']:
             # Extract information about strong/weak connectedness
             strongly_connected = (connectedness.split('_')[0] == 'strongly')
@@ -1293,6 +1437,44 @@ class BipartiteBase(DataFrame):
 
         return frame
 
+    def _firm_components(self, G, max_j, connectedness='connected'):
+        '''
+        Label each firm by its (strongly) connected component.
+
+        Arguments:
+            G (igraph Graph): graph linking firms by movers
+            max_j (int): maximum firm id in graph
+            connectedness (str): if 'connected', label connected components; if 'strongly_connected', label strongly connected components
+
+        Returns:
+            (NumPy Array): component label for each firm id
+        '''
+        firm_cc = np.array(G.components(mode={'connected': 'weak', 'strongly_connected': 'strong'}[connectedness]).membership, dtype=int)
+        # Firms without moves that have ids above max_j are not in the graph, so each is its own component
+        n_firms_total = self.loc[:, to_list(self.col_reference_dict['j'])].to_numpy().max() + 1
+        if n_firms_total > len(firm_cc):
+            firm_cc = np.concatenate([firm_cc, firm_cc.max() + 1 + np.arange(n_firms_total - len(firm_cc))])
+
+        return firm_cc
+
+    def _component_table(self, firm_cc, is_sorted=False):
+        '''
+        Compute the size of every component of firms in one grouped pass.
+
+        Arguments:
+            firm_cc (NumPy Array): component label for each firm id
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Set is_sorted to True if dataframe is already sorted.
+
+        Returns:
+            (Pandas DataFrame): table with one row per component
+        '''
+        if isinstance(self, bpd.BipartiteLongBase):
+            frame = self.sort_rows(is_sorted=is_sorted, copy=not is_sorted)
+        else:
+            # Event study data is measured on its long format representation
+            frame = self.to_long(is_sorted=is_sorted, copy=True)
+        return _component_table(frame.loc[:, 'i'].to_numpy(), frame.loc[:, 'j'].to_numpy(), firm_cc, recollapse=isinstance(frame, bpd.BipartiteLongCollapsed))
+
     def _construct_graph(self, connectedness='connected', is_sorted=False, copy=True):
         '''
         Construct igraph graph linking firms by movers.
@@ -1438,30 +1620,45 @@ class BipartiteBase(DataFrame):
 
         return frame.min_workers_firms(threshold, is_sorted=is_sorted, copy=copy)
 
-    def cluster(self, params=None, rng=None):
+    def compute_cluster_measures(self, measures=None, stayers_movers=None, t=None, weighted=True, is_sorted=False):
         '''
-        Cluster data and assign a new column giving the cluster for each firm.
+        Compute firm-level measures for clustering. The dataframe is not altered. The result can be passed to .cluster() or .cluster_grid() to cluster without recomputing measures, so that re-grouping (e.g. with a different number of clusters) only requires recomputing the groups.
 
         Arguments:
-            params (ParamsDict or None): dictionary of parameters for clustering. Run bpd.cluster_params().describe_all() for descriptions of all valid parameters. None is equivalent to bpd.cluster_params().
-            rng (np.random.Generator): NumPy random number generator; None is equivalent to np.random.default_rng(None)
+            measures (measure or list of measures or None): how to compute measures for clustering (options can be seen in bipartitepandas.measures); None is equivalent to bpd.measures.CDFs()
+            stayers_movers (str or None): if None, clusters on entire dataset; if 'stayers', clusters on only stayers; if 'movers', clusters on only movers
+            t (int or list of int or None): if None, clusters on entire dataset; if int, gives period in data to consider (only valid for non-collapsed data); if list of int, gives periods in data to consider (only valid for non-collapsed data)
+            weighted (bool): if True, weight firm clusters by firm size (if a weight column is included, firm weight is computed using this column; otherwise, each observation has weight 1)
+            is_sorted (bool): for event study format; if False, dataframe will be sorted by i (and t, if included). Set is_sorted to True if dataframe is already sorted.
 
         Returns:
-            (BipartiteBase or tuple of (BipartiteBase, NumPy Array)): if silhouette=False, return dataframe with clusters; if silhouette=True, return tuple where first element is dataframe with clusters and second element is NumPy Array of each firm's silhouette score
+            (ClusterMeasures): firm-level measures, firm weights, and firm ids
         '''
-        if params is None:
-            params = bpd.cluster_params()
-        if rng is None:
-            rng = np.random.default_rng(None)
+        if measures is None:
+            measures = bpd.measures.CDFs()
 
-        self.log('beginning clustering', level='info')
-        if params['copy']:
-            frame = self.copy()
-        else:
+        params = bpd.cluster_params({'measures': measures, 'stayers_movers': stayers_movers, 't': t, 'weighted': weighted, 'is_sorted': is_sorted})
+        if is_sorted:
             frame = self
+        else:
+            # Preparing data can sort the dataframe, so compute measures on a copy
+            frame = self.copy()
+        computed_measures, weights, jids = frame._compute_cluster_measures(params)
 
+        return bpd.ClusterMeasures(computed_measures, weights, jids, stayers_movers=stayers_movers, t=t, weighted=weighted)
+
+    def _compute_cluster_measures(self, params):
+        '''
+        Prepare data for clustering and compute firm-level measures. Temporary columns created while preparing the data are dropped.
+
+        Arguments:
+            params (ParamsDict): dictionary of parameters for clustering. Run bpd.cluster_params().describe_all() for descriptions of all valid parameters.
+
+        Returns:
+            (tuple): (NumPy Array of measures, with one row per firm; NumPy Array of firm weights, or None if weighted=False; NumPy Array of firm ids corresponding to the rows of the measures)
+        '''
         # Prepare data for clustering
-        cluster_data, weights, jids = frame._prep_cluster(stayers_movers=params['stayers_movers'], t=params['t'], weighted=params['weighted'], is_sorted=params['is_sorted'], copy=False)
+        cluster_data, weights, jids = self._prep_cluster(stayers_movers=params['stayers_movers'], t=params['t'], weighted=params['weighted'], is_sorted=params['is_sorted'], copy=False)
 
         # Compute measures
         for i, measure in enumerate(to_list(params['measures'])):
@@ -1470,32 +1667,40 @@ class BipartiteBase(DataFrame):
             else:
                 # For computing both cdfs and moments
                 computed_measures = np.concatenate([computed_measures, measure._compute_measure(cluster_data, jids)], axis=1)
-        frame.log('firm moments computed', level='info')
+        self.log('firm moments computed', level='info')
 
-        # Can't group using quantiles if more than 1 column
-        if isinstance(params['grouping'], bpd.grouping.Quantiles) and (computed_measures.shape[1] > 1):
-            raise NotImplementedError('Cannot cluster using quantiles if multiple measures computed.')
+        # Drop columns (because prepared data is not always a copy, must drop from self)
+        self._drop_cluster_cols()
 
-        # Compute firm groups
-        frame.log('computing firm groups', level='info')
-        clusters = params['grouping']._compute_groups(computed_measures, weights, rng)
-        frame.log('firm groups computed', level='info')
+        return computed_measures, weights, jids
 
-        if params['silhouette']:
-            # Compute silhouette scores
-            silhouette_scores = silhouette_samples(computed_measures, clusters)
+    def _drop_cluster_cols(self):
+        '''
+        Drop temporary columns created while preparing data for clustering. Drops in place.
+        '''
+        for col in ['row_weights', 'one']:
+            if col in self.columns:
+                self.drop(col, axis=1, inplace=True)
+
+    def _attach_clusters(self, jids, clusters, dropna=False, clean_params=None):
+        '''
+        Assign a new column giving the cluster for each firm, replacing existing clusters. Alters the dataframe in place, unless rows are dropped.
+
+        Arguments:
+            jids (NumPy Array): firm ids
+            clusters (NumPy Array): cluster for each firm in `jids`
+            dropna (bool): if True, drop observations where firms aren't clustered, then clean the data
+            clean_params (ParamsDict or None): dictionary of parameters for cleaning, used if dropna=True; None is equivalent to bpd.clean_params({'connectedness': frame.connectedness})
+
+        Returns:
+            (BipartiteBase): dataframe with clusters
+        '''
+        frame = self
 
         # Link firms to clusters
         clusters_dict = dict(_fast_zip([jids, clusters]))
         frame.log('dictionary linking firms to clusters generated', level='info')
 
-        # Drop columns (because prepared data is not always a copy, must drop from self)
-        for col in ['row_weights', 'one']:
-            if col in self.columns:
-                self.drop(col, axis=1, inplace=True)
-            if col in frame.columns:
-                frame.drop(col, axis=1, inplace=True)
-
         # Drop existing clusters
         if frame._col_included('g'):
             frame.drop('g', axis=1, inplace=True)
@@ -1515,21 +1720,166 @@ class BipartiteBase(DataFrame):
         # Sort columns
         frame = frame.sort_cols(copy=False)
 
-        if params['dropna']:
+        if dropna:
             # Drop firms that don't get clustered
             frame.dropna(inplace=True)
             frame.reset_index(drop=True, inplace=True)
             frame.loc[:, frame.col_reference_dict['g']] = frame.loc[:, frame.col_reference_dict['g']].astype(int, copy=False)
             # Clean data
-            if params['clean_params'] is None:
+            if clean_params is None:
                 frame = frame.clean(bpd.clean_params({'connectedness': frame.connectedness}))
             else:
-                frame = frame.clean(params['clean_params'])
+                frame = frame.clean(clean_params)
 
         frame.columns_contig['g'] = True
 
+        return frame
+
+    def cluster(self, params=None, rng=None, cluster_measures=None):
+        '''
+        Cluster data and assign a new column giving the cluster for each firm.
+
+        Arguments:
+            params (ParamsDict or None): dictionary of parameters for clustering. Run bpd.cluster_params().describe_all() for descriptions of all valid parameters. None is equivalent to bpd.cluster_params().
+            rng (np.random.Generator): NumPy random number generator; None is equivalent to np.random.default_rng(None)
+            cluster_measures (ClusterMeasures or None): if None, compute measures; otherwise, use measures precomputed by .compute_cluster_measures() on this dataframe (in which case the parameters 'measures', 'stayers_movers', 't', 'weighted', and 'is_sorted' are ignored)
+
+        Returns:
+            (BipartiteBase or tuple of (BipartiteBase, NumPy Array) or tuple of (BipartiteBase, NumPy Array, NumPy Array)): if silhouette=False, return dataframe with clusters; if silhouette=True, return tuple where first element is dataframe with clusters and second element is NumPy Array of each firm's silhouette score, and if silhouette_sample_size is not None, third element is NumPy Array of the standard error of each firm's estimated silhouette score
+        '''
+        if params is None:
+            params = bpd.cluster_params()
+        if rng is None:
+            rng = np.random.default_rng(None)
+
+        self.log('beginning clustering', level='info')
+        if params['copy']:
+            frame = self.copy()
+        else:
+            frame = self
+
+        if cluster_measures is None:
+            # Compute measures
+            computed_measures, weights, jids = frame._compute_cluster_measures(params)
+            if frame is not self:
+                # Drop columns (because prepared data is not always a copy, must drop from self)
+                self._drop_cluster_cols()
+        else:
+            # Use precomputed measures
+            computed_measures, weights, jids = cluster_measures.measures, cluster_measures.weights, cluster_measures.jids
+
+        # Can't group using quantiles if more than 1 column
+        if isinstance(params['grouping'], bpd.grouping.Quantiles) and (computed_measures.shape[1] > 1):
+            raise NotImplementedError('Cannot cluster using quantiles if multiple measures computed.')
+
+        # Compute firm groups
+        frame.log('computing firm groups', level='info')
+        clusters = params['grouping']._compute_groups(computed_measures, weights, rng)
+        frame.log('firm groups computed', level='info')
+
+        if params['silhouette']:
+            # Compute silhouette scores
+            if params['silhouette_sample_size'] is None:
+                silhouette_scores = silhouette_samples(computed_measures, clusters)
+            else:
+                silhouette_scores, silhouette_se = bpd.util.sampled_silhouette_samples(computed_measures, clusters, sample_size=params['silhouette_sample_size'], chunk_size=params['silhouette_chunk_size'], rng=rng)
+
+        # Link firms to clusters
+        frame = frame._attach_clusters(jids, clusters, dropna=params['dropna'], clean_params=params['clean_params'])
+
         frame.log('clusters merged into data', level='info')
 
         if params['silhouette']:
+            if params['silhouette_sample_size'] is not None:
+                return (frame, silhouette_scores, silhouette_se)
             return (frame, silhouette_scores)
         return frame
+
+    def cluster_grid(self, ks=range(2, 11), n_init_seeds=1, n_jobs=1, params=None, rng=None, cluster_measures=None):
+        '''
+        Estimate KMeans for each combination of number of clusters and seed, computing firm measures only once. Configurations are estimated in parallel using a pool of `n_jobs` processes. Each configuration is seeded independently of the others and of `n_jobs`, so results don't depend on `n_jobs`. Clusters are not assigned to the dataframe; use .attach() on the returned ClusterGrid to assign the clusters from a particular configuration.
+
+        Arguments:
+            ks (list of int): numbers of clusters to consider
+            n_init_seeds (int or list of int): if int, number of seeds to consider for each number of clusters, where an independent seed is spawned from `rng` for each configuration; if list of int, seeds to consider for each number of clusters (each seed is used to initialize a np.random.SeedSequence, and `rng` is not used)
+            n_jobs (int): number of processes to use to estimate configurations; if 1, estimate configurations in the current process
+            params (ParamsDict or None): dictionary of parameters for clustering (grouping must use bpd.grouping.KMeans, whose parameters are used for every configuration, except 'n_clusters' is overwritten; if silhouette=True, the mean silhouette score is computed for each configuration, and otherwise the 'silhouette' column of the results is NaN; if silhouette_sample_size is not None, silhouette scores are estimated using a sample of firms, which is recommended for large data since exact silhouette scores require computing distances between all pairs of firms for every configuration). Run bpd.cluster_params().describe_all() for descriptions of all valid parameters. None is equivalent to bpd.cluster_params().
+            rng (np.random.Generator): NumPy random number generator; None is equivalent to np.random.default_rng(None)
+            cluster_measures (ClusterMeasures or None): if None, compute measures; otherwise, use measures precomputed by .compute_cluster_measures() on this dataframe (in which case the parameters 'measures', 'stayers_movers', 't', 'weighted', and 'is_sorted' are ignored)
+
+        Returns:
+            (ClusterGrid): grid of clusterings, with inertia (and mean silhouette score, if silhouette=True) for each configuration
+        '''
+        if params is None:
+            params = bpd.cluster_params()
+        if rng is None:
+            rng = np.random.default_rng(None)
+
+        if not isinstance(params['grouping'], bpd.grouping.KMeans):
+            raise NotImplementedError(f"Clustering grids require grouping using bpd.grouping.KMeans, but input specifies grouping using {type(params['grouping']).__name__!r}.")
+        ks = to_list(ks)
+        if len(ks) == 0:
+            raise ValueError('ks must include at least one number of clusters, but input specifies no numbers of clusters.')
+        for k in ks:
+            if (not isinstance(k, (int, np.integer))) or (k < 2):
+                raise ValueError(f'Each number of clusters in ks must be an integer that is at least 2, but input specifies {k!r}.')
+        if (not isinstance(n_jobs, (int, np.integer))) or (n_jobs < 1):
+            raise ValueError(f'n_jobs must be a positive integer, but input specifies {n_jobs!r}.')
+        if isinstance(n_init_seeds, (int, np.integer)):
+            if n_init_seeds < 1:
+                raise ValueError(f'n_init_seeds must be a positive integer or a list of seeds, but input specifies {n_init_seeds!r}.')
+            seed_ids = list(range(n_init_seeds))
+        else:
+            seed_ids = to_list(n_init_seeds)
+            if len(seed_ids) == 0:
+                raise ValueError('n_init_seeds must be a positive integer or a list of seeds, but input specifies an empty list.')
+
+        self.log('beginning clustering grid', level='info')
+
+        if cluster_measures is None:
+            if params['copy']:
+                # Preparing data can sort the dataframe, so compute measures on a copy
+                frame = self.copy()
+            else:
+                frame = self
+            # Compute measures (only once, for all configurations)
+            computed_measures, weights, jids = frame._compute_cluster_measures(params)
+        else:
+            # Use precomputed measures
+            computed_measures, weights, jids = cluster_measures.measures, cluster_measures.weights, cluster_measures.jids
+
+        # KMeans parameters ('n_clusters' is set for each configuration)
+        kwargs = params['grouping'].kwargs.copy()
+        if 'n_clusters' in kwargs.keys():
+            del kwargs['n_clusters']
+
+        ks = [k for k in ks for _ in seed_ids]
+        if isinstance(n_init_seeds, (int, np.integer)):
+            # Spawn an independent seed for each configuration
+            seeds = rng.bit_generator._seed_seq.spawn(len(ks))
+        else:
+            # Use the given seeds for each number of clusters (construct a new SeedSequence for each configuration, since seeds are spawned from it)
+            seeds = [np.random.SeedSequence(seed) for _ in range(len(ks) // len(seed_ids)) for seed in seed_ids]
+        args = [(k, seed, kwargs, params['silhouette'], params['silhouette_sample_size'], params['silhouette_chunk_size']) for k, seed in zip(ks, seeds)]
+
+        self.log(f'estimating {len(args)} configurations', level='info')
+        if n_jobs == 1:
+            configs = [_fit_config(computed_measures, weights, *config_args) for config_args in args]
+        else:
+            # NOTE: multiprocessing isn't compatible with lambda functions
+            with Pool(processes=n_jobs, initializer=_init_worker, initargs=(computed_measures, weights)) as pool:
+                configs = pool.starmap(_fit_config_worker, args)
+        self.log('configurations estimated', level='info')
+
+        results = pd.DataFrame(
+            {
+                'k': ks,
+                'seed': seed_ids * (len(ks) // len(seed_ids)),
+                'random_state': [config[1] for config in configs],
+                'inertia': [config[2] for config in configs],
+                'silhouette': [config[3] for config in configs]
+            }
+        )
+        labels = np.stack([config[0] for config in configs])
+
+        return bpd.ClusterGrid(self, params, jids, results, labels)
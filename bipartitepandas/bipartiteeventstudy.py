@@ -1,6 +1,8 @@
 '''
 Class for a bipartite network in event study format.
 '''
+import numpy as np
+import pandas as pd
 import bipartitepandas as bpd
 
 class BipartiteEventStudy(bpd.BipartiteEventStudyBase):
@@ -49,7 +51,7 @@ class BipartiteEventStudy(bpd.BipartiteEventStudyBase):
 
     def collapse(self, level='spell', is_sorted=False, copy=True):
         '''
-        Collapse event study data at the worker-firm spell level (so each spell for a particular worker at a particular firm becomes one observation).
+        Collapse event study data at the worker-firm spell level (so each spell for a particular worker at a particular firm becomes one observation). Data is collapsed directly from event study format, with the same aggregation as BipartiteLong.collapse(), so this gives the same result as calling .to_long().collapse().to_eventstudy(), without constructing the intermediate uncollapsed long format dataframe or sorting it. Spells are aggregated into a collapsed long format dataframe, which is then converted to collapsed event study format.
 
         Arguments:
             level (str): if 'spell', collapse at the worker-firm spell level; if 'match', collapse at the worker-firm match level ('spell' and 'match' will differ if a worker leaves then returns to a firm)
@@ -59,7 +61,132 @@ class BipartiteEventStudy(bpd.BipartiteEventStudyBase):
         Returns:
             (BipartiteEventStudyCollapsed): collapsed event study data generated by collapsing event study data at the worker-firm spell level
         '''
-        raise NotImplementedError('.collapse() is not implemented for event study format data. Please convert to long format with the method .to_long().')
+        if not self._col_included('t'):
+            raise NotImplementedError("Cannot collapse event study data without a time column. To bypass this, if you know your data is ordered by time but do not have time data, it is recommended to construct an artificial time column by calling .construct_artificial_time(copy=False).")
+
+        self.log(f'beginning collapse, level={level!r}', level='info')
+
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
+        self.log('data sorted by i (and t, if included)', level='info')
+
+        ## Find the long format observations ##
+        # Since data is sorted and clean, the long format observations are generated in sorted order
+        es_rows, stacked_rows = frame._get_long_rows(is_clean=True, is_sorted=True)
+
+        def long_col(subcol_1, subcol_2=None):
+            # Gather long format data from a pair of split subcolumns, or from a subcolumn that isn't split
+            if subcol_2 is None:
+                return frame.loc[:, subcol_1].array.take(es_rows)
+            return pd.concat([frame.loc[:, subcol_1], frame.loc[:, subcol_2]], ignore_index=True).array.take(stacked_rows)
+
+        # Generate group ids
+        i_col = np.asarray(long_col('i'))
+        j_col = np.asarray(long_col('j1', 'j2'))
+        if level == 'spell':
+            # Allow for i != i_prev to ensure that consecutive workers at the same firm get counted as different spells
+            new_spell = (i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2)) | (j_col != bpd.util.fast_shift(j_col, 1, fill_value=-2))
+            group_ids = np.cumsum(new_spell)
+            del new_spell
+        elif level == 'match':
+            group_ids = pd.DataFrame({'i': i_col, 'j': j_col}).groupby(['i', 'j'], sort=(not frame.no_returns)).ngroup().to_numpy()
+        else:
+            raise ValueError(f"`level` must be one of 'spell' or 'match', but input specifies invalid input {level!r}.")
+        del j_col
+
+        # Dictionary linking columns to their aggregated data
+        data_spell = {}
+
+        # Keep track of user-added columns
+        user_added_cols = {}
+
+        ## Correctly weight ##
+        # If weight column exists
+        weighted = frame._col_included('w')
+
+        # Spells are contiguous, but matches are only contiguous if workers don't return to firms
+        aggregator = bpd.util.GroupAggregator(group_ids, contiguous=((level == 'spell') or frame.no_returns), weights=(np.asarray(long_col('w1', 'w2')) if weighted else None))
+        del group_ids
+
+        ## Aggregate non-time columns ##
+        default_cols = frame.columns_req + frame.columns_opt
+        for col in frame._included_cols():
+            if (col in ['t', 'm']) or (frame.col_collapse_dict[col] is None) or (frame.col_long_es_dict[col] is None):
+                # If time, skip this column; if 'm', it is recomputed after collapsing; if None, drop this column
+                pass
+            else:
+                aggfunc = frame.col_collapse_dict[col]
+                subcols = bpd.util.to_list(frame.col_reference_dict[col])
+                if col == 'i':
+                    data_spell['i'] = aggregator.agg(i_col, aggfunc)
+                elif frame.col_long_es_dict[col]:
+                    # If column has been split
+                    if len(subcols) % 2 == 1:
+                        raise ValueError(f'{col!r} is listed as being split, but has an odd number of subcolumns. If this is a custom column, please make sure when adding it to the dataframe to specify long_es_split=False, to ensure it is not marked as being split, or long_es_split=None, to indicate the column should be dropped when converting between long and event study formats.')
+                    halfway = len(subcols) // 2
+                    long_subcols = []
+                    for k in range(halfway):
+                        # Get column number, e.g. j12 will give 12, then get rid of first number, e.g. j12 to j2
+                        long_subcol = col + subcols[k][len(col) + 1:]
+                        data_spell[long_subcol] = aggregator.agg(long_col(subcols[k], subcols[halfway + k]), aggfunc, weighted=True)
+                        long_subcols.append(long_subcol)
+                    if col not in default_cols:
+                        # User-added columns
+                        user_added_cols[col] = long_subcols
+                else:
+                    # If column has not been split
+                    for subcol in subcols:
+                        data_spell[subcol] = aggregator.agg(long_col(subcol), aggfunc, weighted=True)
+                    if col not in default_cols:
+                        # User-added columns
+                        user_added_cols[col] = frame.col_reference_dict[col]
+        del i_col
+
+        ## Aggregate the time column ##
+        t_col = np.asarray(long_col('t1', 't2'))
+        data_spell['t1'] = aggregator.segment_agg(t_col, 'min')
+        data_spell['t2'] = aggregator.segment_agg(t_col, 'max')
+
+        ## Aggregate the weight column ##
+        if not weighted:
+            data_spell['w'] = aggregator.segment_agg(t_col, 'size')
+        del t_col, es_rows, stacked_rows
+
+        # Construct dataframe
+        data_spell = pd.DataFrame(data_spell)
+
+        # Sort columns
+        sorted_cols = bpd.util._sort_cols(data_spell.columns)
+        data_spell = data_spell.reindex(sorted_cols, axis=1, copy=False)
+
+        self.log(f'data aggregated at the {level!r} level', level='info')
+
+        collapsed_frame = bpd.BipartiteLongCollapsed(data_spell, col_reference_dict=user_added_cols, log=frame._log_on_indicator)
+        collapsed_frame._set_attributes(frame, no_dict=True)
+
+        for col in frame.col_collapse_dict.keys():
+            # Remove dropped columns from attribute dictionaries
+            if (frame.col_collapse_dict[col] is None) or (frame.col_long_es_dict[col] is None):
+                # If column should be dropped during collapse, or during conversion between long and event study formats
+                del collapsed_frame.col_dtype_dict[col]
+                del collapsed_frame.col_collapse_dict[col]
+                del collapsed_frame.col_long_es_dict[col]
+                if col in collapsed_frame.columns_contig.keys():
+                    # If column is categorical
+                    del collapsed_frame.columns_contig[col]
+                    if collapsed_frame.id_reference_dict:
+                        # If linking contiguous ids to original ids
+                        del collapsed_frame.id_reference_dict[col]
+
+        # Compute m for the collapsed data
+        collapsed_frame = collapsed_frame.gen_m(force=True, copy=False)
+
+        # If level == 'match', then returns will be collapsed
+        if level == 'match':
+            collapsed_frame.no_returns = True
+
+        # Since collapsed data is sorted, convert directly into collapsed event study format
+        return collapsed_frame.to_eventstudy(is_sorted=True, copy=False)
 
     def get_worker_m(self, is_sorted=False):
         '''
@@ -156,6 +156,36 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
 
         return worker_m & i_last # m_col & (t_change | i_last)
 
+    def _get_long_rows(self, is_clean=True, is_sorted=False):
+        '''
+        Get the rows that make up the long format version of the data. Each event study row generates its period-1 observation, followed by its period-2 observation if it must be unstacked (see ._get_unstack_rows()). Since data is sorted, if the data is clean, the long format rows are generated already sorted, and observations that are in two consecutive event studies appear only once.
+
+        Arguments:
+            is_clean (bool): if True, data is already clean; otherwise, unstack all moves
+            is_sorted (bool): if False, raise an error, since the rows can only be computed on sorted data. Set is_sorted to True if dataframe is already sorted.
+
+        Returns:
+            (tuple of NumPy Arrays): event study row that generates each long row; and row of each long row in the period-1 column stacked on top of the period-2 column
+        '''
+        if not is_sorted:
+            raise NotImplementedError('._get_long_rows() requires `is_sorted` == True, but it is set to False.')
+
+        if is_clean:
+            # Find rows to unstack
+            unstack_rows = self._get_unstack_rows(is_sorted=True, copy=False)
+        else:
+            # If data isn't clean, just unstack all moves and deal with duplicates later
+            unstack_rows = self.get_worker_m(is_sorted=True)
+        # Mask over the interleaved period-1 and period-2 observations
+        long_rows = np.flatnonzero(np.stack([np.ones(len(self), dtype=bool), unstack_rows], axis=1).ravel())
+        del unstack_rows
+        # Event study row that generates each long row
+        es_rows = long_rows // 2
+        # Row of each long row in the period-1 column stacked on top of the period-2 column
+        stacked_rows = (long_rows % 2) * len(self) + es_rows
+
+        return es_rows, stacked_rows
+
     def diagnostic(self):
         '''
         Run diagnostic and print diagnostic report.
@@ -187,9 +217,119 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
 
             print(ret_str)
 
+    def _get_i_t_repair_rows(self, is_sorted=False):
+        '''
+        Get mask of rows for workers whose event study rows must be repaired by ._drop_i_t_duplicates(). A worker's rows can be kept as is if the worker has no worker-period duplicates and if the rows are consistent, i.e. stayers have the same observation in both periods, each mover's period-2 observation is the next row's period-1 observation (with the last row of each mover giving their final observation), time increases strictly between observations, and 'm' is correct. Converting such a worker's rows to long format, dropping duplicates, and converting back to event study format leaves the rows unchanged.
+
+        Arguments:
+            is_sorted (bool): if False, raise an error, since the rows can only be computed on sorted data. Set is_sorted to True if dataframe is already sorted.
+
+        Returns:
+            (NumPy Array): mask of rows for workers whose rows must be repaired
+        '''
+        if not is_sorted:
+            raise NotImplementedError('._get_i_t_repair_rows() requires `is_sorted` == True, but it is set to False.')
+
+        def same_values(col_1, col_2):
+            # Check whether values are equal, where NaNs are considered equal (as with .drop_duplicates())
+            col_1 = pd.Series(col_1, copy=False)
+            col_2 = pd.Series(col_2, copy=False)
+            return ((col_1.to_numpy() == col_2.to_numpy()) | (col_1.isna().to_numpy() & col_2.isna().to_numpy()))
+
+        i_col = self.loc[:, 'i'].to_numpy()
+        n_rows = len(i_col)
+        worker_m = self.get_worker_m(is_sorted=True)
+        # Rows whose period-2 observation should be the next row's period-1 observation
+        chained = (worker_m & (i_col == bpd.util.fast_shift(i_col, -1, fill_value=-2)))[: -1]
+        # Consecutive rows for the same stayer
+        next_stayer = ((~worker_m) & (i_col == bpd.util.fast_shift(i_col, -1, fill_value=-2)))[: -1]
+
+        repair_rows = np.zeros(n_rows, dtype=bool)
+
+        ## Check columns ##
+        for col in self._included_cols():
+            if col in ['i', 'm']:
+                # i is always consistent; m is checked below
+                continue
+            subcols = bpd.util.to_list(self.col_reference_dict[col])
+            if self.col_long_es_dict[col]:
+                # If column has been split
+                halfway = len(subcols) // 2
+                for k in range(halfway):
+                    col_1 = self.loc[:, subcols[k]].to_numpy()
+                    col_2 = self.loc[:, subcols[halfway + k]].to_numpy()
+                    # Stayers have the same observation in both periods
+                    repair_rows |= (~worker_m) & (~same_values(col_1, col_2))
+                    # Each mover's period-2 observation is the next row's period-1 observation
+                    repair_rows[: -1] |= chained & (~same_values(col_2[: -1], col_1[1:]))
+                    if col == 'y':
+                        # Observations with NaN income are dropped
+                        repair_rows |= pd.isna(col_1) | pd.isna(col_2)
+            else:
+                # If column has not been split, the period-2 observation keeps the first non-NaN value
+                for subcol in subcols:
+                    col_na = self.loc[:, subcol].isna().to_numpy()
+                    repair_rows[: -1] |= chained & col_na[: -1] & (~col_na[1:])
+
+        ## Check time ##
+        t_subcols = bpd.util.to_list(self.col_reference_dict['t'])
+        halfway = len(t_subcols) // 2
+        # Start and end of the period-1 and period-2 observations (these are the same unless data is collapsed)
+        t1_start = self.loc[:, t_subcols[0]].to_numpy()
+        t1_end = self.loc[:, t_subcols[halfway - 1]].to_numpy()
+        t2_start = self.loc[:, t_subcols[halfway]].to_numpy()
+        # Time increases strictly within each move, and between consecutive rows for stayers (for movers, consecutive rows share an observation)
+        repair_rows |= worker_m & (t2_start <= t1_end)
+        repair_rows[: -1] |= next_stayer & (t1_start[1:] <= t1_end[: -1])
+
+        ## Check m ##
+        j1 = self.loc[:, 'j1'].to_numpy()
+        j2 = self.loc[:, 'j2'].to_numpy()
+        repair_rows |= (self.loc[:, 'm'].to_numpy() != (j1 != j2))
+        if isinstance(self, bpd.BipartiteEventStudyCollapsed):
+            # Collapsed data is recollapsed, so consecutive spells at the same firm would be merged
+            repair_rows |= worker_m & (j1 == j2)
+            repair_rows[: -1] |= next_stayer & (j1[1:] == j1[: -1])
+
+        ## Extend to all rows for each worker ##
+        # Source: https://stackoverflow.com/a/47115520/17333120
+        worker_starts = np.flatnonzero(i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2))
+        worker_sizes = np.diff(np.append(worker_starts, n_rows))
+        repair_workers = np.logical_or.reduceat(repair_rows, worker_starts) if n_rows > 0 else np.array([], dtype=bool)
+
+        return np.repeat(repair_workers, worker_sizes)
+
+    def _combine_workers(self, keep_rows, repaired_frame):
+        '''
+        Combine the rows of workers that are left unchanged by an operation with the rows of workers that were converted to long format and back to event study format separately. Since each worker's rows are contiguous, this is faster than converting the full dataframe when few workers need to be converted.
+
+        Arguments:
+            keep_rows (NumPy Array): mask of rows to keep unchanged (either all or none of a worker's rows should be kept)
+            repaired_frame (BipartiteEventStudyBase): event study rows for the remaining workers (attributes are taken from this dataframe)
+
+        Returns:
+            (BipartiteEventStudyBase): combined dataframe, sorted by i (and t, if included)
+        '''
+        if not keep_rows.any():
+            return repaired_frame
+
+        data_es = pd.concat([pd.DataFrame(self.loc[keep_rows, :]), pd.DataFrame(repaired_frame)], ignore_index=True)
+        # Each worker's rows are contiguous and sorted, so a stable sort on i sorts by i and t
+        data_es = data_es.iloc[np.argsort(data_es.loc[:, 'i'].to_numpy(), kind='stable')]
+        data_es.reset_index(drop=True, inplace=True)
+
+        # Sort columns
+        sorted_cols = bpd.util._sort_cols(data_es.columns)
+        data_es = data_es.reindex(sorted_cols, axis=1, copy=False)
+
+        frame = self._constructor(data_es, log=self._log_on_indicator)
+        frame._set_attributes(repaired_frame)
+
+        return frame
+
     def _drop_i_t_duplicates(self, how='max', is_sorted=False, copy=True):
         '''
-        Keep only the highest paying job for i-t (worker-year) duplicates.
+        Keep only the highest paying job for i-t (worker-year) duplicates. Worker-period duplicates (and other inconsistent rows) are detected directly in event study format, and only the affected workers' rows are converted to long format, repaired, and converted back to event study format.
 
         Arguments:
             how (str or function): if 'max', keep max paying job; otherwise, take `how` over duplicate worker-firm-year observations, then take the highest paying worker-firm observation. `how` can take any input valid for a Pandas transform.
@@ -205,20 +345,33 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
             frame = self
 
         if frame._col_included('t'):
-            ## Convert to long
-            # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
-            no_split_cols = [col for col, long_es_split in frame.col_long_es_dict.items() if long_es_split is None]
+            # Sort
+            frame = frame.sort_rows(is_sorted=is_sorted, copy=False)
 
-            # Drop i-t duplicates for long data, then convert back to event study (note: we use is_clean=False because duplicates mean that we should fully unstack all observations, to see which are duplicates and which are legitimate - setting is_clean=True would arbitrarily decide which rows are already correct)
-            frame = frame.to_long(is_clean=False, drop_no_split_columns=False, is_sorted=is_sorted, copy=False)
+            # Find workers whose rows must be repaired
+            repair_rows = frame._get_i_t_repair_rows(is_sorted=True)
 
-            frame.drop_duplicates(inplace=True)
+            if repair_rows.any():
+                ## Convert affected workers to long ##
+                # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
+                no_split_cols = [col for col, long_es_split in frame.col_long_es_dict.items() if long_es_split is None]
 
-            frame = frame._drop_i_t_duplicates(how, is_sorted=True, copy=False).to_eventstudy(is_sorted=True, copy=False)
+                # Drop i-t duplicates for long data, then convert back to event study (note: we use is_clean=False because duplicates mean that we should fully unstack all observations, to see which are duplicates and which are legitimate - setting is_clean=True would arbitrarily decide which rows are already correct)
+                repaired_frame = frame.loc[repair_rows, :].to_long(is_clean=False, drop_no_split_columns=False, is_sorted=True, copy=False)
 
-            # Update col_long_es_dict for columns that aren't supposed to convert to long
-            for col in no_split_cols:
-                frame.col_long_es_dict[col] = None
+                repaired_frame.drop_duplicates(inplace=True)
+
+                repaired_frame = repaired_frame._drop_i_t_duplicates(how, is_sorted=True, copy=False).to_eventstudy(is_sorted=True, copy=False)
+
+                # Update col_long_es_dict for columns that aren't supposed to convert to long
+                for col in no_split_cols:
+                    repaired_frame.col_long_es_dict[col] = None
+
+                # Combine repaired workers with unaffected workers
+                frame = frame._combine_workers(~repair_rows, repaired_frame)
+            else:
+                # Reset index
+                frame.reset_index(drop=True, inplace=True)
 
             # Data now has unique i-t observations
             frame.i_t_unique = True
@@ -227,44 +380,21 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
 
         return frame
 
-    def get_cs(self, copy=True):
+    def get_cs(self, lazy=False, copy=True):
         '''
         Return (collapsed) event study data reformatted into cross section data.
 
         Arguments:
-            copy (bool): if False, avoid copy
+            lazy (bool): if True, return a lazy CrossSection view, which gathers columns from the event study data when they are accessed instead of materializing the cross section (see CrossSection for details); if False, return a dataframe
+            copy (bool): not used, since the materialized cross section never shares data with the event study data (kept for backwards compatibility)
 
         Returns:
-            (Pandas DataFrame): cross section data
+            (Pandas DataFrame or CrossSection): cross section data
         '''
-        sdata = pd.DataFrame(self.loc[self.loc[:, 'm'].to_numpy() == 0, :], copy=copy)
-        jdata = pd.DataFrame(self.loc[self.loc[:, 'm'].to_numpy() > 0, :], copy=copy)
-
-        # Columns used for constructing cross section
-        cs_cols = self._included_cols(subcols=True)
+        data_cs = bpd.CrossSection(self)
 
-        # Dictionary to swap names for cs=0 (these rows contain period-2 data for movers, so must swap columns for all relevant information to be contained in the same column (e.g. must move y2 into y1, otherwise bottom rows are just duplicates))
-        rename_dict = {}
-        for col in self._included_cols():
-            subcols = bpd.util.to_list(self.col_reference_dict[col])
-            n_subcols = len(subcols)
-            # If even number of subcols, then is formatted as 'x1', 'x2', etc., so must swap to be 'x2', 'x1', etc.
-            if n_subcols % 2 == 0:
-                halfway = n_subcols // 2
-                for i in range(halfway):
-                    rename_dict[subcols[i]] = subcols[halfway + i]
-                    rename_dict[subcols[halfway + i]] = subcols[i]
-
-        # Combine the 2 data-sets
-        data_cs = pd.concat([
-            sdata.loc[:, cs_cols].assign(cs=1),
-            jdata.loc[:, cs_cols].assign(cs=1),
-            jdata.loc[:, cs_cols].rename(rename_dict, axis=1).assign(cs=0)
-        ], ignore_index=True)
-
-        # Sort columns
-        sorted_cols = bpd.util._sort_cols(data_cs.columns)
-        data_cs = data_cs.reindex(sorted_cols, axis=1, copy=False)
+        if not lazy:
+            data_cs = data_cs.to_frame()
 
         self.log('mover and stayer event study datasets combined into cross section', level='info')
 
@@ -286,81 +416,73 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
         if not self._col_included('t'):
             raise NotImplementedError("Cannot convert from event study to long format without a time column. To bypass this, if you know your data is ordered by time but do not have time data, it is recommended to construct an artificial time column by calling .construct_artificial_time(copy=False).")
 
-        # Sort and copy
-        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
 
+        ## Find the rows of the long format data ##
+        es_rows, stacked_rows = frame._get_long_rows(is_clean=is_clean, is_sorted=True)
+        frame.log('rows to unstack found', level='info')
+
+        ## Fill in columns ##
         # Keep track of user-added columns
         user_added_cols = {}
         default_cols = frame.columns_req + frame.columns_opt
 
-        # Dictionary to swap names (necessary for last row of data, where period-2 observations are not located in subsequent period-1 column (as it doesn't exist), so must append the last row with swapped column names)
-        rename_dict_1 = {}
-        # Dictionary to reformat names into (collapsed) long form
-        rename_dict_2 = {}
+        # Dictionary linking columns to their data
+        data_long = {}
         # For casting column types
         astype_dict = {}
-        # Columns to drop
-        drops = []
         for col in frame._included_cols():
             if (frame.col_long_es_dict[col] is None) and drop_no_split_columns:
                 # If None and data is clean, drop this column
-                drops += bpd.util.to_list(frame.col_reference_dict[col])
+                pass
             elif frame.col_long_es_dict[col]:
                 # If column has been split
                 subcols = bpd.util.to_list(frame.col_reference_dict[col])
-                if (col != 'i') and (len(subcols) % 2 == 1):
+                if col == 'i':
+                    data_long['i'] = frame.loc[:, 'i'].array.take(es_rows)
+                    continue
+                if len(subcols) % 2 == 1:
                     raise ValueError(f'{col!r} is listed as being split, but has an odd number of subcolumns. If this is a custom column, please make sure when adding it to the dataframe to specify long_es_split=False, to ensure it is not marked as being split, or long_es_split=None, to indicate the column should be dropped when converting between long and event study formats.')
                 halfway = len(subcols) // 2
                 for i in range(halfway):
-                    rename_dict_1[subcols[i]] = subcols[halfway + i]
-                    rename_dict_1[subcols[halfway + i]] = subcols[i]
                     # Get column number, e.g. j1 will give 1
                     subcol_number = subcols[i][len(col):]
                     # Get rid of first number, e.g. j12 to j2 (note there is no indexing issue even if subcol_number has only one digit)
-                    rename_dict_2[subcols[i]] = col + subcol_number[1:]
+                    long_subcol = col + subcol_number[1:]
+                    # Gather from the stacked period-1 and period-2 columns (using pandas arrays keeps extension dtypes)
+                    data_long[long_subcol] = pd.concat([frame.loc[:, subcols[i]], frame.loc[:, subcols[halfway + i]]], ignore_index=True).array.take(stacked_rows)
                     if frame.col_dtype_dict[col] in ['int', 'categorical']:
-                        astype_dict[rename_dict_2[subcols[i]]] = int
+                        astype_dict[long_subcol] = int
 
                     if col not in default_cols:
                         # User-added columns
                         if col in user_added_cols.keys():
-                            user_added_cols[col].append(col + subcol_number[1:])
+                            user_added_cols[col].append(long_subcol)
                         else:
-                            user_added_cols[col] = [col + subcol_number[1:]]
-
-                    drops.append(subcols[halfway + i])
-
+                            user_added_cols[col] = [long_subcol]
             else:
-                # If column has not been split
-                if frame.col_dtype_dict[col] in ['int', 'categorical']:
-                    # Check correct type for other columns
-                    for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                # If column has not been split (or if None and data isn't clean)
+                for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                    data_long[subcol] = frame.loc[:, subcol].array.take(es_rows)
+                    if frame.col_dtype_dict[col] in ['int', 'categorical']:
+                        # Check correct type for other columns
                         astype_dict[subcol] = int
                 if col not in default_cols:
                     # User-added columns
                     user_added_cols[col] = frame.col_reference_dict[col]
+        del es_rows, stacked_rows
 
-        if is_clean:
-            # Find rows to unstack
-            unstack_df = pd.DataFrame(frame.loc[frame._get_unstack_rows(is_sorted=True, copy=False), :])
-        else:
-            # If data isn't clean, just unstack all moves and deal with duplicates later
-            unstack_df = pd.DataFrame(frame.loc[frame.get_worker_m(is_sorted=True), :])
-        unstack_df.rename(rename_dict_1, axis=1, inplace=True)
-
+        # Construct dataframe (NOTE: this converts the data into a Pandas DataFrame)
+        data_long = pd.DataFrame(data_long)
         try:
-            data_long = pd.concat([pd.DataFrame(frame), unstack_df], ignore_index=True)
-            data_long.drop(drops, axis=1, inplace=True)
-            data_long.rename(rename_dict_2, axis=1, inplace=True)
             data_long = data_long.astype(astype_dict, copy=False)
         except ValueError:
             # If nan values, use Int64
             for col in astype_dict.keys():
                 astype_dict[col] = 'Int64'
-            data_long = pd.concat([pd.DataFrame(frame), unstack_df], ignore_index=True)
-            data_long.drop(drops, axis=1, inplace=True)
-            data_long.rename(rename_dict_2, axis=1, inplace=True)
             data_long = data_long.astype(astype_dict, copy=False)
+        frame.log('columns updated', level='info')
 
         ## Final steps ##
         # Sort columns
@@ -392,11 +514,16 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
                             # If linking contiguous ids to original ids
                             del long_frame.id_reference_dict[col]
 
-        # Sort rows by i (and t, if included)
-        long_frame = long_frame.sort_rows(is_sorted=False, copy=False)
-
-        # Reset index
-        long_frame.reset_index(drop=True, inplace=True)
+        if not is_clean:
+            # If data isn't clean, period-2 observations may come after subsequent period-1 observations, so sort rows by i (and t, if included) unless they are already sorted
+            i_col = long_frame.loc[:, 'i'].to_numpy()
+            t_col = long_frame.loc[:, bpd.util.to_list(long_frame.col_reference_dict['t'])[0]].to_numpy()
+            i_diff = np.diff(i_col)
+            if np.any((i_diff < 0) | ((i_diff == 0) & (np.diff(t_col) < 0))):
+                long_frame = long_frame.sort_rows(is_sorted=False, copy=False)
+                # Reset index
+                long_frame.reset_index(drop=True, inplace=True)
+            del i_col, t_col, i_diff
 
         # Generate 'm' column
         long_frame = long_frame.gen_m(force=True, copy=False)
@@ -445,6 +572,34 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
         '''
         return self.to_long(is_sorted=is_sorted, copy=copy)._prep_cluster(stayers_movers=stayers_movers, t=t, weighted=weighted, is_sorted=True, copy=False)
 
+    def _to_long_ids(self, is_sorted=False):
+        '''
+        Convert only the columns used to compute connected components and restrictions ('i', 'j', 'y', 't', 'g', 'w', and 'm') to long format. Other columns are not needed to find which ids to keep, so skipping them makes computing leave-one-out connected components and restrictions cheaper.
+
+        Arguments:
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Set is_sorted to True if dataframe is already sorted.
+
+        Returns:
+            (BipartiteLongBase): long format dataframe with only the columns used to compute connected components and restrictions
+        '''
+        id_cols = []
+        for col in ['i', 'j', 'y', 't', 'g', 'w', 'm']:
+            if self._col_included(col):
+                id_cols += bpd.util.to_list(self.col_reference_dict[col])
+
+        frame = self._constructor(self.loc[:, id_cols], log=self._log_on_indicator)
+        frame._set_attributes(self)
+        # Only keep dictionary entries for included columns
+        for col in list(frame.col_reference_dict.keys()):
+            if (col not in frame.columns_req) and (col not in frame.columns_opt):
+                del frame.col_reference_dict[col], frame.col_dtype_dict[col], frame.col_collapse_dict[col], frame.col_long_es_dict[col]
+                if col in frame.columns_contig.keys():
+                    del frame.columns_contig[col]
+                    if frame.id_reference_dict:
+                        del frame.id_reference_dict[col]
+
+        return frame.to_long(is_sorted=is_sorted, copy=False)
+
     def _leave_out_observation_spell_match(self, cc_list, max_j, leave_out_group, strongly_connected=False, component_size_variable='firms', drop_returns_to_stays=False, frame_largest_cc=None, is_sorted=False, copy=True, first_loop=True):
         '''
         Extract largest leave-one-(observation/spell/match)-out connected component.
@@ -464,17 +619,14 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
         Returns:
             (BipartiteEventStudyBase): dataframe of largest leave-one-(observation/spell/match)-out connected component
         '''
-        # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
-        no_split_cols = [col for col, long_es_split in self.col_long_es_dict.items() if long_es_split is None]
-
-        # Compute leave-one-(observation/spell/match)-out connected components
-        frame = self.to_long(drop_no_split_columns=False, is_sorted=is_sorted, copy=copy)._leave_out_observation_spell_match(cc_list=cc_list, max_j=max_j, leave_out_group=leave_out_group, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=first_loop).to_eventstudy(is_sorted=True, copy=False)
+        # Sort and copy
+        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
 
-        # Update col_long_es_dict for columns that aren't supposed to convert to long
-        for col in no_split_cols:
-            frame.col_long_es_dict[col] = None
+        # Compute leave-one-(observation/spell/match)-out connected components (only the columns that the components depend on are converted to long format)
+        frame_cc = frame._to_long_ids(is_sorted=True)._leave_out_observation_spell_match(cc_list=cc_list, max_j=max_j, leave_out_group=leave_out_group, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=first_loop)
 
-        return frame
+        # Keep firms in the largest component (only workers who lose some of their firms are converted to long format and back)
+        return frame.keep_ids('j', frame_cc.unique_ids('j'), drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
 
     def _leave_out_worker(self, cc_list, max_j, strongly_connected=False, component_size_variable='firms', drop_returns_to_stays=False, frame_largest_cc=None, is_sorted=False, copy=True, first_loop=True):
         '''
@@ -494,17 +646,36 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
         Returns:
             (BipartiteEventStudyBase): dataframe of largest leave-one-worker-out connected component
         '''
-        # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
-        no_split_cols = [col for col, long_es_split in self.col_long_es_dict.items() if long_es_split is None]
+        # Sort and copy
+        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
 
-        # Compute leave-one-worker-out connected components
-        frame = self.to_long(drop_no_split_columns=False, is_sorted=is_sorted, copy=copy)._leave_out_worker(cc_list=cc_list, max_j=max_j, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=first_loop).to_eventstudy(is_sorted=True, copy=False)
+        # Compute leave-one-worker-out connected components (only the columns that the components depend on are converted to long format)
+        frame_cc = frame._to_long_ids(is_sorted=True)._leave_out_worker(cc_list=cc_list, max_j=max_j, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=first_loop)
 
-        # Update col_long_es_dict for columns that aren't supposed to convert to long
-        for col in no_split_cols:
-            frame.col_long_es_dict[col] = None
+        # Keep firms in the largest component (only workers who lose some of their firms are converted to long format and back)
+        return frame.keep_ids('j', frame_cc.unique_ids('j'), drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
 
-        return frame
+    def _leave_out_worker_block_cut_tree(self, component_size_variable='firms', drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Extract largest leave-one-worker-out connected component using the block-cut tree of the worker-firm graph.
+
+        Arguments:
+            component_size_variable (str): how to determine largest leave-one-worker-out connected component. Options are 'len'/'length' (length of frame), 'firms' (number of unique firms), 'workers' (number of unique workers), 'stayers' (number of unique stayers), and 'movers' (number of unique movers)
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (BipartiteEventStudyBase): dataframe of largest leave-one-worker-out connected component
+        '''
+        # Sort and copy
+        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+
+        # Compute leave-one-worker-out connected components (only the columns that the components depend on are converted to long format)
+        frame_cc = frame._to_long_ids(is_sorted=True)._leave_out_worker_block_cut_tree(component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+
+        # Keep firms in the largest component (only workers who lose some of their firms are converted to long format and back)
+        return frame.keep_ids('j', frame_cc.unique_ids('j'), drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
 
     def _construct_firm_linkages(self, is_sorted=False, copy=True):
         '''
@@ -518,7 +689,10 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
             (NumPy Array): firm linkages
             (int): maximum firm id
         '''
-        return self.loc[(self.loc[:, 'm'].to_numpy() > 0), ['j1', 'j2']].to_numpy()
+        linkages = self.loc[(self.loc[:, 'm'].to_numpy() > 0), ['j1', 'j2']].to_numpy()
+        max_j = np.max(linkages)
+
+        return linkages, max_j
 
     def _construct_firm_double_linkages(self, is_sorted=False, copy=True):
         '''
@@ -566,7 +740,10 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
         base_linkages = frame.loc[worker_m, ['i', 'j1']].to_numpy()
         secondary_linkages = frame.loc[frame._get_unstack_rows(worker_m=worker_m, is_sorted=True, copy=False), ['i', 'j2']].to_numpy()
         linkages = np.concatenate([base_linkages, secondary_linkages], axis=0)
-        max_j = np.max(linkages)
+        # Firm ids are in the second column
+        max_j = np.max(linkages[:, 1])
+        # Worker ids must not overlap with firm ids
+        linkages = np.stack([linkages[:, 0] + max_j + 1, linkages[:, 1]], axis=1)
 
         return linkages, max_j
 
@@ -592,15 +769,49 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
                 return self.copy()
             return self
 
-        # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
-        no_split_cols = [col for col, long_es_split in self.col_long_es_dict.items() if long_es_split is None]
+        # Sort and copy
+        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
 
-        # Keep ids
-        frame = self.to_long(drop_no_split_columns=False, is_sorted=is_sorted, copy=copy).keep_ids(id_col=id_col, keep_ids_list=keep_ids_list, drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, reset_index=False, copy=False).to_eventstudy(is_sorted=True, copy=False)
+        ## Find workers affected by dropping ids ##
+        id_subcols = bpd.util.to_list(frame.col_reference_dict[id_col])
+        keep_ids_array = np.array(list(keep_ids_list))
+        # Rows where all ids are kept, and rows where some id is kept
+        all_kept = np.ones(len(frame), dtype=bool)
+        any_kept = np.zeros(len(frame), dtype=bool)
+        for id_subcol in id_subcols:
+            subcol_kept = np.isin(frame.loc[:, id_subcol].to_numpy(), keep_ids_array)
+            all_kept &= subcol_kept
+            any_kept |= subcol_kept
+        del subcol_kept
+        if len(frame) > 0:
+            i_col = frame.loc[:, 'i'].to_numpy()
+            # Source: https://stackoverflow.com/a/47115520/17333120
+            worker_starts = np.flatnonzero(i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2))
+            worker_sizes = np.diff(np.append(worker_starts, len(frame)))
+            del i_col
+            all_kept = np.repeat(np.logical_and.reduceat(all_kept, worker_starts), worker_sizes)
+            any_kept = np.repeat(np.logical_or.reduceat(any_kept, worker_starts), worker_sizes)
+        # Workers who keep only some of their ids must be converted to long and back to event study format (workers who keep all their ids are unchanged, and workers who keep none of their ids are dropped)
+        repair_rows = (any_kept & (~all_kept))
+
+        if repair_rows.any():
+            # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
+            no_split_cols = [col for col, long_es_split in frame.col_long_es_dict.items() if long_es_split is None]
 
-        # Update col_long_es_dict for columns that aren't supposed to convert to long
-        for col in no_split_cols:
-            frame.col_long_es_dict[col] = None
+            # Keep ids (only consider ids that show up for the affected workers)
+            repaired_frame = frame.loc[repair_rows, :]
+            repaired_keep_ids_list = keep_ids_list & set(repaired_frame.unique_ids(id_col))
+            repaired_frame = repaired_frame.to_long(drop_no_split_columns=False, is_sorted=True, copy=False).keep_ids(id_col=id_col, keep_ids_list=repaired_keep_ids_list, drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, reset_index=False, copy=False).to_eventstudy(is_sorted=True, copy=False)
+
+            # Update col_long_es_dict for columns that aren't supposed to convert to long
+            for col in no_split_cols:
+                repaired_frame.col_long_es_dict[col] = None
+
+            # Combine repaired workers with unaffected workers
+            frame = frame._combine_workers(all_kept, repaired_frame)
+        else:
+            frame = frame.loc[all_kept, :]
+            frame.reset_index(drop=True, inplace=True)
 
         return frame
 
@@ -972,6 +1183,42 @@ class BipartiteEventStudyBase(bpd.BipartiteBase):
 
         return frame
 
+    def restrict(self, min_obs=None, min_workers=None, min_moves=None, min_movers=None, id_col='j', drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Return dataframe where all given restrictions hold jointly. The ids to keep are computed with BipartiteLongBase.restrict() on the long format of only the columns the restrictions depend on, then only workers who lose some of their observations are converted to long format and back.
+
+        Arguments:
+            min_obs (int or None): minimum number of observations required to keep an id from `id_col`; None is equivalent to no restriction
+            min_workers (int or None): minimum number of workers required to keep a firm; None is equivalent to no restriction
+            min_moves (int or None): minimum number of moves required to keep a firm; None is equivalent to no restriction
+            min_movers (int or None): minimum number of movers required to keep a firm; None is equivalent to no restriction
+            id_col (str): column to check ids for `min_obs` ('i', 'j', or 'g'). Use general column names for joint columns, e.g. put 'j' instead of 'j1', 'j2'.
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (BipartiteEventStudyBase): dataframe where all restrictions hold jointly
+        '''
+        if (min_obs is None) and (min_workers is None) and (min_moves is None) and (min_movers is None):
+            # If no restrictions
+            if copy:
+                return self.copy()
+            return self
+
+        # Sort and copy
+        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+
+        # Compute restrictions (only the columns that the restrictions depend on are converted to long format)
+        frame_restricted = frame._to_long_ids(is_sorted=True).restrict(min_obs=min_obs, min_workers=min_workers, min_moves=min_moves, min_movers=min_movers, id_col=id_col, drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+
+        # Keep ids that meet the restrictions (only workers who lose some of their ids are converted to long format and back)
+        frame = frame.keep_ids('j', frame_restricted.unique_ids('j'), drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+        if (min_obs is not None) and (id_col != 'j'):
+            frame = frame.keep_ids(id_col, frame_restricted.unique_ids(id_col), drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+
+        return frame
+
     def construct_artificial_time(self, time_per_worker=False, is_sorted=False, copy=True):
         '''
         Construct artificial time columns to enable conversion to (collapsed) long format. Only adds columns if time columns not already included.
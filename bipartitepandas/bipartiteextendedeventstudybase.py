@@ -37,6 +37,32 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
         '''
         return BipartiteExtendedEventStudyBase
 
+    def _get_period_array(self, col, period_arrays=None):
+        '''
+        Get the data for a general column as a single contiguous array with shape (n_rows, n_periods, n_subcols), where axis 1 gives the period of the extended event study and axis 2 gives the subcolumn within each period (e.g. for collapsed data, the first period of 't' has the subcolumns 't11' and 't12'). Computations over periods can then run as reductions over axis 1, rather than by iterating over subcolumns. The wide dataframe is the only storage, so the array is a copy of the column data; to avoid copying a column more than once in the same operation, pass the same `period_arrays` to each call (the rows of the dataframe must not change between calls).
+
+        Arguments:
+            col (str): general column name, e.g. 'j'
+            period_arrays (dict or None): cache linking general column names to arrays that were already computed; if not None, the array is read from or stored in this dictionary
+
+        Returns:
+            (NumPy Array): column data, with shape (n_rows, n_periods, n_subcols)
+        '''
+        if (period_arrays is not None) and (col in period_arrays.keys()):
+            return period_arrays[col]
+
+        n_periods = len(self.col_reference_dict['j'])
+        subcols = bpd.util.to_list(self.col_reference_dict[col])
+        if len(subcols) % n_periods != 0:
+            raise ValueError(f'{col!r} has {len(subcols)} subcolumns, which is not a multiple of the number of periods ({n_periods}).')
+
+        # Subcolumns are ordered by period, then by subcolumn within each period (e.g. 't11', 't12', 't21', 't22')
+        period_array = self.loc[:, subcols].to_numpy().reshape(len(self), n_periods, len(subcols) // n_periods)
+        if period_arrays is not None:
+            period_arrays[col] = period_array
+
+        return period_array
+
     def gen_m(self, force=False, copy=True):
         '''
         Generate m column for data (m == 0 if stayer, m == 1 if mover).
@@ -45,6 +71,20 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
             force (bool): if True, reset 'm' column even if it exists
             copy (bool): if False, avoid copy
 
+        Returns:
+            (BipartiteExtendedEventStudyBase): dataframe with m column
+        '''
+        return self._gen_m(force=force, copy=copy)
+
+    def _gen_m(self, force=False, copy=True, period_arrays=None):
+        '''
+        Generate m column for data (m == 0 if stayer, m == 1 if mover), reusing period arrays that were already computed.
+
+        Arguments:
+            force (bool): if True, reset 'm' column even if it exists
+            copy (bool): if False, avoid copy
+            period_arrays (dict or None): cache of period arrays (see ._get_period_array())
+
         Returns:
             (BipartiteExtendedEventStudyBase): dataframe with m column
         '''
@@ -54,10 +94,9 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
             frame = self
 
         if not frame._col_included('m') or force:
-            m = (frame.loc[:, 'j1'].to_numpy() != frame.loc[:, 'j2'].to_numpy())
-            for j_subcol in self.col_reference_dict['j'][2:]:
-                m = (frame.loc[:, 'j1'].to_numpy() != frame.loc[:, j_subcol].to_numpy())
-            frame.loc[:, 'm'] = m.astype(int, copy=False)
+            # Workers are movers if they are at a different firm in any period than in the first period
+            j = frame._get_period_array('j', period_arrays)[:, :, 0]
+            frame.loc[:, 'm'] = (j != j[:, [0]]).any(axis=1).astype(int, copy=False)
 
             # Sort columns
             frame = frame.sort_cols(copy=False)
@@ -95,13 +134,16 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
         self.log("generating 'm' column", level='info')
         if verbose:
             tqdm.write('checking required columns and datatypes')
-        frame = self.gen_m(force=True, copy=params['copy'])
+        # If the data is already sorted, rows don't change before converting to long format, so period arrays can be reused
+        period_arrays = {} if params['is_sorted'] else None
+        frame = self._gen_m(force=True, copy=params['copy'], period_arrays=period_arrays)
 
         # Clean long data, then convert back to event study (note: we use is_clean=False because duplicates mean that we should fully unstack all observations, to see which are duplicates and which are legitimate - setting is_clean=True would arbitrarily decide which rows are already correct)
         self.log('converting data to long format', level='info')
         if verbose:
             tqdm.write('converting data to long format')
-        frame = frame.to_long(drop_no_split_columns=False, is_sorted=params['is_sorted'], copy=False)
+        frame = frame._to_long(drop_no_split_columns=False, is_sorted=params['is_sorted'], copy=False, period_arrays=period_arrays)
+        del period_arrays
 
         frame = frame.clean(params_copy)
 
@@ -126,26 +168,22 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
 
         if self._col_included('m'):
             ret_str = '----- Extended Event Study Diagnostic -----\n'
-            stayers = self.loc[self.loc[:, 'm'].to_numpy() == 0, :]
-            movers = self.loc[self.loc[:, 'm'].to_numpy() > 0, :]
+            stayers = (self.loc[:, 'm'].to_numpy() == 0)
+            movers = (self.loc[:, 'm'].to_numpy() > 0)
 
             ##### Firms #####
-            firms_stayers = (stayers.loc[:, 'j1'].to_numpy() != stayers.loc[:, 'j2'].to_numpy())
-            firms_movers = (movers.loc[:, 'j1'].to_numpy() == movers.loc[:, 'j2'].to_numpy())
-            for j_subcol in self.col_reference_dict['j'][2:]:
-                firms_stayers = firms_stayers | (stayers.loc[:, 'j1'].to_numpy() != stayers.loc[:, j_subcol].to_numpy())
-                firms_movers = firms_movers & (movers.loc[:, 'j1'].to_numpy() == movers.loc[:, j_subcol].to_numpy())
-            firms_stayers = firms_stayers.sum()
-            firms_movers = firms_movers.sum()
+            j = self._get_period_array('j')[:, :, 0]
+            same_firms = (j == j[:, [0]]).all(axis=1)
+            firms_stayers = (stayers & (~same_firms)).sum()
+            firms_movers = (movers & same_firms).sum()
 
             ret_str += f'm==0 with different firms (should be 0): {firms_stayers}\n'
             ret_str += f'm>0 with same firm (should be 0): {firms_movers}\n'
 
             if self._col_included('g'):
                 ##### Clusters #####
-                clusters_stayers = (stayers.loc[:, 'g1'].to_numpy() != stayers.loc[:, 'g2'].to_numpy()).sum()
-                for g_subcol in self.col_reference_dict['g'][2:]:
-                    clusters_stayers = clusters_stayers | (stayers.loc[:, 'g1'].to_numpy() != stayers.loc[:, g_subcol].to_numpy())
+                g = self._get_period_array('g')[:, :, 0]
+                clusters_stayers = (stayers & (g != g[:, [0]]).any(axis=1)).sum()
 
                 ret_str += f'm==0 with different clusters (should be 0): {clusters_stayers}'
 
@@ -203,6 +241,24 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
         Returns:
             (BipartiteLongBase): long format dataframe generated from extended event study data
         '''
+        return self._to_long(drop_no_split_columns=drop_no_split_columns, is_sorted=is_sorted, copy=copy)
+
+    def _to_long(self, drop_no_split_columns=True, is_sorted=False, copy=True, period_arrays=None):
+        '''
+        Return (collapsed) extended event study data reformatted into (collapsed) long form, reusing period arrays that were already computed.
+
+        Arguments:
+            drop_no_split_columns (bool): if True, columns marked by self.col_long_es_dict as None (i.e. they should be dropped) will not be dropped
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+            period_arrays (dict or None): cache of period arrays (see ._get_period_array()); only used if is_sorted=True, since sorting changes the rows
+
+        Returns:
+            (BipartiteLongBase): long format dataframe generated from extended event study data
+        '''
+        if not is_sorted:
+            period_arrays = None
+
         if not self._col_included('t'):
             raise NotImplementedError("Cannot convert from extended event study to long format without a time column. To bypass this, if you know your data is ordered by time but do not have time data, it is recommended to construct an artificial time column by calling .construct_artificial_time(copy=False).")
             
@@ -228,17 +284,17 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
                 if (col != 'i') and (len(subcols) % n_periods != 0):
                     raise ValueError(f'{col!r} is listed as being split, but the number of subcolumns is not a multiple of the number of periods. If this is a custom column, please make sure when adding it to the dataframe to specify long_es_split=False, to ensure it is not marked as being split, or long_es_split=None, to indicate the column should be dropped when converting between long and extended event study formats.')
                 n_split_groups = len(subcols) // n_periods
+                if n_split_groups == 0:
+                    # 'i' is already in the new dataframe
+                    continue
+                # Stack periods, so that all rows for the first period come first, then all rows for the second period, etc.
+                col_data = frame._get_period_array(col, period_arrays).transpose(1, 0, 2).reshape(n_periods * len(frame), n_split_groups)
                 for i in range(n_split_groups):
                     # Get column number, e.g. j1 will give 1
                     subcol_number = subcols[i][len(col):]
                     # Get rid of first number, e.g. j12 to j2 (note there is no indexing issue even if subcol_number has only one digit)
                     subcol_i = col + subcol_number[1:]
-                    # Concatenate all subcolumns with the same remaining number
-                    data_long[subcol_i] = np.concatenate(
-                        [
-                            frame.loc[:, subcols[i + j * n_split_groups]] for j in range(n_periods)
-                        ]
-                    )
+                    data_long[subcol_i] = col_data[:, i]
 
                     if col not in default_cols:
                         # User-added columns
@@ -246,6 +302,7 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
                             user_added_cols[col].append(subcol_i)
                         else:
                             user_added_cols[col] = [subcol_i]
+                del col_data
 
             else:
                 # If column has not been split
@@ -311,11 +368,47 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
         Returns:
             (BipartiteExtendedEventStudyBase): dataframe that drops observations where workers leave a firm then return to it
         '''
+        if self._col_included('t'):
+            # Sort and copy
+            frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+
+            ## Check for returns without converting to long format ##
+            n_periods = len(frame.col_reference_dict['j'])
+            # Period arrays are reused if the data needs to be converted to long format
+            period_arrays = {}
+            # Long format observations, where all rows for the first period come first, then all rows for the second period, etc.
+            obs = pd.DataFrame(
+                {
+                    'i': np.tile(frame.loc[:, 'i'].to_numpy(), n_periods),
+                    't': frame._get_period_array('t', period_arrays)[:, :, 0].T.ravel(),
+                    'j': frame._get_period_array('j', period_arrays)[:, :, 0].T.ravel()
+                }
+            ).drop_duplicates()
+            obs = obs.iloc[np.lexsort((obs.loc[:, 't'].to_numpy(), obs.loc[:, 'i'].to_numpy()))]
+            i_col = obs.loc[:, 'i'].to_numpy()
+            j_col = obs.loc[:, 'j'].to_numpy()
+            # A worker returns to a firm if they have more spells than worker-firm matches
+            n_spells = ((i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2)) | (j_col != bpd.util.fast_shift(j_col, 1, fill_value=-2))).sum()
+            n_matches = len(obs.loc[:, ['i', 'j']].drop_duplicates())
+            del obs, i_col, j_col
+
+            if n_spells == n_matches:
+                # If there are no returns, the data doesn't change
+                frame.no_returns = True
+                return frame
+
+            # We don't need to sort or copy again
+            is_sorted = True
+            copy = False
+        else:
+            frame = self
+            period_arrays = None
+
         # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
-        no_split_cols = [col for col, long_es_split in self.col_long_es_dict.items() if long_es_split is None]
+        no_split_cols = [col for col, long_es_split in frame.col_long_es_dict.items() if long_es_split is None]
 
         # Drop returns
-        frame = self.to_long(drop_no_split_columns=False, is_sorted=is_sorted, copy=copy)._drop_returns(how=how, is_sorted=True, reset_index=False, copy=False).to_extendedeventstudy(periods_pre=len(self.col_reference_dict['j']), periods_post=0, is_sorted=True, copy=False)
+        frame = frame._to_long(drop_no_split_columns=False, is_sorted=is_sorted, copy=copy, period_arrays=period_arrays)._drop_returns(how=how, is_sorted=True, reset_index=False, copy=False).to_extendedeventstudy(periods_pre=len(self.col_reference_dict['j']), periods_post=0, is_sorted=True, copy=False)
 
         # Update col_long_es_dict for columns that aren't supposed to convert to long
         for col in no_split_cols:
@@ -399,6 +492,31 @@ class BipartiteExtendedEventStudyBase(bpd.BipartiteBase):
 
         return frame
 
+    def _leave_out_worker_block_cut_tree(self, component_size_variable='firms', drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Extract largest leave-one-worker-out connected component using the block-cut tree of the worker-firm graph.
+
+        Arguments:
+            component_size_variable (str): how to determine largest leave-one-worker-out connected component. Options are 'len'/'length' (length of frame), 'firms' (number of unique firms), 'workers' (number of unique workers), 'stayers' (number of unique stayers), and 'movers' (number of unique movers)
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (BipartiteExtendedEventStudyBase): dataframe of largest leave-one-worker-out connected component
+        '''
+        # Keep track of columns that aren't supposed to convert to long, but we allow to convert because this is during data cleaning
+        no_split_cols = [col for col, long_es_split in self.col_long_es_dict.items() if long_es_split is None]
+
+        # Compute leave-one-worker-out connected components
+        frame = self.to_long(drop_no_split_columns=False, is_sorted=is_sorted, copy=copy)._leave_out_worker_block_cut_tree(component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False).to_extendedeventstudy(periods_pre=len(self.col_reference_dict['j']), periods_post=0, is_sorted=True, copy=False)
+
+        # Update col_long_es_dict for columns that aren't supposed to convert to long
+        for col in no_split_cols:
+            frame.col_long_es_dict[col] = None
+
+        return frame
+
     def _construct_firm_linkages(self, is_sorted=False, copy=True):
         '''
         Construct numpy array linking firms by movers, for use with connected components.
@@ -176,8 +176,8 @@ class BipartiteLong(bpd.BipartiteLongBase):
             data_spell = frame
         else:
             ### If collapse necessary ###
-            # Dictionary linking columns to how they should be aggregated
-            agg_funcs = {}
+            # Dictionary linking columns to their aggregated data
+            data_spell = {}
 
             # Keep track of user-added columns
             user_added_cols = {}
@@ -186,52 +186,10 @@ class BipartiteLong(bpd.BipartiteLongBase):
             # If weight column exists
             weighted = frame._col_included('w')
 
-            if weighted:
-                ## Initial preparation if weighted ##
-                any_var = False
-                w = frame.loc[:, 'w'].to_numpy()
-                # Keep track of new, weighted columns
-                weighted_cols = []
-                for col in frame._included_cols():
-                    if (col == 't') or (frame.col_collapse_dict[col] is None):
-                        # If time, skip this column; if None, drop this column
-                        pass
-                    else:
-                        # If not time column
-                        aggfunc = frame.col_collapse_dict[col]
-                        if aggfunc in ['mean', 'var', 'std']:
-                            # If column can be weighted, weight it
-                            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                                with bpd.util.ChainedAssignment():
-                                    frame.loc[:, subcol + '_weighted'] = w * frame.loc[:, subcol].to_numpy()
-                                weighted_cols.append(subcol + '_weighted')
-                            if aggfunc in ['var', 'std']:
-                                any_var = True
-
-            ## Aggregate at the spell level ##
-            spells = frame.groupby(group_ids, sort=not ((level == 'match') and (not frame.no_returns)))
-
-            if weighted and any_var:
-                ## Variance computation if weighted ##
-                w_sum = spells['w'].transform('sum').to_numpy()
-                for col in frame._included_cols():
-                    if (col == 't') or (frame.col_collapse_dict[col] is None):
-                        # If time, skip this column; if None, drop this column
-                        pass
-                    else:
-                        # If not time column
-                        aggfunc = frame.col_collapse_dict[col]
-                        if aggfunc in ['var', 'std']:
-                            # If computing weighted variance
-                            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                                subcol_mean = spells[subcol + '_weighted'].transform('sum').to_numpy() / w_sum
-                                with bpd.util.ChainedAssignment():
-                                    frame.loc[:, subcol + '_weighted'] = w * ((frame.loc[:, subcol].to_numpy() - subcol_mean) ** 2)
-
-                ## Re-aggregate at the spell level ##
-                spells = frame.groupby(group_ids, sort=not ((level == 'match') and (not frame.no_returns)))
-
-            # First, prepare non-time columns for aggregation
+            # Spells are contiguous, but matches are only contiguous if workers don't return to firms
+            aggregator = bpd.util.GroupAggregator(group_ids, contiguous=((level == 'spell') or frame.no_returns), weights=(frame.loc[:, 'w'].to_numpy() if weighted else None))
+
+            ## Aggregate non-time columns ##
             default_cols = frame.columns_req + frame.columns_opt
             for col in frame._included_cols():
                 if (col == 't') or (frame.col_collapse_dict[col] is None):
@@ -240,56 +198,29 @@ class BipartiteLong(bpd.BipartiteLongBase):
                 else:
                     # If not time column
                     aggfunc = frame.col_collapse_dict[col]
-                    if weighted and (aggfunc in ['mean', 'var', 'std']):
-                        # If column should be weighted
-                        for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                            agg_funcs[subcol] = pd.NamedAgg(column=subcol + '_weighted', aggfunc='sum')
-                    else:
-                        # Unweighted column
-                        for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                            agg_funcs[subcol] = pd.NamedAgg(column=subcol, aggfunc=aggfunc)
+                    for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                        data_spell[subcol] = aggregator.agg(frame.loc[:, subcol], aggfunc, weighted=True)
                     if col not in default_cols:
                         # User-added columns
                         user_added_cols[col] = frame.col_reference_dict[col]
 
-            # Next, prepare the time column for aggregation
+            ## Aggregate the time column ##
             if self._col_included('t'):
-                agg_funcs['t1'] = pd.NamedAgg(column='t', aggfunc='min')
-                agg_funcs['t2'] = pd.NamedAgg(column='t', aggfunc='max')
+                t_col = frame.loc[:, 't'].to_numpy()
+                data_spell['t1'] = aggregator.segment_agg(t_col, 'min')
+                data_spell['t2'] = aggregator.segment_agg(t_col, 'max')
+                del t_col
 
-            # Next, prepare the weight column for aggregation
+            ## Aggregate the weight column ##
             if not weighted:
-                agg_funcs['w'] = pd.NamedAgg(column='i', aggfunc='size')
-
-            # Aggregate columns
-            data_spell = spells.agg(**agg_funcs)
-
-            # Finally, normalize weighted columns
-            if weighted:
-                w_sum = data_spell.loc[:, 'w'].to_numpy()
-                for col in frame._included_cols():
-                    if (col == 't') or (frame.col_collapse_dict[col] is None):
-                        # If time, skip this column; if None, drop this column
-                        pass
-                    else:
-                        # If not time column
-                        aggfunc = frame.col_collapse_dict[col]
-                        if aggfunc in ['mean', 'var', 'std']:
-                            # If column should be normalized
-                            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                                data_spell.loc[:, subcol] /= w_sum
-                                if aggfunc == 'std':
-                                    # Take square root of variance
-                                    with bpd.util.ChainedAssignment():
-                                        data_spell.loc[:, subcol] = np.sqrt(data_spell.loc[:, subcol].to_numpy())
-                with bpd.util.ChainedAssignment():
-                    # Drop added columns
-                    frame = frame.drop(weighted_cols, axis=1, inplace=True)
+                data_spell['w'] = aggregator.segment_agg(frame.loc[:, 'i'].to_numpy(), 'size')
+
+            # Construct dataframe
+            data_spell = pd.DataFrame(data_spell)
 
             # Sort columns
             sorted_cols = bpd.util._sort_cols(data_spell.columns)
             data_spell = data_spell.reindex(sorted_cols, axis=1, copy=False)
-            data_spell.reset_index(drop=True, inplace=True)
 
         self.log(f'data aggregated at the {level!r} level', level='info')
 
@@ -1,11 +1,75 @@
 '''
 Base class for bipartite networks in long or collapsed long format.
 '''
+from itertools import chain
+import os
 from tqdm.auto import tqdm
 import numpy as np
+from igraph import Graph
 import pandas as pd
 import bipartitepandas as bpd
 
+def _split_workers_by_group(i_col, j_col, firm_group):
+    '''
+    Restrict each worker's observations to each group of firms, by sorting observations by group and giving each worker in each group a new id. This is equivalent to splitting a frame into one frame per group.
+
+    Arguments:
+        i_col (NumPy Array): worker ids, sorted by i (and t, if included)
+        j_col (NumPy Array): firm ids
+        firm_group (NumPy Array): group of each firm id
+
+    Returns:
+        (tuple of NumPy Arrays): new worker ids and firm ids, sorted by group, then by i (and t, if included)
+    '''
+    obs_group = firm_group[j_col]
+    group_order = np.argsort(obs_group, kind='stable')
+    i_col = i_col[group_order]
+    j_col = j_col[group_order]
+    obs_group = obs_group[group_order]
+    # Each worker in each group is given a new id
+    i_col = np.cumsum((i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2)) | (obs_group != bpd.util.fast_shift(obs_group, 1, fill_value=-2))) - 1
+
+    return i_col, j_col
+
+def _min_moves_arrays(i_col, j_col, n_firms, threshold=2, recollapse=False, drop_returns_to_stays=False):
+    '''
+    Drop observations at firms with fewer than `threshold` many moves, looping until all firms have sufficiently many moves. This is the array equivalent of BipartiteLongBase.min_moves_frame().
+
+    Arguments:
+        i_col (NumPy Array): worker ids, sorted by i (and t, if included)
+        j_col (NumPy Array): firm ids
+        n_firms (int): number of firm ids (maximum firm id + 1)
+        threshold (int): minimum number of moves required to keep a firm
+        recollapse (bool): if True, data is collapsed at the spell level, so consecutive spells at the same firm are recollapsed
+        drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing
+
+    Returns:
+        (tuple of NumPy Arrays): worker ids, firm ids, and m for observations at firms with sufficiently many moves
+    '''
+    while True:
+        len_prev = len(j_col)
+        same_prev = (i_col == bpd.util.fast_shift(i_col, 1, fill_value=-2))
+        if recollapse:
+            # Recollapse consecutive spells at the same firm
+            same_spell = same_prev & (j_col == bpd.util.fast_shift(j_col, 1, fill_value=-2))
+            if drop_returns_to_stays:
+                # Only keep spells of size 1
+                spell_ids = np.cumsum(~same_spell) - 1
+                keep_rows = (np.bincount(spell_ids)[spell_ids] == 1)
+            else:
+                keep_rows = ~same_spell
+            i_col = i_col[keep_rows]
+            j_col = j_col[keep_rows]
+            same_prev = same_prev[keep_rows]
+        same_next = bpd.util.fast_shift(same_prev, -1, fill_value=False)
+        m = (same_prev & (j_col != bpd.util.fast_shift(j_col, 1, fill_value=-2))).astype(int, copy=False) + (same_next & (j_col != bpd.util.fast_shift(j_col, -1, fill_value=-2))).astype(int, copy=False)
+        keep_rows = (np.bincount(j_col[m > 0], minlength=n_firms)[j_col] >= threshold)
+        if keep_rows.all() and (len(j_col) == len_prev):
+            # If nothing dropped
+            return i_col, j_col, m
+        i_col = i_col[keep_rows]
+        j_col = j_col[keep_rows]
+
 class BipartiteLongBase(bpd.BipartiteBase):
     '''
     Base class for BipartiteLong and BipartiteLongCollapsed, where BipartiteLong and BipartiteLongCollapsed give a bipartite network of firms and workers in long and collapsed long form, respectively. Contains generalized methods. Inherits from BipartiteBase.
@@ -167,7 +231,7 @@ class BipartiteLongBase(bpd.BipartiteBase):
             self.log(f"computing largest connected set (how={connectedness!r})", level='info')
             if verbose:
                 tqdm.write(f"computing largest connected set (how={connectedness!r})")
-            frame = frame._connected_components(connectedness=connectedness, component_size_variable=params['component_size_variable'], drop_single_stayers=params['drop_single_stayers'], drop_returns_to_stays=params['drop_returns_to_stays'], is_sorted=True, copy=False)
+            frame = frame._connected_components(connectedness=connectedness, component_size_variable=params['component_size_variable'], drop_single_stayers=params['drop_single_stayers'], drop_returns_to_stays=params['drop_returns_to_stays'], leave_out_worker_block_cut_tree=params['leave_out_worker_block_cut_tree'], is_sorted=True, copy=False)
 
             # Next, check categorical ids are contiguous after igraph, in case the connected components dropped ids (._connected_components() automatically updates contiguous attributes)
             for cat_col, is_contig in frame.columns_contig.items():
@@ -208,21 +272,26 @@ class BipartiteLongBase(bpd.BipartiteBase):
         if not self._col_included('t'):
             raise NotImplementedError("Cannot convert from long to event study format without a time column. To bypass this, if you know your data is ordered by time but do not have time data, it is recommended to construct an artificial time column by calling .construct_artificial_time(copy=False).")
 
-        # Sort and copy
-        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
 
-        # Split workers by movers and stayers
+        ## Find the rows of the event study ##
+        # Since data is sorted, the event study is sorted if each row is generated by the long observation that gives its second period: stayers generate one row per observation, while movers generate one row per observation after their first observation
         worker_m = frame.get_worker_m(is_sorted=True)
-        stayers = pd.DataFrame(frame.loc[~worker_m, :])
-        movers = pd.DataFrame(frame.loc[worker_m, :])
+        i_col = frame.loc[:, 'i'].to_numpy()
+        # Second period of each row
+        rows_2 = np.flatnonzero((~worker_m) | (i_col == bpd.util.fast_shift(i_col, 1, fill_value=-2)))
+        # First period of each row (for movers, this is the previous observation)
+        rows_1 = rows_2 - worker_m[rows_2]
+        del worker_m, i_col
         frame.log('workers split by movers and stayers', level='info')
 
-        ## Add lagged values ##
+        ## Fill in columns ##
         all_cols = frame._included_cols()
         default_cols = frame.columns_req + frame.columns_opt
 
-        # Columns to keep
-        keep_cols = ['i']
+        # Dictionary linking columns to their data
+        data_es = {}
         # Keep track of user-added columns
         user_added_cols = {}
         for col in all_cols:
@@ -232,24 +301,18 @@ class BipartiteLongBase(bpd.BipartiteBase):
             elif frame.col_long_es_dict[col]:
                 # If column should split
                 for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                    # Get column number, e.g. j1 will give 1
-                    subcol_number = subcol[len(col):]
-                    ## Movers ##
-                    # Useful for t1 and t2: t1 should go to t11 and t21; t2 should go to t12 and t22
-                    col_1 = col + '1' + subcol_number
-                    col_2 = col + '2' + subcol_number
-                    # Lagged value
-                    with bpd.util.ChainedAssignment():
-                        movers.loc[:, col_1] = bpd.util.fast_shift(movers.loc[:, subcol].to_numpy(), 1, fill_value=-2)
-                    movers.rename({subcol: col_2}, axis=1, inplace=True)
-
-                    if subcol != 'i':
-                        ## Stayers (no lags) ##
-                        stayers.loc[:, col_1] = stayers.loc[:, subcol]
-                        stayers.rename({subcol: col_2}, axis=1, inplace=True)
-
-                        # Columns to keep
-                        keep_cols += [col_1, col_2]
+                    subcol_data = frame.loc[:, subcol].to_numpy()
+                    if subcol == 'i':
+                        data_es['i'] = subcol_data[rows_2]
+                    else:
+                        # Get column number, e.g. j1 will give 1
+                        subcol_number = subcol[len(col):]
+                        # Useful for t1 and t2: t1 should go to t11 and t21; t2 should go to t12 and t22
+                        col_1 = col + '1' + subcol_number
+                        col_2 = col + '2' + subcol_number
+                        data_es[col_1] = subcol_data[rows_1]
+                        data_es[col_2] = subcol_data[rows_2]
+
                         if col not in default_cols:
                             # User-added columns
                             if col in user_added_cols.keys():
@@ -258,38 +321,19 @@ class BipartiteLongBase(bpd.BipartiteBase):
                                 user_added_cols[col] = [col_1, col_2]
             else:
                 # If column shouldn't split
-                keep_cols += bpd.util.to_list(frame.col_reference_dict[col])
+                for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                    data_es[subcol] = frame.loc[:, subcol].to_numpy()[rows_2]
                 if col not in default_cols:
                     # User-added columns
                     user_added_cols[col] = frame.col_reference_dict[col]
+        del rows_1, rows_2
 
-        # Ensure lagged values are for the same worker
-        movers = movers.loc[movers.loc[:, 'i1'].to_numpy() == movers.loc[:, 'i2'].to_numpy(), :]
-
-        # Set 'm' for movers
-        movers.loc[:, 'm'] = 1
-        movers.loc[movers.loc[:, 'j1'].to_numpy() == movers.loc[:, 'j2'].to_numpy(), 'm'] = 0
-
-        # # Correct datatypes (shifting adds nans which converts all columns into float, correct columns that should be int)
-        # for col in all_cols:
-        #     if ((frame.col_dtype_dict[col] == 'int') or (col in frame.columns_contig.keys())) and frame.col_long_es_dict[col]:
-        #         for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-        #             # Get column number, e.g. j1 will give 1
-        #             subcol_number = subcol.strip(col)
-        #             shifted_col = col + '1' + subcol_number
-        #             movers.loc[:, shifted_col] = movers.loc[:, shifted_col].astype(int, copy=False)
-
-        # Correct i
-        movers.drop('i2', axis=1, inplace=True)
-        movers.rename({'i1': 'i'}, axis=1, inplace=True)
-
-        # Keep only relevant columns
-        stayers = stayers.reindex(keep_cols, axis=1, copy=False)
-        movers = movers.reindex(keep_cols, axis=1, copy=False)
+        # Set 'm' (stayers have the same firm in both periods)
+        data_es['m'] = (data_es['j1'] != data_es['j2']).astype(int, copy=False)
         frame.log('columns updated', level='info')
 
-        # Merge stayers and movers (NOTE: this converts the data into a Pandas DataFrame)
-        data_es = pd.concat([stayers, movers], ignore_index=True) # .reset_index(drop=True)
+        # Construct dataframe (NOTE: this converts the data into a Pandas DataFrame)
+        data_es = pd.DataFrame(data_es)
 
         # Sort columns
         sorted_cols = bpd.util._sort_cols(data_es.columns)
@@ -314,17 +358,77 @@ class BipartiteLongBase(bpd.BipartiteBase):
                         # If linking contiguous ids to original ids
                         del es_frame.id_reference_dict[col]
 
-        # Sort data by i and t
-        es_frame = es_frame.sort_rows(is_sorted=False, copy=False)
-
-        # Reset index
-        es_frame.reset_index(drop=True, inplace=True)
-
         if move_to_worker:
             es_frame.loc[:, 'i'] = es_frame.index
 
         return es_frame
 
+    def iter_eventstudy(self, chunk_size=1000000, path=None, move_to_worker=False, is_sorted=False, copy=True):
+        '''
+        Iterate over (collapsed) long form data reformatted into (collapsed) event study data, converting contiguous ranges of workers one chunk at a time, so that memory used by the conversion is bounded by the chunk size rather than by the size of the data. Concatenating the chunks gives the same data as .to_eventstudy().
+
+        Arguments:
+            chunk_size (int): maximum number of observations in each chunk of long data (a worker's observations are never split between chunks, so a chunk will be larger if a single worker has more observations)
+            path (str or None): if not None, also write each chunk to the Parquet dataset in this directory, with one file per chunk (e.g. path/part-00000.parquet), which can be read back with pd.read_parquet(path); raises a ValueError if the directory already includes part files (e.g. from an earlier run), since they would be read back together with the new chunks
+            move_to_worker (bool): if True, each move is treated as a new worker
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (generator of BipartiteEventStudyBase): event study dataframes for each chunk of workers
+        '''
+        # Check arguments here rather than in the generator, so invalid arguments raise an error immediately
+        if chunk_size < 1:
+            raise ValueError(f'`chunk_size` must be at least 1, but input specifies {chunk_size!r}.')
+        if (path is not None) and os.path.isdir(path) and any(file.startswith('part-') and file.endswith('.parquet') for file in os.listdir(path)):
+            raise ValueError(f'Directory {path!r} already includes Parquet part files, which would be mixed with the new chunks when the dataset is read. Remove them or specify a different directory.')
+
+        return self._iter_eventstudy(chunk_size=chunk_size, path=path, move_to_worker=move_to_worker, is_sorted=is_sorted, copy=copy)
+
+    def _iter_eventstudy(self, chunk_size=1000000, path=None, move_to_worker=False, is_sorted=False, copy=True):
+        '''
+        Generator for .iter_eventstudy(), which checks the arguments. See .iter_eventstudy() for a description of arguments and return values.
+        '''
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+        ## Find where each worker starts ##
+        i_col = frame.loc[:, 'i'].to_numpy()
+        n_obs = len(i_col)
+        worker_starts = np.append(np.flatnonzero(i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2)), n_obs)
+        del i_col
+
+        # Number of event study rows generated by previous chunks (used if move_to_worker=True)
+        n_es_rows = 0
+        chunk_start = 0
+        chunk_number = 0
+        while chunk_start < n_obs:
+            ## Convert each chunk of workers ##
+            # End the chunk at the last worker that fits
+            chunk_end = worker_starts[np.searchsorted(worker_starts, chunk_start + chunk_size, side='right') - 1]
+            if chunk_end <= chunk_start:
+                # If a single worker has more observations than the chunk size, the chunk consists of only that worker
+                chunk_end = worker_starts[np.searchsorted(worker_starts, chunk_start, side='right')]
+
+            es_chunk = frame.iloc[chunk_start: chunk_end].to_eventstudy(move_to_worker=False, is_sorted=True, copy=False)
+
+            if move_to_worker:
+                es_chunk.loc[:, 'i'] = n_es_rows + np.arange(len(es_chunk))
+                n_es_rows += len(es_chunk)
+
+            if path is not None:
+                pd.DataFrame(es_chunk).to_parquet(os.path.join(path, f'part-{chunk_number:05d}.parquet'), index=False)
+
+            frame.log(f'event study chunk {chunk_number} generated', level='info')
+
+            yield es_chunk
+
+            chunk_start = chunk_end
+            chunk_number += 1
+
     def to_extendedeventstudy(self, periods_pre=2, periods_post=2, stable_pre=None, stable_post=None, transition_col=None, move_to_worker=True, is_sorted=False, copy=True):
         '''
         Return (collapsed) long form data reformatted into (collapsed) extended event study data.
@@ -356,18 +460,17 @@ class BipartiteLongBase(bpd.BipartiteBase):
             stable_post = bpd.util.to_list(stable_post)
         n_periods = periods_pre + periods_post
 
-        # Sort and copy
-        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
 
-        ## Add lagged values ##
+        ## Link new columns to their source columns ##
         all_cols = frame._included_cols()
         default_cols = frame.columns_req + frame.columns_opt
 
+        # Dictionary linking each new column to the long column it comes from and the period of the event study it gives
+        ees_sources = {}
         # Keep track of user-added columns
         user_added_cols = {}
-
-        # New dataframe
-        data_ees = pd.DataFrame()
         for col in all_cols:
             if frame.col_long_es_dict[col] is None:
                 # If None, drop this column
@@ -375,18 +478,17 @@ class BipartiteLongBase(bpd.BipartiteBase):
             elif frame.col_long_es_dict[col]:
                 # If column should split
                 for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                    if subcol == 'i':
+                        ees_sources['i'] = ('i', 0)
+                        continue
                     # Get column number, e.g. j1 will give 1
                     subcol_number = subcol[len(col):]
-                    # Baseline column (note that new number goes before previous number, this is useful for t1 and t2: t1 should go to t11 and t21; t2 should go to t12 and t22)
-                    col_1 = f'{col}{1}{subcol_number}'
-                    data_ees.loc[:, col_1] = frame.loc[:, subcol].to_numpy()
                     # Keep track of new columns
-                    new_subcols = [col_1]
-                    for t in range(1, n_periods):
-                        # Lagged values (shift each subcolumn (n_periods - 1) times)
+                    new_subcols = []
+                    for t in range(n_periods):
+                        # Note that new number goes before previous number, this is useful for t1 and t2: t1 should go to t11 and t21; t2 should go to t12 and t22
                         col_t = f'{col}{t + 1}{subcol_number}'
-                        data_ees.loc[:, col_t] = bpd.util.fast_shift(frame.loc[:, subcol].to_numpy(), -t, fill_value=-2)
-                        # Keep track of new columns
+                        ees_sources[col_t] = (subcol, t)
                         new_subcols.append(col_t)
 
                     if col not in default_cols:
@@ -398,28 +500,81 @@ class BipartiteLongBase(bpd.BipartiteBase):
             else:
                 # If column shouldn't split
                 for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                    data_ees.loc[:, subcol] = frame.loc[:, subcol].to_numpy()
+                    ees_sources[subcol] = (subcol, 0)
                 if col not in default_cols:
                     # User-added columns
                     user_added_cols[col] = frame.col_reference_dict[col]
 
-        # Ensure lagged values are for the same worker
-        same_i = data_ees.loc[:, 'i1'].to_numpy() == data_ees.loc[:, 'i2'].to_numpy()
-        for t in range(3, n_periods + 1):
-            same_i = same_i & (data_ees.loc[:, 'i1'].to_numpy() == data_ees.loc[:, f'i{t}'].to_numpy())
-        data_ees = data_ees.loc[same_i, :]
-        del same_i
+        def ees_windows(col, rows):
+            # Data for a general column over all periods, for event studies starting at the given rows (axis 1 gives the period and axis 2 gives the subcolumn)
+            windows = []
+            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                subcol_data = frame.loc[:, subcol].to_numpy()
+                if len(subcol_data) >= n_periods:
+                    windows.append(np.lib.stride_tricks.sliding_window_view(subcol_data, n_periods)[rows])
+                else:
+                    windows.append(np.empty((0, n_periods), dtype=subcol_data.dtype))
+            return np.stack(windows, axis=2)
+
+        ## Find the rows where each event study starts ##
+        # Ensure all periods are for the same worker (since data is sorted by i, it is sufficient to check the first and last periods)
+        i_col = frame.loc[:, 'i'].to_numpy()
+        starts = np.flatnonzero(i_col[: max(len(frame) - n_periods + 1, 0)] == i_col[n_periods - 1:])
+        del i_col
+
+        # Handle transitions
+        if transition_col is not None:
+            transition_windows = ees_windows(transition_col, starts)
+
+            # Check that last observation before the transition isn't equal to the first observation after the transition
+            starts = starts[(transition_windows[:, periods_pre - 1, :] != transition_windows[:, periods_pre, :]).any(axis=1)]
+            del transition_windows
+
+            frame.log('transitions handled', level='info')
+
+        # Handle stable-pre
+        for pre_col in stable_pre:
+            pre_windows = ees_windows(pre_col, starts)[:, : periods_pre, :]
 
-        # Set 'm'
-        diff_j = data_ees.loc[:, 'j1'].to_numpy() != data_ees.loc[:, 'j2'].to_numpy()
-        for t in range(3, n_periods + 1):
-            diff_j = diff_j | (data_ees.loc[:, 'j1'].to_numpy() != data_ees.loc[:, f'j{t}'].to_numpy())
-        data_ees.loc[:, 'm'] = diff_j.astype(int, copy=False)
-        del diff_j
+            # Check that the column is stable before the transition
+            starts = starts[(pre_windows == pre_windows[:, [0], :]).all(axis=(1, 2))]
+            del pre_windows
+
+            frame.log(f'stable-pre handled for column {pre_col!r}', level='info')
+
+        # Handle stable-post
+        for post_col in stable_post:
+            post_windows = ees_windows(post_col, starts)[:, periods_pre:, :]
+
+            # Check that the column is stable after the transition
+            starts = starts[(post_windows == post_windows[:, [0], :]).all(axis=(1, 2))]
+            del post_windows
+
+            frame.log(f'stable-post handled for column {post_col!r}', level='info')
+
+        ## Fill in columns ##
+        # Dictionary linking columns to their data
+        data_ees = {}
+        for source_col in dict.fromkeys(source_col for source_col, _ in ees_sources.values()):
+            # Gather all periods for each event study from a sliding window over the long column
+            source_data = frame.loc[:, source_col].to_numpy()
+            if len(source_data) >= n_periods:
+                source_windows = np.lib.stride_tricks.sliding_window_view(source_data, n_periods)[starts]
+            else:
+                source_windows = np.empty((0, n_periods), dtype=source_data.dtype)
+            for subcol, (subcol_source, t) in ees_sources.items():
+                if subcol_source == source_col:
+                    data_ees[subcol] = source_windows[:, t]
+            del source_data, source_windows
+        del starts
 
-        # Correct i
-        data_ees.drop([f'i{t}' for t in range(2, n_periods + 1)], axis=1, inplace=True)
-        data_ees.rename({'i1': 'i'}, axis=1, inplace=True)
+        # Set 'm' (workers are movers if they are at a different firm in any period than in the first period)
+        j = np.stack([data_ees[f'j{t + 1}'] for t in range(n_periods)], axis=1)
+        data_ees['m'] = (j != j[:, [0]]).any(axis=1).astype(int, copy=False)
+        del j
+
+        # Construct dataframe
+        data_ees = pd.DataFrame(data_ees)
 
         # Sort columns
         sorted_cols = bpd.util._sort_cols(data_ees.columns)
@@ -447,53 +602,6 @@ class BipartiteLongBase(bpd.BipartiteBase):
                         # If linking contiguous ids to original ids
                         del ees_frame.id_reference_dict[col]
 
-        # Handle transitions
-        if transition_col is not None:
-            transition_subcols = bpd.util.to_list(ees_frame.col_reference_dict[transition_col])
-            pre_transition = transition_subcols[: periods_pre]
-            post_transition = transition_subcols[periods_pre:]
-
-            # Check that last observation before the transition isn't equal to the first observation after the transition
-            transition = (ees_frame.loc[:, pre_transition[-1]].to_numpy() != ees_frame.loc[:, post_transition[0]].to_numpy())
-            ees_frame = ees_frame.loc[transition, :]
-            del transition
-
-            frame.log('transitions handled', level='info')
-
-        # Handle stable-pre
-        for pre_col in stable_pre:
-            pre_all_subcols = bpd.util.to_list(ees_frame.col_reference_dict[pre_col])
-            pre_subcols = pre_all_subcols[: periods_pre]
-
-            # Check that the column is stable before the transition
-            same_subcol = ees_frame.loc[:, pre_subcols[0]].to_numpy() == ees_frame.loc[:, pre_subcols[1]].to_numpy()
-            for t in range(2, periods_pre):
-                same_subcol = same_subcol & (ees_frame.loc[:, pre_subcols[0]].to_numpy() == ees_frame.loc[:, pre_subcols[t]].to_numpy())
-            ees_frame = ees_frame.loc[same_subcol, :]
-            del same_subcol
-
-            frame.log(f'stable-pre handled for column {pre_col!r}', level='info')
-
-        # Handle stable-post
-        for post_col in stable_post:
-            post_all_subcols = bpd.util.to_list(ees_frame.col_reference_dict[post_col])
-            post_subcols = post_all_subcols[periods_pre:]
-
-            # Check that the column is stable after the transition
-            same_subcol = ees_frame.loc[:, post_subcols[0]].to_numpy() == ees_frame.loc[:, post_subcols[1]].to_numpy()
-            for t in range(2, periods_post):
-                same_subcol = same_subcol & (ees_frame.loc[:, post_subcols[0]].to_numpy() == ees_frame.loc[:, post_subcols[t]].to_numpy())
-            ees_frame = ees_frame.loc[same_subcol, :]
-            del same_subcol
-
-            frame.log(f'stable-post handled for column {post_col!r}', level='info')
-
-        # Sort data by i and t
-        ees_frame = ees_frame.sort_rows(is_sorted=False, copy=False)
-
-        # Reset index
-        ees_frame.reset_index(drop=True, inplace=True)
-
         if move_to_worker:
             ees_frame.loc[:, 'i'] = ees_frame.index
 
@@ -754,13 +862,14 @@ class BipartiteLongBase(bpd.BipartiteBase):
                 prev_len = len(frame_cc)
             frame_cc = frame_cc.min_moves_frame(2, drop_returns_to_stays, is_sorted=True, copy=False)
             if strongly_connected and (len(frame_cc) != prev_len):
-                # Dropping firms with 1 mover observation can change the strongly connected components, so recompute strongly connected components
-                G2, max_j2 = frame_cc._construct_graph(connectedness_name_full, is_sorted=True, copy=False)
-                cc_list_2 = G2.components(mode='strong')
-                del G2
-                if len(cc_list_2) > 1:
+                # Dropping firms with 1 mover observation can change the strongly connected components, so update strongly connected components as firms are dropped
+                cc_list_2 = frame_cc._strong_components_min_moves(drop_returns_to_stays=drop_returns_to_stays, is_sorted=True)
+                if len(cc_list_2) <= 1:
+                    # If the firms are still strongly connected, only keep firms that were not dropped
+                    frame_cc = frame_cc.keep_ids('j', cc_list_2[0] if len(cc_list_2) == 1 else [], drop_returns_to_stays, is_sorted=True, copy=False)
+                else:
                     # Recursion step (only necessary if dropping firms with 1 mover observations disconnects the set of firms)
-                    frame_cc = frame_cc._leave_out_observation_spell_match(cc_list=cc_list_2, max_j=max_j2, leave_out_group=leave_out_group, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=False)
+                    frame_cc = frame_cc._leave_out_observation_spell_match(cc_list=cc_list_2, max_j=frame_cc.loc[:, 'j'].max(), leave_out_group=leave_out_group, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=False)
 
             if frame_largest_cc is not None:
                 # If frame_cc is already smaller than frame_largest_cc
@@ -879,13 +988,14 @@ class BipartiteLongBase(bpd.BipartiteBase):
                 prev_len = len(frame_cc)
             frame_cc = frame_cc.min_moves_frame(2, drop_returns_to_stays, is_sorted=True, copy=False)
             if strongly_connected and (len(frame_cc) != prev_len):
-                # Dropping firms with 1 mover observation can change the strongly connected components, so recompute strongly connected components
-                G2, max_j2 = frame_cc._construct_graph('strongly_leave_out_worker', is_sorted=True, copy=False)
-                cc_list_2 = G2.components(mode='strong')
-                del G2
-                if len(cc_list_2) > 1:
+                # Dropping firms with 1 mover observation can change the strongly connected components, so update strongly connected components as firms are dropped
+                cc_list_2 = frame_cc._strong_components_min_moves(drop_returns_to_stays=drop_returns_to_stays, is_sorted=True)
+                if len(cc_list_2) <= 1:
+                    # If the firms are still strongly connected, only keep firms that were not dropped
+                    frame_cc = frame_cc.keep_ids('j', cc_list_2[0] if len(cc_list_2) == 1 else [], drop_returns_to_stays, is_sorted=True, copy=False)
+                else:
                     # Recursion step (only necessary if dropping firms with 1 mover observations disconnects the set of firms)
-                    frame_cc = frame_cc._leave_out_worker(cc_list=cc_list_2, max_j=max_j2, strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=False)
+                    frame_cc = frame_cc._leave_out_worker(cc_list=cc_list_2, max_j=frame_cc.loc[:, 'j'].max(), strongly_connected=strongly_connected, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, frame_largest_cc=frame_largest_cc, is_sorted=True, copy=False, first_loop=False)
 
             if frame_largest_cc is not None:
                 # If frame_cc is already smaller than frame_largest_cc
@@ -937,6 +1047,138 @@ class BipartiteLongBase(bpd.BipartiteBase):
         # Return largest leave-one-worker-out component
         return frame_largest_cc
 
+    def _leave_out_worker_block_cut_tree(self, component_size_variable='firms', drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Extract largest leave-one-worker-out connected component using the block-cut tree of the worker-firm graph. Removing articulation workers splits the firms into groups of biconnected components (blocks) that share articulation firms, so every group is found from a single biconnected decomposition rather than by recursing on each group. Graphs are only recomputed if removing firms with fewer than 2 moves changes the data.
+
+        Arguments:
+            component_size_variable (str): how to determine largest leave-one-worker-out connected component. Options are 'len'/'length' (length of frames), 'firms' (number of unique firms), 'workers' (number of unique workers), 'stayers' (number of unique stayers), 'movers' (number of unique movers), 'firms_plus_workers' (number of unique firms + number of unique workers), 'firms_plus_stayers' (number of unique firms + number of unique stayers), 'firms_plus_movers' (number of unique firms + number of unique movers), 'len_stayers'/'length_stayers' (number of stayer observations), 'len_movers'/'length_movers' (number of mover observations), 'stays' (number of stay observations), and 'moves' (number of move observations).
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (BipartiteLongBase): dataframe of largest leave-one-worker-out connected component
+        '''
+        # Sort and copy
+        frame_init = self.sort_rows(is_sorted=is_sorted, copy=copy)
+        recollapse = isinstance(frame_init, bpd.BipartiteLongCollapsed)
+
+        i_col = frame_init.loc[:, 'i'].to_numpy()
+        j_col = frame_init.loc[:, 'j'].to_numpy()
+        n_firms = j_col.max() + 1
+        # Start with all firms in the same group
+        firm_group = np.zeros(n_firms, dtype=int)
+        n_groups_prev = None
+
+        while True:
+            len_prev = len(j_col)
+
+            ## Restrict each worker's observations to each group of firms (this is equivalent to splitting the frame into one frame per group) ##
+            i_col, j_col = _split_workers_by_group(i_col, j_col, firm_group)
+
+            ## Remove firms with only 1 mover observation (can have 1 mover with multiple observations) ##
+            i_col, j_col, m = _min_moves_arrays(i_col, j_col, n_firms, threshold=2, recollapse=recollapse, drop_returns_to_stays=drop_returns_to_stays)
+
+            if len(j_col) == 0:
+                # If there are no firms with at least 2 moves
+                return frame_init.keep_ids('j', [], drop_returns_to_stays, is_sorted=True, copy=False)
+
+            ## Construct worker-firm graph (workers are offset by n_firms) ##
+            worker_m = (np.bincount(i_col, weights=(m > 0)) > 0)[i_col]
+            linkages = np.stack([j_col[worker_m], i_col[worker_m] + n_firms], axis=1)
+            G = Graph(n=n_firms + i_col.max() + 1, edges=linkages)
+            del worker_m, linkages
+
+            ## Merge blocks that share articulation firms (articulation workers are the only vertices that separate groups) ##
+            blocks = G.biconnected_components()
+            del G
+            block_sizes = np.array([len(block) for block in blocks], dtype=int)
+            block_vertices = np.fromiter(chain.from_iterable(blocks), dtype=int, count=block_sizes.sum())
+            block_ids = np.repeat(np.arange(len(block_sizes)), block_sizes)
+            del blocks, block_sizes
+            block_firms = (block_vertices < n_firms)
+            block_vertices = block_vertices[block_firms]
+            block_ids = block_ids[block_firms]
+            # Link each firm to one representative firm from each of its blocks
+            block_firm = np.zeros(block_ids.max() + 1, dtype=int)
+            block_firm[block_ids] = block_vertices
+            firm_group = np.array(Graph(n=n_firms, edges=np.stack([block_firm[block_ids], block_vertices], axis=1)).components().membership, dtype=int)
+            del block_vertices, block_ids, block_firms, block_firm
+
+            n_groups = len(np.unique(firm_group[j_col]))
+            if (len(j_col) == len_prev) and ((n_groups == 1) or (n_groups == n_groups_prev)):
+                # If no observations were dropped and no groups were split, all groups are leave-one-worker-out connected
+                break
+            n_groups_prev = n_groups
+
+        # Find the largest group (ties go to the group with more firms plus workers, then the group found first)
+        cc_table = bpd.bipartitebase._component_table(i_col, j_col, firm_group, recollapse=recollapse)
+        cc_table = cc_table.loc[cc_table.loc[:, 'len'].to_numpy() > 0, :]
+        cc_table = cc_table.iloc[np.argsort(- bpd.bipartitebase._component_size(cc_table, 'firms_plus_workers'), kind='stable'), :]
+        largest_cc = cc_table.index[np.argmax(bpd.bipartitebase._component_size(cc_table, component_size_variable))]
+
+        # Return largest leave-one-worker-out component
+        return frame_init.keep_ids('j', np.where(firm_group == largest_cc)[0], drop_returns_to_stays, is_sorted=True, copy=False)
+
+    def _strong_components_min_moves(self, drop_returns_to_stays=False, is_sorted=False):
+        '''
+        Compute the strongly connected components of firms that remain after repeatedly dropping firms with fewer than 2 moves. Strongly connected components can only split as firms are dropped, so after the first pass, only the components that lose observations are recomputed (using the subgraph induced by their firms), rather than rebuilding the full graph.
+
+        Arguments:
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Set is_sorted to True if dataframe is already sorted.
+
+        Returns:
+            (list of NumPy Arrays): firms in each strongly connected component
+        '''
+        frame = self.sort_rows(is_sorted=is_sorted, copy=not is_sorted)
+        recollapse = isinstance(frame, bpd.BipartiteLongCollapsed)
+
+        i_col = frame.loc[:, 'i'].to_numpy()
+        j_col = frame.loc[:, 'j'].to_numpy()
+        if len(j_col) == 0:
+            # If there are no observations
+            return []
+        n_firms = j_col.max() + 1
+        # Start with all firms in the same component, which must be computed
+        firm_scc = np.zeros(n_firms, dtype=int)
+        update_firms = np.ones(n_firms, dtype=bool)
+
+        while True:
+            ## Update strongly connected components for firms in components that lost observations ##
+            j_next = bpd.util.fast_shift(j_col, -1, fill_value=-2)
+            linkage_rows = (i_col == bpd.util.fast_shift(i_col, -1, fill_value=-2)) & (j_col != j_next)
+            linkage_rows[linkage_rows] = update_firms[j_col[linkage_rows]]
+            linkages = np.stack([j_col[linkage_rows], j_next[linkage_rows]], axis=1)
+            del j_next, linkage_rows
+            scc_update = np.array(Graph(n=n_firms, edges=linkages, directed=True).components(mode='strong').membership, dtype=int)
+            del linkages
+            firm_scc = np.unique(np.where(update_firms, firm_scc.max() + 1 + scc_update, firm_scc), return_inverse=True)[1]
+            del scc_update
+
+            ## Restrict each worker's observations to each strongly connected component ##
+            i_col, j_col = _split_workers_by_group(i_col, j_col, firm_scc)
+
+            ## Remove firms with only 1 mover observation (can have 1 mover with multiple observations) ##
+            n_obs_prev = np.bincount(firm_scc[j_col], minlength=firm_scc.max() + 1)
+            i_col, j_col, _ = _min_moves_arrays(i_col, j_col, n_firms, threshold=2, recollapse=recollapse, drop_returns_to_stays=drop_returns_to_stays)
+            # Components that lost observations must be updated
+            update_cc = (np.bincount(firm_scc[j_col], minlength=len(n_obs_prev)) != n_obs_prev)
+            if not update_cc.any():
+                break
+            update_firms = update_cc[firm_scc]
+            del n_obs_prev, update_cc
+
+        # Group firms by strongly connected component
+        firms = np.unique(j_col)
+        firms_scc = firm_scc[firms]
+        scc_order = np.argsort(firms_scc, kind='stable')
+        firms = firms[scc_order]
+        firms_scc = firms_scc[scc_order]
+
+        return np.split(firms, np.flatnonzero(np.diff(firms_scc)) + 1) if len(firms) > 0 else []
+
     def _construct_firm_linkages(self, is_sorted=False, copy=True):
         '''
         Construct numpy array linking firms by movers, for use with connected components.
@@ -1137,6 +1379,24 @@ class BipartiteLongBase(bpd.BipartiteBase):
 
         return frame
 
+    def lazy(self, drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Start a lazy chain of restrictions, which is only materialized when .collect() is called. Usage:
+            bdf = bdf.lazy().keep_ids('j', firms).min_movers(15).collect()
+
+        Arguments:
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer); applies to every restriction in the chain
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (LazyRestriction): lazy chain of restrictions
+        '''
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read until rows are selected)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
+
+        return bpd.LazyRestriction(frame, drop_returns_to_stays=drop_returns_to_stays)
+
     def min_obs_ids(self, threshold=2, id_col='j', is_sorted=False, copy=True):
         '''
         List column ids with at least `threshold` many observations.
@@ -1359,6 +1619,273 @@ class BipartiteLongBase(bpd.BipartiteBase):
 
         return self.keep_ids('j', keep_ids_list=valid_firms, drop_returns_to_stays=drop_returns_to_stays, is_sorted=is_sorted, reset_index=reset_index, copy=copy)
 
+    def _restrict_codes(self, id_col='j', row_units=False):
+        '''
+        Compute the integer codes used to count and peel ids in .restrict(), .threshold_profile(), and bpd.LazyRestriction. Since restrictions always drop entire ids, rows are grouped into units (consecutive rows with the same worker, firm, and id from `id_col`), and peeling is computed on units rather than rows. Dataframe must be sorted.
+
+        Arguments:
+            id_col (str): column to check ids for minimum number of observations ('i', 'j', or 'g')
+            row_units (bool): if True, each row is its own unit (use this if rows may be dropped in ways that split units)
+
+        Returns:
+            (dict): dictionary linking 'i', 'j', and 'id' to integer codes for each unit; 'weights' to the number of rows in each unit; 'n_firms' and 'n_ids' to the number of unique firms and ids; 'match' to integer codes of worker-firm matches for each unit; 'match_firms' to the firm code of each worker-firm match; and 'recollapse' to whether the data must be recollapsed as observations are dropped
+        '''
+        n_rows = len(self)
+        # Since data is sorted by worker, worker codes can be computed without hashing or sorting
+        i_col = self.loc[:, 'i'].to_numpy()
+        i_codes = np.cumsum(i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2)) - 1
+        del i_col
+        j_codes, j_uniques = pd.factorize(self.loc[:, 'j'].to_numpy())
+        n_firms = len(j_uniques)
+        del j_uniques
+        if id_col == 'i':
+            id_codes, n_ids = i_codes, (i_codes[-1] + 1 if n_rows > 0 else 0)
+        elif id_col == 'j':
+            id_codes, n_ids = j_codes, n_firms
+        else:
+            id_codes, id_uniques = pd.factorize(self.loc[:, id_col].to_numpy())
+            n_ids = len(id_uniques)
+            del id_uniques
+
+        ## Units ##
+        if row_units:
+            weights = np.ones(n_rows, dtype=int)
+        else:
+            new_unit = (i_codes != bpd.util.fast_shift(i_codes, 1, fill_value=-2)) | (j_codes != bpd.util.fast_shift(j_codes, 1, fill_value=-2)) | (id_codes != bpd.util.fast_shift(id_codes, 1, fill_value=-2))
+            unit_starts = np.flatnonzero(new_unit)
+            del new_unit
+            weights = np.diff(np.append(unit_starts, n_rows))
+            i_codes = i_codes[unit_starts]
+            j_codes = j_codes[unit_starts]
+            id_codes = id_codes[unit_starts]
+            del unit_starts
+
+        # Worker-firm matches (used to count unique workers at each firm)
+        match_codes, match_uniques = pd.factorize(i_codes.astype(np.int64, copy=False) * n_firms + j_codes)
+        match_firms = match_uniques % n_firms
+        del match_uniques
+
+        return {
+            'i': i_codes,
+            'j': j_codes,
+            'id': id_codes,
+            'weights': weights,
+            'n_firms': n_firms,
+            'n_ids': n_ids,
+            'match': match_codes,
+            'match_firms': match_firms,
+            # Collapsed data with returns must be recollapsed as observations are dropped
+            'recollapse': (isinstance(self, bpd.BipartiteLongCollapsed) and (not self.no_returns))
+        }
+
+    def _restrict_units(self, codes, units, min_obs=None, min_workers=None, min_moves=None, min_movers=None, drop_returns_to_stays=False):
+        '''
+        Starting from a subset of units, repeatedly count ids using bincount and peel off units with ids that fail any restriction, until a joint fixed point is reached. Dataframe must be sorted.
+
+        Arguments:
+            codes (dict): integer codes computed by ._restrict_codes()
+            units (NumPy Array): units to start peeling from
+            min_obs (int or None): minimum number of observations required to keep an id; None is equivalent to no restriction
+            min_workers (int or None): minimum number of workers required to keep a firm; None is equivalent to no restriction
+            min_moves (int or None): minimum number of moves required to keep a firm; None is equivalent to no restriction
+            min_movers (int or None): minimum number of movers required to keep a firm; None is equivalent to no restriction
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing
+
+        Returns:
+            (tuple of NumPy Arrays): (units that are kept; worker code of each spell; firm code of each spell; number of observations in each spell; number of move observations in each spell), where spells are computed on the units that are kept
+        '''
+        i_codes, j_codes, id_codes, weights = codes['i'], codes['j'], codes['id'], codes['weights']
+        n_firms, n_ids = codes['n_firms'], codes['n_ids']
+        match_codes, match_firms = codes['match'], codes['match_firms']
+        n_matches = len(match_firms)
+        recollapse = codes['recollapse']
+
+        while True:
+            if len(units) == 0:
+                return units, units, units, units, units
+
+            # Consecutive units with the same worker and firm form a spell (this happens when the units between them are dropped)
+            i_units = i_codes[units]
+            j_units = j_codes[units]
+            new_spell = (i_units != bpd.util.fast_shift(i_units, 1, fill_value=-2)) | (j_units != bpd.util.fast_shift(j_units, 1, fill_value=-2))
+            del i_units, j_units
+            if recollapse and drop_returns_to_stays and (not new_spell.all()):
+                # Drop returns that turned into stays (i.e. only keep spells of size 1), as in .recollapse()
+                units = units[new_spell & np.append(new_spell[1:], True)]
+                continue
+            spell_starts = np.flatnonzero(new_spell)
+            spell_units = units[spell_starts]
+            i_spells = i_codes[spell_units]
+            j_spells = j_codes[spell_units]
+            if recollapse:
+                # Spells that must be recollapsed count as a single observation
+                obs_units = new_spell.astype(int, copy=False)
+                obs_spells = np.ones(len(spell_starts), dtype=int)
+            else:
+                obs_units = weights[units]
+                obs_spells = np.add.reduceat(obs_units, spell_starts)
+            del new_spell, spell_starts
+
+            # Compute 'm' as in .gen_m() (consecutive spells for the same worker are at different firms, so the first observation in a spell is a move if the worker has an earlier spell, and the last observation is a move if the worker has a later spell)
+            moves_spells = np.minimum((i_spells == bpd.util.fast_shift(i_spells, 1, fill_value=-2)).astype(int, copy=False) + (i_spells == bpd.util.fast_shift(i_spells, -1, fill_value=-2)), obs_spells)
+
+            # Firms that meet the firm restrictions
+            keep_firms = np.ones(n_firms, dtype=bool)
+            if min_workers is not None:
+                # Count each worker-firm match once
+                n_workers = np.bincount(match_firms, weights=(np.bincount(match_codes[spell_units], minlength=n_matches) > 0), minlength=n_firms)
+                keep_firms &= (n_workers >= min_workers)
+            if min_moves is not None:
+                n_moves = np.bincount(j_spells, weights=moves_spells, minlength=n_firms)
+                keep_firms &= (n_moves >= min_moves)
+            if min_movers is not None:
+                # Count each worker-firm match with a move once
+                n_movers = np.bincount(match_firms, weights=(np.bincount(match_codes[spell_units[moves_spells > 0]], minlength=n_matches) > 0), minlength=n_firms)
+                keep_firms &= (n_movers >= min_movers)
+            del spell_units
+            keep_units = keep_firms[j_codes[units]]
+
+            if min_obs is not None:
+                # Ids that meet the observation restriction
+                keep_ids = (np.bincount(id_codes[units], weights=obs_units, minlength=n_ids) >= min_obs)
+                keep_units &= keep_ids[id_codes[units]]
+            del obs_units
+
+            if keep_units.all():
+                # Joint fixed point reached
+                return units, i_spells, j_spells, obs_spells, moves_spells
+            units = units[keep_units]
+
+    def _restrict_rows(self, codes, units):
+        '''
+        Convert units from ._restrict_codes() into rows.
+
+        Arguments:
+            codes (dict): integer codes computed by ._restrict_codes()
+            units (NumPy Array): units to convert
+
+        Returns:
+            (NumPy Array): rows included in units
+        '''
+        keep_units = np.zeros(len(codes['weights']), dtype=bool)
+        keep_units[units] = True
+
+        return np.flatnonzero(np.repeat(keep_units, codes['weights']))
+
+    def restrict(self, min_obs=None, min_workers=None, min_moves=None, min_movers=None, id_col='j', drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Return dataframe where all given restrictions hold jointly. Chaining .min_obs_frame(), .min_workers_frame(), .min_moves_frame(), and .min_movers_frame() materializes a new dataframe (recollapsing and recomputing 'm') on every pass, and the chain can stop before all restrictions hold at once. Instead, this method recomputes counts on integer arrays using bincount, peels off ids that fail any restriction, and repeats until a joint fixed point is reached. The dataframe is then materialized once. Since dropping observations can only lower counts, the result is the largest subset of the data that meets all restrictions, regardless of the order in which restrictions are applied.
+
+        Arguments:
+            min_obs (int or None): minimum number of observations required to keep an id from `id_col`; None is equivalent to no restriction
+            min_workers (int or None): minimum number of workers required to keep a firm; None is equivalent to no restriction
+            min_moves (int or None): minimum number of moves required to keep a firm; None is equivalent to no restriction
+            min_movers (int or None): minimum number of movers required to keep a firm; None is equivalent to no restriction
+            id_col (str): column to check ids for `min_obs` ('i', 'j', or 'g'). Use general column names for joint columns, e.g. put 'j' instead of 'j1', 'j2'.
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Returned dataframe will be sorted. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (BipartiteLongBase): dataframe where all restrictions hold jointly
+        '''
+        self.log('restricting data to jointly meet minimum thresholds', level='info')
+
+        if (min_obs is None) and (min_workers is None) and (min_moves is None) and (min_movers is None):
+            # If no restrictions
+            if copy:
+                return self.copy()
+            return self
+
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read until rows are selected)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
+
+        # Peel until a joint fixed point
+        codes = frame._restrict_codes(id_col=id_col)
+        units = frame._restrict_units(codes, np.arange(len(codes['weights'])), min_obs=min_obs, min_workers=min_workers, min_moves=min_moves, min_movers=min_movers, drop_returns_to_stays=drop_returns_to_stays)[0]
+        rows = frame._restrict_rows(codes, units)
+
+        ## Materialize ##
+        frame = frame.iloc[rows]
+        if codes['recollapse']:
+            frame = frame.recollapse(drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+        # Recompute 'm' since it might change from dropping observations or from re-collapsing
+        frame = frame.gen_m(force=True, copy=False)
+        frame.reset_index(drop=True, inplace=True)
+
+        return frame
+
+    def threshold_profile(self, kind='movers', thresholds=range(1, 51), id_col='j', connectedness=None, component_size_variable='firms', drop_returns_to_stays=False, is_sorted=False, copy=True):
+        '''
+        Compute how much data survives a minimum threshold restriction, for each of a set of thresholds. Since the data that survives a higher threshold is a subset of the data that survives a lower threshold, thresholds are processed in increasing order and each is peeled (as in .restrict()) starting from the data that survived the previous threshold, in the same way k-cores of a graph are computed. This means the full sweep costs about as much as applying a single threshold.
+
+        Arguments:
+            kind (str): which restriction to apply; options are 'obs' (minimum number of observations per id from `id_col`, as in .min_obs_frame()), 'workers' (minimum number of workers per firm, as in .min_workers_frame()), 'moves' (minimum number of moves per firm, as in .min_moves_frame()), and 'movers' (minimum number of movers per firm, as in .min_movers_frame())
+            thresholds (list of ints): thresholds to evaluate
+            id_col (str): column to check ids for minimum number of observations ('i', 'j', or 'g'); used only if `kind` is 'obs'
+            connectedness (str or None): if not None, also compute the size of the largest connected set of the surviving data at each threshold (see .clean() for options); this requires materializing the data at each threshold, so it is considerably more expensive
+            component_size_variable (str): how to determine largest connected component (see .clean() for options); used only if `connectedness` is not None
+            drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
+            is_sorted (bool): if False, dataframe will be sorted by i (and t, if included). Sorting may alter original dataframe if copy is set to False. Set is_sorted to True if dataframe is already sorted.
+            copy (bool): if False, avoid copy
+
+        Returns:
+            (Pandas DataFrame): dataframe indexed by threshold (sorted in increasing order), with columns 'n_firms', 'n_workers', 'n_movers', and 'n_rows' giving the number of firms, workers, movers, and observations that survive each threshold (and, if `connectedness` is not None, 'n_firms_connected', 'n_workers_connected', 'n_movers_connected', and 'n_rows_connected' giving the same values for the largest connected set)
+        '''
+        kind_dict = {
+            'obs': 'min_obs',
+            'workers': 'min_workers',
+            'moves': 'min_moves',
+            'movers': 'min_movers'
+        }
+        if kind not in kind_dict.keys():
+            raise NotImplementedError(f'Threshold kind {kind!r} is invalid: it must be one of {list(kind_dict.keys())!r}.')
+
+        self.log(f'computing threshold profile for {kind!r}', level='info')
+
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read until rows are selected)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
+        thresholds = np.unique(thresholds)
+
+        codes = frame._restrict_codes(id_col=id_col)
+        n_workers = (codes['i'].max() + 1) if len(codes['i']) > 0 else 0
+        n_firms = codes['n_firms']
+
+        # Results for each threshold
+        res_cols = ['n_firms', 'n_workers', 'n_movers', 'n_rows']
+        if connectedness is not None:
+            res_cols += [f'{res_col}_connected' for res_col in res_cols]
+        res_dict = {res_col: np.zeros(len(thresholds), dtype=int) for res_col in res_cols}
+
+        # Units that survive the current threshold
+        units = np.arange(len(codes['weights']))
+        for k, threshold in enumerate(thresholds):
+            # Peel starting from the units that survived the previous threshold
+            units, i_spells, j_spells, obs_spells, moves_spells = frame._restrict_units(codes, units, drop_returns_to_stays=drop_returns_to_stays, **{kind_dict[kind]: threshold})
+            if len(units) == 0:
+                # No data survives this threshold or any higher threshold
+                break
+            res_dict['n_firms'][k] = np.count_nonzero(np.bincount(j_spells, minlength=n_firms))
+            res_dict['n_workers'][k] = np.count_nonzero(np.bincount(i_spells, minlength=n_workers))
+            res_dict['n_movers'][k] = np.count_nonzero(np.bincount(i_spells[moves_spells > 0], minlength=n_workers))
+            res_dict['n_rows'][k] = obs_spells.sum()
+
+            if connectedness is not None:
+                ## Largest connected set ##
+                frame_k = frame.iloc[frame._restrict_rows(codes, units)]
+                if codes['recollapse']:
+                    frame_k = frame_k.recollapse(drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+                frame_k = frame_k.gen_m(force=True, copy=False)
+                frame_k.reset_index(drop=True, inplace=True)
+                frame_k = frame_k._connected_components(connectedness=connectedness, component_size_variable=component_size_variable, drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+                res_dict['n_firms_connected'][k] = frame_k.n_firms()
+                res_dict['n_workers_connected'][k] = frame_k.n_workers()
+                res_dict['n_movers_connected'][k] = frame_k.loc[frame_k.loc[:, 'm'].to_numpy() > 0, 'i'].nunique()
+                res_dict['n_rows_connected'][k] = len(frame_k)
+                del frame_k
+
+        return pd.DataFrame(res_dict, index=pd.Index(thresholds, name='threshold'))
+
     def construct_artificial_time(self, time_per_worker=False, is_sorted=False, copy=True):
         '''
         Construct artificial time column(s) to enable conversion to (collapsed) event study format. Only adds column(s) if time column(s) not already included.
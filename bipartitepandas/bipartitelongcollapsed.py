@@ -73,7 +73,7 @@ class BipartiteLongCollapsed(bpd.BipartiteLongBase):
 
     def recollapse(self, drop_returns_to_stays=False, is_sorted=False, copy=True):
         '''
-        Recollapse data by job spells (so each spell for a particular worker at a particular firm is one observation). This method is necessary in the case of biconnected data - it can occur that a worker works at firms A and B in the order A B A, but the biconnected components removes firm B. So the data is now A A, and needs to be recollapsed so this is marked as a stayer.
+        Recollapse data by job spells (so each spell for a particular worker at a particular firm is one observation). This method is necessary in the case of biconnected data - it can occur that a worker works at firms A and B in the order A B A, but the biconnected components removes firm B. So the data is now A A, and needs to be recollapsed so this is marked as a stayer. Only spells that must be recollapsed are re-aggregated, and 'm' is only recomputed for workers with recollapsed spells; all other observations are kept as is.
 
         Arguments:
             drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer)
@@ -93,152 +93,151 @@ class BipartiteLongCollapsed(bpd.BipartiteLongBase):
         if frame.no_returns:
             return frame
 
-        # Generate spell ids
-        spell_ids = frame._get_spell_ids(is_sorted=True, copy=False)
+        # Find which observations start a new spell
+        i_col = frame.loc[:, 'i'].to_numpy()
+        j_col = frame.loc[:, 'j'].to_numpy()
+        new_spell = (i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2)) | (j_col != bpd.util.fast_shift(j_col, 1, fill_value=-2))
 
         # Quickly check whether a recollapse is necessary
-        if (len(frame) < 2) or (spell_ids[-1] == len(frame)):
+        if new_spell.all():
             return frame
 
-        # Indicator if must re-recollapse
-        recursion = False
-
         if drop_returns_to_stays:
-            ## Drop returns that turned into stays (i.e. only keep spells of size 1) ##
-            # Aggregate at the spell level
-            spells = frame.groupby(spell_ids, sort=False)
-
-            data_spell = frame.loc[spells['i'].transform('size').to_numpy() == 1, :]
-            if len(data_spell) < len(frame):
-                # If recollapsed, it's possible another recollapse might be necessary
-                recursion = True
+            ## Drop returns that turned into stays (i.e. only keep spells of size 1), looping since dropping observations can create new spells to drop ##
+            keep_rows = np.arange(len(frame))
+            while not new_spell.all():
+                # Spells of size 1 start a spell and are followed by the start of a new spell
+                keep_rows = keep_rows[new_spell & np.append(new_spell[1:], True)]
+                i_keep = i_col[keep_rows]
+                j_keep = j_col[keep_rows]
+                new_spell = (i_keep != bpd.util.fast_shift(i_keep, 1, fill_value=-2)) | (j_keep != bpd.util.fast_shift(j_keep, 1, fill_value=-2))
+            del i_keep, j_keep
+
+            # Workers with dropped observations
+            drop_rows = np.ones(len(frame), dtype=bool)
+            drop_rows[keep_rows] = False
+            recollapsed_workers = i_col[drop_rows]
+            del drop_rows
+
+            frame = frame.iloc[keep_rows]
+            frame.reset_index(drop=True, inplace=True)
         else:
             ### If recollapse necessary ###
-            # Dictionary linking columns to how they should be aggregated
-            agg_funcs = {}
-
-            # Keep track of user-added columns
-            user_added_cols = {}
+            ## Find observations in spells that must be recollapsed ##
+            spell_ids = np.cumsum(new_spell) - 1
+            recollapse_rows = np.flatnonzero(np.bincount(spell_ids)[spell_ids] > 1)
+            # Where each recollapsed spell starts (within recollapse_rows)
+            recollapse_starts = np.flatnonzero(new_spell[recollapse_rows])
+            # Row of each recollapsed spell in the recollapsed frame
+            recollapse_spells = spell_ids[recollapse_rows[recollapse_starts]]
+            recollapsed_workers = i_col[recollapse_rows[recollapse_starts]]
+            # Pandas groupby, only used for aggregations that can't be computed with NumPy reductions
+            recollapse_groups = spell_ids[recollapse_rows]
+            del spell_ids
 
             ## Correctly weight ##
             # If weight column exists
             weighted = frame._col_included('w')
-
             if weighted:
-                ## Initial preparation if weighted ##
-                w = frame.loc[:, 'w'].to_numpy()
-                # Keep track of new, weighted columns
-                weighted_cols = []
-                for col in frame._included_cols():
-                    if (col == 't') or (frame.col_collapse_dict[col] is None):
-                        # If time, skip this column; if None, drop this column
-                        pass
-                    else:
-                        # If not time column
-                        aggfunc = frame.col_collapse_dict[col]
-                        if aggfunc == 'mean':
-                            # If column can be weighted, weight it
-                            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                                with bpd.util.ChainedAssignment():
-                                    frame.loc[:, subcol + '_weighted'] = w * frame.loc[:, subcol].to_numpy()
-                                weighted_cols.append(subcol + '_weighted')
-                        elif aggfunc in ['var', 'std']:
-                            # Variance and standard deviation can't be computed
-                            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                                frame.loc[:, subcol + '_weighted'] = np.nan
-                                weighted_cols.append(subcol + '_weighted')
-
-            ## Aggregate at the spell level ##
-            spells = frame.groupby(spell_ids, sort=False)
+                w = frame.loc[:, 'w'].to_numpy()[recollapse_rows]
 
-            # First, prepare non-time columns for aggregation
-            default_cols = frame.columns_req + frame.columns_opt
+            ## Aggregate recollapsed spells ##
+            # Dictionary linking columns to their aggregated data
+            data_spell = {}
+            # Keep track of columns that should be dropped
+            drop_cols = []
             for col in frame._included_cols():
-                if (col == 't') or (frame.col_collapse_dict[col] is None):
-                    # If time, skip this column; if None, drop this column
-                    pass
-                else:
-                    # If not time column
-                    aggfunc = frame.col_collapse_dict[col]
-                    if weighted and (aggfunc == 'mean'):
-                        # If column should be weighted
-                        for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                            agg_funcs[subcol] = pd.NamedAgg(column=subcol + '_weighted', aggfunc='sum')
-                    elif weighted and (aggfunc in ['var', 'std']):
-                        # Variance and standard deviation can't be computed
-                        for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                            agg_funcs[subcol] = pd.NamedAgg(column=subcol + '_weighted', aggfunc='first')
-                    else:
-                        # Unweighted column
-                        for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                            agg_funcs[subcol] = pd.NamedAgg(column=subcol, aggfunc=aggfunc)
-                    if col not in default_cols:
-                        # User-added columns
-                        user_added_cols[col] = frame.col_reference_dict[col]
-
-            # Next, prepare the time column for aggregation
-            if self._col_included('t'):
-                agg_funcs['t1'] = pd.NamedAgg(column='t1', aggfunc='min')
-                agg_funcs['t2'] = pd.NamedAgg(column='t2', aggfunc='max')
-
-            # Next, prepare the weight column for aggregation
+                if col == 't':
+                    # Time column
+                    data_spell['t1'] = bpd.util.segment_agg(frame.loc[:, 't1'].to_numpy()[recollapse_rows], recollapse_starts, 'min')
+                    data_spell['t2'] = bpd.util.segment_agg(frame.loc[:, 't2'].to_numpy()[recollapse_rows], recollapse_starts, 'max')
+                    continue
+                aggfunc = frame.col_collapse_dict[col]
+                if aggfunc is None:
+                    # If None, drop this column
+                    drop_cols += bpd.util.to_list(frame.col_reference_dict[col])
+                elif aggfunc != 'first':
+                    # If 'first', the first observation in each spell already has the correct value
+                    for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                        col_data = frame.loc[:, subcol].iloc[recollapse_rows]
+                        if weighted and (aggfunc in ['var', 'std']):
+                            # Variance and standard deviation can't be computed
+                            data_spell[subcol] = np.full(len(recollapse_starts), np.nan)
+                        elif isinstance(aggfunc, str) and (aggfunc in ['last', 'sum', 'min', 'max', 'mean', 'var', 'std', 'size']) and isinstance(col_data.dtype, np.dtype) and ((aggfunc in ['last', 'size']) or np.issubdtype(col_data.dtype, np.number) or (col_data.dtype == bool)) and (not col_data.isna().any()):
+                            # If column can be aggregated using NumPy reductions
+                            data_spell[subcol] = bpd.util.segment_agg(col_data.to_numpy(), recollapse_starts, aggfunc, weights=(w if (weighted and (aggfunc == 'mean')) else None))
+                        elif weighted and (aggfunc == 'mean'):
+                            # Otherwise, if column should be weighted, use Pandas to compute the weighted mean (skipping NaNs)
+                            data_spell[subcol] = pd.Series(w * col_data.to_numpy()).groupby(recollapse_groups, sort=False).sum().to_numpy() / bpd.util.segment_agg(w, recollapse_starts, 'sum')
+                        else:
+                            # Otherwise, use Pandas
+                            data_spell[subcol] = col_data.groupby(recollapse_groups, sort=False).agg(aggfunc).to_numpy()
             if not weighted:
-                agg_funcs['w'] = pd.NamedAgg(column='i', aggfunc='size')
+                # Weight by the number of observations in each spell
+                data_spell['w'] = np.diff(np.append(recollapse_starts, len(recollapse_rows)))
+            del recollapse_rows, recollapse_starts, recollapse_groups
 
-            # Aggregate columns
-            data_spell = spells.agg(**agg_funcs)
+            self.log('recollapsed spells aggregated', level='info')
 
-            # Finally, normalize weighted columns
-            if weighted:
-                w_sum = data_spell.loc[:, 'w'].to_numpy()
-                for col in frame._included_cols():
-                    if (col == 't') or (frame.col_collapse_dict[col] is None):
-                        # If time, skip this column; if None, drop this column
-                        pass
+            ## Splice recollapsed spells into the first observation of each spell ##
+            frame = frame.loc[new_spell, :]
+            frame.reset_index(drop=True, inplace=True)
+            with bpd.util.ChainedAssignment():
+                if drop_cols:
+                    frame = pd.DataFrame.drop(frame, drop_cols, axis=1, inplace=False)
+                for subcol, subcol_data in data_spell.items():
+                    if subcol not in frame.columns:
+                        # Unweighted data has weight 1 for each observation
+                        col_data = np.ones(len(frame), dtype=subcol_data.dtype)
                     else:
-                        # If not time column
-                        aggfunc = frame.col_collapse_dict[col]
-                        if aggfunc == 'mean':
-                            # If column should be normalized
-                            for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                                data_spell.loc[:, subcol] /= w_sum
-                with bpd.util.ChainedAssignment():
-                    # Drop added columns
-                    frame = frame.drop(weighted_cols, axis=1, inplace=True)
-
-        # Sort columns
-        sorted_cols = bpd.util._sort_cols(data_spell.columns)
-        data_spell = data_spell.reindex(sorted_cols, axis=1, copy=False)
-        data_spell.reset_index(drop=True, inplace=True)
-
-        self.log('data aggregated at the spell level', level='info')
-
-        collapsed_frame = bpd.BipartiteLongCollapsed(data_spell, col_reference_dict=user_added_cols, log=frame._log_on_indicator)
-        collapsed_frame._set_attributes(self, no_dict=False)
-
-        for col, col_collapse in frame.col_collapse_dict.items():
-            # Remove dropped columns from attribute dictionaries
-            # NOTE: this must iterate over frame's dictionary, not collapsed_frame's dictionary, otherwise it raises an error
-            if col_collapse is None:
-                # If column should be dropped during collapse
-                del collapsed_frame.col_dtype_dict[col]
-                del collapsed_frame.col_collapse_dict[col]
-                del collapsed_frame.col_long_es_dict[col]
-                if col in collapsed_frame.columns_contig.keys():
-                    # If column is categorical
-                    del collapsed_frame.columns_contig[col]
-                    if collapsed_frame.id_reference_dict:
-                        # If linking contiguous ids to original ids
-                        del collapsed_frame.id_reference_dict[col]
-
-        # m can change from collapsing
-        collapsed_frame = collapsed_frame.gen_m(force=True, copy=False)
+                        col_data = frame.loc[:, subcol].to_numpy()
+                        if not isinstance(frame.loc[:, subcol].dtype, np.dtype):
+                            # Pandas datatypes must be set using Pandas
+                            frame.iloc[recollapse_spells, frame.columns.get_loc(subcol)] = subcol_data
+                            continue
+                        col_data = col_data.astype(np.result_type(col_data.dtype, subcol_data.dtype), copy=True)
+                    col_data[recollapse_spells] = subcol_data
+                    frame.loc[:, subcol] = col_data
+
+            for col, col_collapse in self.col_collapse_dict.items():
+                # Remove dropped columns from attribute dictionaries
+                # NOTE: this must iterate over self's dictionary, not frame's dictionary, otherwise it raises an error
+                if col_collapse is None:
+                    # If column should be dropped during collapse
+                    del frame.col_dtype_dict[col]
+                    del frame.col_collapse_dict[col]
+                    del frame.col_long_es_dict[col]
+                    if col in frame.columns_contig.keys():
+                        # If column is categorical
+                        del frame.columns_contig[col]
+                        if frame.id_reference_dict:
+                            # If linking contiguous ids to original ids
+                            del frame.id_reference_dict[col]
 
-        if recursion:
-            self.log('must re-collapse again', level='info')
-            return collapsed_frame.recollapse(drop_returns_to_stays=drop_returns_to_stays, is_sorted=True, copy=False)
+            # Sort columns
+            frame = frame.sort_cols(copy=False)
+
+        self.log('data recollapsed at the spell level', level='info')
+
+        ## m can change from recollapsing, but only for workers with recollapsed spells ##
+        if frame._col_included('m'):
+            i_col = frame.loc[:, 'i'].to_numpy()
+            # Workers are sorted, so their observations are contiguous
+            recollapsed_rows = np.zeros(len(frame) + 1, dtype=int)
+            recollapsed_workers = np.unique(recollapsed_workers)
+            recollapsed_rows[np.searchsorted(i_col, recollapsed_workers, side='left')] += 1
+            recollapsed_rows[np.searchsorted(i_col, recollapsed_workers, side='right')] -= 1
+            recollapsed_rows = np.flatnonzero(np.cumsum(recollapsed_rows[:-1]) > 0)
+            i_col = i_col[recollapsed_rows]
+            j_col = frame.loc[:, 'j'].to_numpy()[recollapsed_rows]
+            m = frame.loc[:, 'm'].to_numpy().copy()
+            m[recollapsed_rows] = ((i_col == bpd.util.fast_shift(i_col, 1, fill_value=-2)) & (j_col != bpd.util.fast_shift(j_col, 1, fill_value=-2))).astype(int, copy=False) + ((i_col == bpd.util.fast_shift(i_col, -1, fill_value=-2)) & (j_col != bpd.util.fast_shift(j_col, -1, fill_value=-2))).astype(int, copy=False)
+            with bpd.util.ChainedAssignment():
+                frame.loc[:, 'm'] = m
+        else:
+            frame = frame.gen_m(force=True, copy=False)
 
-        return collapsed_frame
+        return frame
 
     def uncollapse(self, drop_no_collapse_columns=True, is_sorted=False, copy=True):
         '''
@@ -370,93 +369,86 @@ class BipartiteLongCollapsed(bpd.BipartiteLongBase):
         if order not in ['sequential', 'income']:
             raise ValueError(f"`order` must be either 'sequential' or 'income', but input specifies {order!r}.")
 
-        # Sort and copy
-        frame = self.sort_rows(is_sorted=is_sorted, copy=copy)
+        # Sort and copy (if already sorted, no copy is necessary since the frame is only read)
+        frame = self.sort_rows(is_sorted=is_sorted, copy=(copy and (not is_sorted)))
 
-        # Split workers by movers and stayers
+        ## Find the pairs of observations that make up the event study ##
+        # Since there are no returns, each pair of observations drawn from a mover is a move between two distinct firms, so the pairs can be generated directly from each worker's observations: stayers generate one row per observation, while each mover observation is paired with every later observation from the same worker
         worker_m = frame.get_worker_m(is_sorted=True)
-        stayers = pd.DataFrame(frame.loc[~worker_m, :])
-        movers = pd.DataFrame(frame.loc[worker_m, :])
+        i_col = frame.loc[:, 'i'].to_numpy()
+        n_obs = len(i_col)
+        # Per-worker offsets
+        worker_starts = np.flatnonzero(i_col != bpd.util.fast_shift(i_col, 1, fill_value=-2))
+        worker_sizes = np.diff(np.append(worker_starts, n_obs))
+        worker_id = np.repeat(np.arange(len(worker_starts)), worker_sizes)
+        # Number of later observations for each observation's worker
+        n_later = np.repeat(worker_starts + worker_sizes, worker_sizes) - np.arange(n_obs) - 1
+        # Number of event study rows generated by each observation (stayers generate a single row)
+        n_rows = np.where(worker_m, n_later, 1)
+        del n_later
         frame.log('workers split by movers and stayers', level='info')
 
-        ## Figure out new indices for permutations ##
+        # Combinatorial index arithmetic: observation a is paired with observations a + 1, ..., a + n_rows[a], in sequential order
+        idx_1 = np.repeat(np.arange(n_obs), n_rows)
+        row_starts = np.cumsum(n_rows) - n_rows
+        idx_2 = idx_1 + worker_m[idx_1] * (np.arange(len(idx_1)) - np.repeat(row_starts, n_rows) + 1)
+        del n_rows, row_starts
+
         if order == 'income':
-            # Sort workers by average income
-            with bpd.util.ChainedAssignment():
-                if frame._col_included('w'):
-                    movers.loc[:, 'weighted_y'] = movers.loc[:, 'w'].to_numpy() * movers.loc[:, 'y'].to_numpy()
-                    movers['mean_y'] = movers.groupby('i')['weighted_y'].transform('sum') / movers.groupby('i')['w'].transform('sum')
-                    movers.drop('weighted_y', axis=1, inplace=True)
-                else:
-                    movers['mean_y'] = movers.groupby('i')['y'].transform('mean')
-                movers.sort_values('mean_y', inplace=True)
-                movers.drop('mean_y', axis=1, inplace=True)
-
-        # Initial data construction
-        j = movers.loc[:, 'j'].to_numpy()
-        idx = np.arange(len(movers))
-        idx_1 = np.array([], dtype=int)
-        idx_2 = np.array([], dtype=int)
-
-        # Construct graph
-        G, _ = frame._construct_graph(connectedness='leave_out_observation', is_sorted=True, copy=False)
-
-        for j1 in range(self.n_firms()):
-            ### Iterate over all firms ###
-            # Find workers who worked at firm j1
-            obs_in_j1 = (j == j1)
-            movers.loc[:, 'obs_in_j1'] = obs_in_j1
-            i_in_j1 = movers.groupby('i', sort=False)['obs_in_j1'].transform('max').to_numpy()
-            # Take subset of data for workers who worked at firm j1
-            movers_j1 = movers.loc[i_in_j1, :]
-            j_j1 = j[i_in_j1]
-            idx_j1 = idx[i_in_j1]
-            # For each firm, find its neighboring firms
-            j1_neighbors = G.neighborhood(j1, order=2, mindist=2)
-            for j2 in j1_neighbors:
-                ### Iterate over all neighbors ###
-                if j2 > j1:
-                    ## Account for symmetry by estimating only if j2 > j1 ##
-                    # Find workers who worked at both firms j1 and j2
-                    obs_in_j2 = (j_j1 == j2)
-                    with bpd.util.ChainedAssignment():
-                        movers_j1.loc[:, 'obs_in_j2'] = obs_in_j2
-                    i_in_j2 = movers_j1.groupby('i', sort=False)['obs_in_j2'].transform('max').to_numpy()
-                    # Take subsets of data for workers who worked at both firms j1 and j2
-                    j_j12 = j_j1[i_in_j2]
-                    idx_j12 = idx_j1[i_in_j2]
-                    # Take subsets of data specifically for firms j1 and j2
-                    is_j12 = (j_j12 == j1) | (j_j12 == j2)
-                    j_j12 = j_j12[is_j12]
-                    idx_j12 = idx_j12[is_j12]
-                    # Split data for j1 and j2
-                    idx_j11 = idx_j12[j_j12 == j1]
-                    idx_j22 = idx_j12[j_j12 == j2]
-                    # Split observations into entering/exiting groups
-                    if order == 'sequential':
-                        j_j12_first = j_j12[np.arange(len(j_j12)) % 2 == 0]
-                        entering = (j_j12_first == j2)
-                        exiting = (j_j12_first == j1)
-                    elif order == 'income':
-                        if len(idx_j11) % 2 == 0:
-                            halfway = len(idx_j11) // 2
-                        else:
-                            halfway = len(idx_j11) // 2 + rng.binomial(n=1, p=0.5)
-                        entering = (np.arange(len(idx_j11)) < halfway)
-                        exiting = (np.arange(len(idx_j11)) >= halfway)
-                    # Append new indices
-                    idx_1 = np.append(idx_1, idx_j11[exiting])
-                    idx_1 = np.append(idx_1, idx_j22[entering])
-                    idx_2 = np.append(idx_2, idx_j22[exiting])
-                    idx_2 = np.append(idx_2, idx_j11[entering])
-
-        ## Add lagged values ##
-        movers_permuted = pd.DataFrame()
+            ## Split moves between each pair of firms into entering/exiting groups based on the average income of the worker ##
+            # Average income of each worker
+            y_col = frame.loc[:, 'y'].to_numpy()
+            if frame._col_included('w'):
+                w_col = frame.loc[:, 'w'].to_numpy()
+                mean_y = np.bincount(worker_id, weights=w_col * y_col) / np.bincount(worker_id, weights=w_col)
+                del w_col
+            else:
+                mean_y = np.bincount(worker_id, weights=y_col) / worker_sizes
+            del y_col
+            # Rank workers by average income
+            income_rank = np.empty(len(mean_y), dtype=int)
+            income_rank[np.argsort(mean_y, kind='stable')] = np.arange(len(mean_y))
+            del mean_y
+            # Moves between distinct firms
+            is_move = (idx_1 != idx_2)
+            move_rows = np.flatnonzero(is_move)
+            j_col = frame.loc[:, 'j'].to_numpy()
+            j_a = j_col[idx_1[move_rows]]
+            j_b = j_col[idx_2[move_rows]]
+            del j_col
+            j_lo = np.minimum(j_a, j_b)
+            j_hi = np.maximum(j_a, j_b)
+            # Group moves by firm pair, ordering moves within each firm pair by the worker's average income
+            move_order = np.lexsort((income_rank[worker_id[idx_1[move_rows]]], j_hi, j_lo))
+            j_lo = j_lo[move_order]
+            j_hi = j_hi[move_order]
+            pair_starts = np.flatnonzero((j_lo != bpd.util.fast_shift(j_lo, 1, fill_value=-2)) | (j_hi != bpd.util.fast_shift(j_hi, 1, fill_value=-2)))
+            pair_sizes = np.diff(np.append(pair_starts, len(move_order)))
+            # The lower half of each group (by income) enters the firm with the lower id, while the upper half exits it; for groups of odd size, the middle move is assigned randomly, with all draws made in a single batch
+            halfway = pair_sizes // 2 + (pair_sizes % 2) * rng.binomial(n=1, p=0.5, size=len(pair_sizes))
+            entering = (np.arange(len(move_order)) - np.repeat(pair_starts, pair_sizes)) < np.repeat(halfway, pair_sizes)
+            del j_lo, j_hi, pair_starts, pair_sizes, halfway
+            # Entering moves start at the firm with the higher id
+            move_rows = move_rows[move_order]
+            first_hi = (j_a[move_order] > j_b[move_order])
+            del j_a, j_b, move_order
+            swap_rows = move_rows[first_hi != entering]
+            idx_1[swap_rows], idx_2[swap_rows] = idx_2[swap_rows], idx_1[swap_rows]
+            del is_move, move_rows, first_hi, entering, swap_rows, income_rank
+
+            # Sort by i and t (observations are sorted by i and t, so it is sufficient to sort by the first observation, breaking ties by the second)
+            row_order = np.lexsort((idx_2, idx_1))
+            idx_1 = idx_1[row_order]
+            idx_2 = idx_2[row_order]
+            del row_order
+        del worker_m, i_col, worker_starts, worker_sizes, worker_id
+
+        ## Fill in columns ##
         all_cols = frame._included_cols()
         default_cols = frame.columns_req + frame.columns_opt
 
-        # Columns to keep
-        keep_cols = ['i']
+        # Dictionary linking columns to their data
+        data_es = {}
         # Keep track of user-added columns
         user_added_cols = {}
         for col in all_cols:
@@ -466,23 +458,18 @@ class BipartiteLongCollapsed(bpd.BipartiteLongBase):
             elif frame.col_long_es_dict[col]:
                 # If column should split
                 for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                    # Get column number, e.g. j1 will give 1
-                    subcol_number = subcol.strip(col)
-                    ## Movers ##
-                    # Useful for t1 and t2: t1 should go to t11 and t21; t2 should go to t12 and t22
-                    col_1 = col + '1' + subcol_number
-                    col_2 = col + '2' + subcol_number
-                    # Lagged value
-                    movers_permuted.loc[:, col_1] = movers.loc[:, subcol].to_numpy()[idx_1]
-                    movers_permuted.loc[:, col_2] = movers.loc[:, subcol].to_numpy()[idx_2]
-
-                    if subcol != 'i':
-                        ## Stayers (no lags) ##
-                        stayers.loc[:, col_1] = stayers.loc[:, subcol]
-                        stayers.rename({subcol: col_2}, axis=1, inplace=True)
-
-                        # Columns to keep
-                        keep_cols += [col_1, col_2]
+                    subcol_data = frame.loc[:, subcol].to_numpy()
+                    if subcol == 'i':
+                        data_es['i'] = subcol_data[idx_1]
+                    else:
+                        # Get column number, e.g. j1 will give 1
+                        subcol_number = subcol[len(col):]
+                        # Useful for t1 and t2: t1 should go to t11 and t21; t2 should go to t12 and t22
+                        col_1 = col + '1' + subcol_number
+                        col_2 = col + '2' + subcol_number
+                        data_es[col_1] = subcol_data[idx_1]
+                        data_es[col_2] = subcol_data[idx_2]
+
                         if col not in default_cols:
                             # User-added columns
                             if col in user_added_cols.keys():
@@ -491,37 +478,19 @@ class BipartiteLongCollapsed(bpd.BipartiteLongBase):
                                 user_added_cols[col] = [col_1, col_2]
             else:
                 # If column shouldn't split
-                keep_cols += bpd.util.to_list(frame.col_reference_dict[col])
+                for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
+                    data_es[subcol] = frame.loc[:, subcol].to_numpy()[idx_2]
                 if col not in default_cols:
                     # User-added columns
                     user_added_cols[col] = frame.col_reference_dict[col]
+        del idx_1, idx_2
 
-        # Ensure lagged values are for the same worker
-        movers_permuted = movers_permuted.loc[movers_permuted.loc[:, 'i1'].to_numpy() == movers_permuted.loc[:, 'i2'].to_numpy(), :]
-
-        # Set 'm' for movers
-        movers_permuted.loc[:, 'm'] = 1
-
-        # Correct datatypes (shifting adds nans which converts all columns into float, correct columns that should be int)
-        for col in all_cols:
-            if ((frame.col_dtype_dict[col] == 'int') or (col in frame.columns_contig.keys())) and frame.col_long_es_dict[col]:
-                for subcol in bpd.util.to_list(frame.col_reference_dict[col]):
-                    # Get column number, e.g. j1 will give 1
-                    subcol_number = subcol.strip(col)
-                    shifted_col = col + '1' + subcol_number
-                    movers_permuted.loc[:, shifted_col] = movers_permuted.loc[:, shifted_col].astype(int, copy=False)
-
-        # Correct i
-        movers_permuted.drop('i2', axis=1, inplace=True)
-        movers_permuted.rename({'i1': 'i'}, axis=1, inplace=True)
-
-        # Keep only relevant columns
-        stayers = stayers.reindex(keep_cols, axis=1, copy=False)
-        movers_permuted = movers_permuted.reindex(keep_cols, axis=1, copy=False)
+        # Set 'm' (since there are no returns, movers always change firms)
+        data_es['m'] = (data_es['j1'] != data_es['j2']).astype(int, copy=False)
         frame.log('columns updated', level='info')
 
-        # Merge stayers and movers (NOTE: this converts the data into a Pandas DataFrame)
-        data_es = pd.concat([stayers, movers_permuted], ignore_index=True) # .reset_index(drop=True)
+        # Construct dataframe (NOTE: this converts the data into a Pandas DataFrame)
+        data_es = pd.DataFrame(data_es)
 
         # Sort columns
         sorted_cols = bpd.util._sort_cols(data_es.columns)
@@ -546,12 +515,6 @@ class BipartiteLongCollapsed(bpd.BipartiteLongBase):
                         # If linking contiguous ids to original ids
                         del es_frame.id_reference_dict[col]
 
-        # Sort data by i and t
-        es_frame = es_frame.sort_rows(is_sorted=False, copy=False)
-
-        # Reset index
-        es_frame.reset_index(drop=True, inplace=True)
-
         if move_to_worker:
             es_frame.loc[:, 'i'] = es_frame.index
 
@@ -0,0 +1,136 @@
+'''
+Class for grids of KMeans clusterings of bipartite networks.
+'''
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans as sklKMeans
+from sklearn.metrics import silhouette_samples
+import bipartitepandas as bpd
+
+# Data shared with worker processes (set once per process by _init_worker(), so data isn't sent for every configuration)
+_worker_data = {}
+
+def _init_worker(data, weights):
+    '''
+    Store data for clustering in a worker process.
+
+    Arguments:
+        data (NumPy Array): data to group
+        weights (NumPy Array or None): firm weights for clustering
+    '''
+    _worker_data['data'] = data
+    _worker_data['weights'] = weights
+
+def _fit_config(data, weights, k, seed, kwargs, silhouette=True, silhouette_sample_size=None, silhouette_chunk_size=10000):
+    '''
+    Estimate KMeans for one configuration, and compute its inertia and (optionally) mean silhouette score.
+
+    Arguments:
+        data (NumPy Array): data to group
+        weights (NumPy Array or None): firm weights for clustering
+        k (int): number of clusters
+        seed (np.random.SeedSequence): seed for this configuration
+        kwargs (dict): parameters for KMeans estimation
+        silhouette (bool): if True, compute the mean silhouette score; otherwise, the mean silhouette score is NaN
+        silhouette_sample_size (int or None): if None, compute exact silhouette scores; if int, estimate silhouette scores using a sample of at most this many firms from each cluster
+        silhouette_chunk_size (int): when estimating silhouette scores using a sample of firms, compute distances for this many firms at a time
+
+    Returns:
+        (tuple): (NumPy Array of KMeans groups for data, seed given to SKLearn, inertia, mean silhouette score or NaN)
+    '''
+    # Use independent seeds for estimation and for sampling silhouette scores
+    kmeans_seed, silhouette_seed = seed.spawn(2)
+    random_state = kmeans_seed.generate_state(1)[0]
+
+    kmeans = sklKMeans(n_clusters=k, random_state=random_state, **kwargs).fit(data, sample_weight=weights)
+    groups = kmeans.labels_
+
+    if (not silhouette) or (len(np.unique(groups)) < 2):
+        # Silhouette scores not requested, or not defined since they require at least 2 clusters
+        silhouette = np.nan
+    elif silhouette_sample_size is None:
+        silhouette = silhouette_samples(data, groups).mean()
+    else:
+        silhouette = bpd.util.sampled_silhouette_samples(data, groups, sample_size=silhouette_sample_size, chunk_size=silhouette_chunk_size, rng=np.random.default_rng(silhouette_seed))[0].mean()
+
+    return groups, random_state, kmeans.inertia_, silhouette
+
+def _fit_config_worker(k, seed, kwargs, silhouette=True, silhouette_sample_size=None, silhouette_chunk_size=10000):
+    '''
+    Estimate KMeans for one configuration in a worker process, using the data stored by _init_worker(). See _fit_config() for a description of arguments and return values.
+    '''
+    return _fit_config(_worker_data['data'], _worker_data['weights'], k, seed, kwargs, silhouette=silhouette, silhouette_sample_size=silhouette_sample_size, silhouette_chunk_size=silhouette_chunk_size)
+
+class ClusterGrid:
+    '''
+    Grid of KMeans clusterings, estimated for each combination of number of clusters and seed. Firm measures are computed once and shared across configurations. Labels for every configuration are stored, so any configuration can be attached to the dataframe without re-estimating. Usage:
+        grid = bdf.cluster_grid(ks=range(2, 11), n_init_seeds=5, n_jobs=4, params=bpd.cluster_params({'silhouette': True, 'silhouette_sample_size': 1000}))
+        bdf = grid.attach()
+
+    Arguments:
+        frame (BipartiteBase): dataframe that was clustered
+        params (ParamsDict): dictionary of parameters for clustering
+        jids (NumPy Array): firm ids that were clustered
+        results (Pandas DataFrame): one row per configuration, with columns 'k' (number of clusters), 'seed' (index of the seed for this number of clusters if `n_init_seeds` was an int, otherwise the given seed), 'random_state' (seed given to SKLearn), 'inertia' (weighted sum of squared distances to the nearest centroid), and 'silhouette' (mean silhouette score, or NaN if silhouette scores weren't computed)
+        labels (NumPy Array): cluster for each firm in `jids` (columns) for each configuration (rows)
+    '''
+
+    def __init__(self, frame, params, jids, results, labels):
+        self.frame = frame
+        self.params = params
+        self.jids = jids
+        self.results = results
+        self.labels = labels
+
+    def __len__(self):
+        '''
+        Number of configurations in the grid.
+
+        Returns:
+            (int): number of configurations
+        '''
+        return len(self.results)
+
+    def best(self, k=None):
+        '''
+        Select a configuration.
+
+        Arguments:
+            k (int or None): if None, select the configuration with the highest mean silhouette score; if int, select the configuration with the lowest inertia among configurations with `k` clusters (inertia is only comparable for a fixed number of clusters)
+
+        Returns:
+            (int): row of .results giving the selected configuration
+        '''
+        if k is None:
+            if self.results.loc[:, 'silhouette'].isna().all():
+                raise ValueError('Cannot select a configuration using silhouette scores, since no configuration has a silhouette score. Specify `k` to select the configuration with the lowest inertia.')
+            return int(np.nanargmax(self.results.loc[:, 'silhouette'].to_numpy()))
+        k_rows = np.flatnonzero(self.results.loc[:, 'k'].to_numpy() == k)
+        if len(k_rows) == 0:
+            raise ValueError(f'No configuration has {k!r} clusters.')
+        return int(k_rows[np.argmin(self.results.loc[:, 'inertia'].to_numpy()[k_rows])])
+
+    def attach(self, config=None):
+        '''
+        Assign a new column giving the cluster for each firm, using the labels from a particular configuration. Labels are not recomputed. Copies the dataframe if the clustering parameter copy=True.
+
+        Arguments:
+            config (int or None): row of .results giving the configuration to attach; None is equivalent to .best()
+
+        Returns:
+            (BipartiteBase): dataframe with clusters
+        '''
+        if config is None:
+            config = self.best()
+
+        if self.params['copy']:
+            frame = self.frame.copy()
+        else:
+            frame = self.frame
+
+        frame = frame._attach_clusters(self.jids, self.labels[config], dropna=self.params['dropna'], clean_params=self.params['clean_params'])
+
+        frame.log('clusters merged into data', level='info')
+
+        return frame
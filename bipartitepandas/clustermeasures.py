@@ -0,0 +1,35 @@
+'''
+Class for firm-level measures of bipartite networks, used for clustering.
+'''
+
+class ClusterMeasures:
+    '''
+    Firm-level measures computed for clustering, which can be reused to cluster the same dataframe multiple times (e.g. with different groupings) without recomputing the measures. Usage:
+        cm = bdf.compute_cluster_measures(measures=bpd.measures.CDFs())
+        bdf = bdf.cluster(bpd.cluster_params({'grouping': bpd.grouping.KMeans(n_clusters=10)}), cluster_measures=cm)
+
+    Arguments:
+        measures (NumPy Array): measures, with one row per firm
+        weights (NumPy Array or None): firm weights for clustering; None if measures were computed with weighted=False
+        jids (NumPy Array): firm ids corresponding to the rows of `measures`
+        stayers_movers (str or None): subset of data used to compute measures (see bpd.cluster_params())
+        t (int or list of int or None): periods used to compute measures (see bpd.cluster_params())
+        weighted (bool): if True, firm weights were computed
+    '''
+
+    def __init__(self, measures, weights, jids, stayers_movers=None, t=None, weighted=True):
+        self.measures = measures
+        self.weights = weights
+        self.jids = jids
+        self.stayers_movers = stayers_movers
+        self.t = t
+        self.weighted = weighted
+
+    def __len__(self):
+        '''
+        Number of firms with measures.
+
+        Returns:
+            (int): number of firms
+        '''
+        return len(self.jids)
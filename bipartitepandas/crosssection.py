@@ -0,0 +1,130 @@
+'''
+Class for a lazy cross section view of bipartite networks in event study format.
+'''
+import numpy as np
+import pandas as pd
+import bipartitepandas as bpd
+
+class CrossSection:
+    '''
+    Lazy cross section view of (collapsed) event study data. Rows are ordered as stayers (with cs=1), then movers (with cs=1), then movers with their period-1 and period-2 columns swapped (with cs=0), which is the same as the dataframe returned by BipartiteEventStudyBase.get_cs(). Columns are not materialized: instead, each column is gathered from the event study dataframe's own data when it is accessed, using a row map (linking each cross section row to its event study row) and a swap map (linking each column to the column to use for rows with cs=0). Because of this, the event study dataframe should not be altered while the view is in use. Usage:
+        cs = bdf.get_cs(lazy=True)
+        y1 = cs['y1']
+        data_cs = cs.to_frame()
+
+    Arguments:
+        frame (BipartiteEventStudyBase): (collapsed) event study data
+    '''
+
+    def __init__(self, frame):
+        self.frame = frame
+
+        ## Row map ##
+        m = frame.loc[:, 'm'].to_numpy()
+        stayer_rows = np.flatnonzero(m == 0)
+        mover_rows = np.flatnonzero(m > 0)
+        del m
+        # Stayers, then movers, then movers again (with swapped columns)
+        self.row_map = np.concatenate([stayer_rows, mover_rows, mover_rows])
+        # Number of rows with cs=1
+        self.n_cs_1 = len(stayer_rows) + len(mover_rows)
+        del stayer_rows, mover_rows
+
+        ## Swap map ##
+        # Rows with cs=0 contain period-2 data for movers, so must swap columns for all relevant information to be contained in the same column (e.g. must move y2 into y1, otherwise bottom rows are just duplicates)
+        self.swap_map = {}
+        for col in frame._included_cols():
+            subcols = bpd.util.to_list(frame.col_reference_dict[col])
+            n_subcols = len(subcols)
+            # If even number of subcols, then is formatted as 'x1', 'x2', etc., so must swap to be 'x2', 'x1', etc.
+            if n_subcols % 2 == 0:
+                halfway = n_subcols // 2
+                for i in range(halfway):
+                    self.swap_map[subcols[i]] = subcols[halfway + i]
+                    self.swap_map[subcols[halfway + i]] = subcols[i]
+
+        # Columns included in the cross section
+        self.columns = bpd.util._sort_cols(frame._included_cols(subcols=True) + ['cs'])
+
+    def __len__(self):
+        '''
+        Number of rows in the cross section.
+
+        Returns:
+            (int): number of rows
+        '''
+        return len(self.row_map)
+
+    def __getitem__(self, col):
+        '''
+        Get a column of the cross section as a NumPy array.
+
+        Arguments:
+            col (str): column name
+
+        Returns:
+            (NumPy Array): column data
+        '''
+        return self.get(col)
+
+    def _check_col(self, col):
+        '''
+        Raise an error if a column is not included in the cross section.
+
+        Arguments:
+            col (str): column name
+        '''
+        if col not in self.columns:
+            raise KeyError(f'Column {col!r} is not included in the cross section; included columns are {self.columns!r}.')
+
+    def get(self, col, cs=None):
+        '''
+        Get a column of the cross section as a NumPy array, gathered from the event study data.
+
+        Arguments:
+            col (str): column name
+            cs (int or None): if 1, return only rows with cs=1; if 0, return only rows with cs=0; if None, return all rows
+
+        Returns:
+            (NumPy Array): column data
+        '''
+        self._check_col(col)
+        if cs not in [None, 0, 1]:
+            raise ValueError(f'`cs` must be one of None, 0, or 1, but input specifies {cs!r}.')
+
+        if col == 'cs':
+            cs_col = np.concatenate([np.ones(self.n_cs_1, dtype=int), np.zeros(len(self.row_map) - self.n_cs_1, dtype=int)])
+        else:
+            cs_col = None
+
+        if cs == 1:
+            if cs_col is not None:
+                return cs_col[: self.n_cs_1]
+            return self.frame.loc[:, col].to_numpy()[self.row_map[: self.n_cs_1]]
+        if cs == 0:
+            if cs_col is not None:
+                return cs_col[self.n_cs_1:]
+            return self.frame.loc[:, self.swap_map.get(col, col)].to_numpy()[self.row_map[self.n_cs_1:]]
+        if cs_col is not None:
+            return cs_col
+        return np.concatenate([self.get(col, cs=1), self.get(col, cs=0)])
+
+    def to_frame(self):
+        '''
+        Materialize the cross section as a dataframe.
+
+        Returns:
+            (Pandas DataFrame): cross section data
+        '''
+        data_cs = {}
+        for col in self.columns:
+            if col == 'cs':
+                data_cs['cs'] = self.get('cs')
+            else:
+                # Use Pandas to keep extension dtypes
+                data_cs[col] = pd.concat([
+                    self.frame.loc[:, col].take(self.row_map[: self.n_cs_1]),
+                    self.frame.loc[:, self.swap_map.get(col, col)].take(self.row_map[self.n_cs_1:])
+                ], ignore_index=True)
+
+        return pd.DataFrame(data_cs)
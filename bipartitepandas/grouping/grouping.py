@@ -9,6 +9,25 @@ try:
 except ImportError:
     pass
 from sklearn.cluster import KMeans as sklKMeans
+from sklearn.cluster import MiniBatchKMeans as sklMiniBatchKMeans
+
+def _random_state(rng=None):
+    '''
+    Generate a seed for SKLearn from a NumPy random number generator.
+
+    Arguments:
+        rng (np.random.Generator or None): NumPy random number generator; None is equivalent to np.random.default_rng(None)
+
+    Returns:
+        (int or object): seed for SKLearn (if rng is not a np.random.Generator, it is returned as is)
+    '''
+    if rng is None:
+        rng = np.random.default_rng(None)
+
+    if isinstance(rng, np.random._generator.Generator):
+        # Generate seed - SKLearn is not compatible with np.random.default_rng
+        return rng.bit_generator._seed_seq.spawn(1)[0].generate_state(1)[0]
+    return rng
 
 class KMeans:
     '''
@@ -37,16 +56,75 @@ class KMeans:
         Returns:
             (NumPy Array): KMeans groups for data
         '''
-        if rng is None:
-            rng = np.random.default_rng(None)
+        random_state = _random_state(rng)
+
+        groups = sklKMeans(random_state=random_state, **self.kwargs).fit(data, sample_weight=weights).labels_
+        return groups
+
+class MiniBatchKMeans:
+    '''
+    Compute KMeans groups for data using mini-batches, for data with too many firms to estimate KMeans on all firms at once. Used for clustering. Centroids are estimated on batches of firms, where firms are sampled with probability proportional to their weights, then each firm is assigned to its nearest centroid, computing distances for one chunk of firms at a time.
+
+    Arguments:
+        batch_size (int): number of firms to sample for each mini-batch
+        n_batches (int): number of mini-batches to use to estimate centroids
+        chunk_size (int): number of firms to assign to centroids at a time
+        **kwargs: parameters for MiniBatchKMeans estimation (for more information on what parameters can be used, visit https://scikit-learn.org/stable/modules/generated/sklearn.cluster.MiniBatchKMeans.html); note that keys 'random_state', 'batch_size', and 'compute_labels' will be overwritten, and 'max_iter' is not used (use `n_batches` instead)
+    '''
+
+    def __init__(self, batch_size=1024, n_batches=100, chunk_size=100000, **kwargs):
+        self.batch_size = batch_size
+        self.n_batches = n_batches
+        self.chunk_size = chunk_size
+        self.kwargs = kwargs.copy()
+
+        for key in ['random_state', 'batch_size', 'compute_labels']:
+            if key in self.kwargs.keys():
+                # Remove key
+                del self.kwargs[key]
+
+    def _compute_groups(self, data, weights, rng=None):
+        '''
+        Compute KMeans groups for data using mini-batches.
 
-        if isinstance(rng, np.random._generator.Generator):
-            # Generate seed - SKLearn is not compatible with np.random.default_rng
-            random_state = rng.bit_generator._seed_seq.spawn(1)[0].generate_state(1)[0]
+        Arguments:
+            data (NumPy Array): data to group
+            weights (NumPy Array or None): firm weights for clustering
+            rng (np.random.Generator or None): NumPy random number generator; None is equivalent to np.random.default_rng(None)
+
+        Returns:
+            (NumPy Array): KMeans groups for data
+        '''
+        random_state = _random_state(rng)
+        # Generator for sampling mini-batches
+        batch_rng = np.random.default_rng(random_state)
+
+        n_firms = data.shape[0]
+        batch_size = min(self.batch_size, n_firms)
+        if weights is not None:
+            # Sample firms with probability proportional to their weights
+            p = weights / weights.sum()
         else:
-            random_state = rng
+            p = None
+
+        ## Estimate centroids ##
+        # Sample all mini-batches at once (sampling with weights is linear in the number of firms, so this avoids repeating that cost for each batch)
+        batches = batch_rng.choice(n_firms, size=(self.n_batches, batch_size), replace=True, p=p)
+        model = sklMiniBatchKMeans(random_state=random_state, batch_size=batch_size, compute_labels=False, **self.kwargs)
+        for batch in batches:
+            model.partial_fit(data[batch, :])
+        del batches
+        centroids = model.cluster_centers_
+        del model
+
+        ## Assign firms to nearest centroids ##
+        groups = np.zeros(n_firms, dtype=int)
+        # Squared norm of centroids (squared distances are ||x||^2 - 2 x.c + ||c||^2, and ||x||^2 doesn't affect which centroid is nearest)
+        centroids_sq = (centroids ** 2).sum(axis=1)
+        for chunk_start in range(0, n_firms, self.chunk_size):
+            chunk = data[chunk_start: chunk_start + self.chunk_size, :]
+            groups[chunk_start: chunk_start + self.chunk_size] = np.argmin(centroids_sq - 2 * chunk @ centroids.T, axis=1)
 
-        groups = sklKMeans(random_state=random_state, **self.kwargs).fit(data, sample_weight=weights).labels_
         return groups
 
 class Quantiles:
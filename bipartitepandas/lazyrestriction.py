@@ -0,0 +1,240 @@
+'''
+Class for lazy restrictions of bipartite networks in long format.
+'''
+import numpy as np
+import pandas as pd
+import bipartitepandas as bpd
+
+class LazyRestriction:
+    '''
+    Lazy chain of restrictions on (collapsed) long data. Calling .keep_ids(), .drop_ids(), .keep_rows(), .min_obs(), .min_workers(), .min_moves(), .min_movers(), or .restrict() only updates which rows of the dataframe are kept (each call returns a new LazyRestriction, and the original is left unchanged). Recollapsing and recomputing 'm' are deferred, and the dataframe is materialized once when .collect() is called. The result is the same as applying the corresponding BipartiteLongBase methods one at a time, but without constructing intermediate dataframes. Because rows are selected from the dataframe when .collect() is called, the dataframe should not be altered while the chain is in use. Usage:
+        bdf = bdf.lazy().keep_ids('j', firms).min_movers(15).min_obs(2, id_col='i').collect()
+
+    Arguments:
+        frame (BipartiteLongBase): (collapsed) long data, sorted by i (and t, if included)
+        drop_returns_to_stays (bool): if True, when recollapsing collapsed data, drop observations that need to be recollapsed instead of collapsing (this is for computational efficiency when re-collapsing data for leave-one-out connected components, where intermediate observations can be dropped, causing a worker who returns to a firm to become a stayer); applies to every restriction in the chain
+        rows (NumPy Array or None): rows of `frame` that are kept; None is equivalent to all rows
+        modified (bool): if True, rows have been dropped in a way that requires recomputing 'm'
+        codes (dict or None): cache linking id columns to integer codes computed by BipartiteLongBase._restrict_codes(); None is equivalent to an empty cache
+    '''
+
+    def __init__(self, frame, drop_returns_to_stays=False, rows=None, modified=False, codes=None):
+        if rows is None:
+            rows = np.arange(len(frame))
+        if codes is None:
+            codes = {}
+
+        self.frame = frame
+        self.drop_returns_to_stays = drop_returns_to_stays
+        self.rows = rows
+        self.modified = modified
+        self._codes = codes
+
+    def __len__(self):
+        '''
+        Number of rows of the dataframe that are currently kept (before recollapsing).
+
+        Returns:
+            (int): number of rows
+        '''
+        return len(self.rows)
+
+    def _get_codes(self, id_col='j'):
+        '''
+        Get integer codes for the dataframe, computing them if they are not yet cached. Codes are computed separately for each row, since restrictions can drop rows in ways that split units.
+
+        Arguments:
+            id_col (str): column to check ids for minimum number of observations ('i', 'j', or 'g')
+
+        Returns:
+            (dict): integer codes computed by BipartiteLongBase._restrict_codes()
+        '''
+        if 'j' not in self._codes.keys():
+            self._codes['j'] = self.frame._restrict_codes(id_col='j', row_units=True)
+        if id_col not in self._codes.keys():
+            # Only the id codes depend on the id column
+            codes = self._codes['j'].copy()
+            if id_col == 'i':
+                codes['id'] = codes['i']
+                codes['n_ids'] = (codes['i'][-1] + 1) if len(codes['i']) > 0 else 0
+            else:
+                codes['id'], id_uniques = pd.factorize(self.frame.loc[:, id_col].to_numpy())
+                codes['n_ids'] = len(id_uniques)
+                del id_uniques
+            self._codes[id_col] = codes
+        return self._codes[id_col]
+
+    def _update(self, rows, modified=True):
+        '''
+        Return a new LazyRestriction with updated rows. If dropping returns to stays, observations that would need to be recollapsed are dropped immediately.
+
+        Arguments:
+            rows (NumPy Array): rows of the dataframe that are kept
+            modified (bool): if True, rows were dropped in a way that requires recomputing 'm'
+
+        Returns:
+            (LazyRestriction): updated lazy restriction
+        '''
+        if modified and self.drop_returns_to_stays and self._get_codes()['recollapse']:
+            # Drop returns that turned into stays (i.e. only keep spells of size 1), looping since dropping observations can create new spells to drop, as in .recollapse()
+            i_codes, j_codes = self._get_codes()['i'], self._get_codes()['j']
+            while True:
+                i_rows = i_codes[rows]
+                j_rows = j_codes[rows]
+                new_spell = (i_rows != bpd.util.fast_shift(i_rows, 1, fill_value=-2)) | (j_rows != bpd.util.fast_shift(j_rows, 1, fill_value=-2))
+                if new_spell.all():
+                    break
+                rows = rows[new_spell & np.append(new_spell[1:], True)]
+            del i_rows, j_rows, new_spell
+
+        return LazyRestriction(self.frame, drop_returns_to_stays=self.drop_returns_to_stays, rows=rows, modified=(self.modified or modified), codes=self._codes)
+
+    def keep_ids(self, id_col, keep_ids_list):
+        '''
+        Only keep ids belonging to a given set of ids.
+
+        Arguments:
+            id_col (str): column of ids to consider ('i', 'j', or 'g')
+            keep_ids_list (list): ids to keep
+
+        Returns:
+            (LazyRestriction): lazy restriction with ids in the given set
+        '''
+        keep_rows = np.isin(self.frame.loc[:, id_col].to_numpy()[self.rows], list(set(keep_ids_list)))
+
+        # Dropping workers never requires recollapsing or recomputing 'm'
+        return self._update(self.rows[keep_rows], modified=(id_col != 'i'))
+
+    def drop_ids(self, id_col, drop_ids_list):
+        '''
+        Drop ids belonging to a given set of ids.
+
+        Arguments:
+            id_col (str): column of ids to consider ('i', 'j', or 'g')
+            drop_ids_list (list): ids to drop
+
+        Returns:
+            (LazyRestriction): lazy restriction with ids outside the given set
+        '''
+        keep_rows = ~np.isin(self.frame.loc[:, id_col].to_numpy()[self.rows], list(set(drop_ids_list)))
+
+        # Dropping workers never requires recollapsing or recomputing 'm'
+        return self._update(self.rows[keep_rows], modified=(id_col != 'i'))
+
+    def keep_rows(self, rows_list):
+        '''
+        Only keep particular rows. Note that rows refer to the rows of the dataframe the chain started from (as opposed to rows after earlier restrictions are applied, as with BipartiteLongBase.keep_rows()).
+
+        Arguments:
+            rows_list (list): rows to keep
+
+        Returns:
+            (LazyRestriction): lazy restriction with given rows
+        '''
+        keep_rows = np.isin(self.rows, np.array(list(set(rows_list)), dtype=int))
+
+        return self._update(self.rows[keep_rows])
+
+    def restrict(self, min_obs=None, min_workers=None, min_moves=None, min_movers=None, id_col='j'):
+        '''
+        Keep data where all given restrictions hold jointly (see BipartiteLongBase.restrict()).
+
+        Arguments:
+            min_obs (int or None): minimum number of observations required to keep an id from `id_col`; None is equivalent to no restriction
+            min_workers (int or None): minimum number of workers required to keep a firm; None is equivalent to no restriction
+            min_moves (int or None): minimum number of moves required to keep a firm; None is equivalent to no restriction
+            min_movers (int or None): minimum number of movers required to keep a firm; None is equivalent to no restriction
+            id_col (str): column to check ids for `min_obs` ('i', 'j', or 'g'). Use general column names for joint columns, e.g. put 'j' instead of 'j1', 'j2'.
+
+        Returns:
+            (LazyRestriction): lazy restriction where all restrictions hold jointly
+        '''
+        if (min_obs is None) and (min_workers is None) and (min_moves is None) and (min_movers is None):
+            # If no restrictions
+            return self
+
+        rows = self.frame._restrict_units(self._get_codes(id_col), self.rows, min_obs=min_obs, min_workers=min_workers, min_moves=min_moves, min_movers=min_movers, drop_returns_to_stays=self.drop_returns_to_stays)[0]
+        if len(rows) == len(self.rows):
+            # If nothing dropped
+            return self
+
+        # Dropping only workers never requires recollapsing or recomputing 'm'
+        modified = not ((min_workers is None) and (min_moves is None) and (min_movers is None) and (id_col == 'i'))
+
+        return self._update(rows, modified=modified)
+
+    def min_obs(self, threshold=2, id_col='j'):
+        '''
+        Keep ids that have at least `threshold` observations (see BipartiteLongBase.min_obs_frame()).
+
+        Arguments:
+            threshold (int): minimum number of observations required to keep an id
+            id_col (str): column to check ids ('i', 'j', or 'g'). Use general column names for joint columns, e.g. put 'j' instead of 'j1', 'j2'.
+
+        Returns:
+            (LazyRestriction): lazy restriction of ids that meet the observation threshold
+        '''
+        return self.restrict(min_obs=threshold, id_col=id_col)
+
+    def min_workers(self, threshold=15):
+        '''
+        Keep firms that have at least `threshold` workers (see BipartiteLongBase.min_workers_frame()).
+
+        Arguments:
+            threshold (int): minimum number of workers required to keep a firm
+
+        Returns:
+            (LazyRestriction): lazy restriction of firms that meet the worker threshold
+        '''
+        return self.restrict(min_workers=threshold)
+
+    def min_moves(self, threshold=2):
+        '''
+        Keep firms that have at least `threshold` moves (see BipartiteLongBase.min_moves_frame()).
+
+        Arguments:
+            threshold (int): minimum number of moves required to keep a firm
+
+        Returns:
+            (LazyRestriction): lazy restriction of firms that meet the move threshold
+        '''
+        return self.restrict(min_moves=threshold)
+
+    def min_movers(self, threshold=15):
+        '''
+        Keep firms that have at least `threshold` movers (see BipartiteLongBase.min_movers_frame()).
+
+        Arguments:
+            threshold (int): minimum number of movers required to keep a firm
+
+        Returns:
+            (LazyRestriction): lazy restriction of firms that meet the mover threshold
+        '''
+        return self.restrict(min_movers=threshold)
+
+    def collect(self, copy=True):
+        '''
+        Materialize the restricted dataframe, recollapsing and recomputing 'm' once.
+
+        Arguments:
+            copy (bool): if False, avoid copy when no rows are dropped
+
+        Returns:
+            (BipartiteLongBase): restricted dataframe
+        '''
+        frame = self.frame
+        if len(self.rows) == len(frame):
+            # If nothing dropped
+            if copy:
+                return frame.copy()
+            return frame
+
+        frame = frame.iloc[self.rows]
+        if self.modified:
+            if isinstance(frame, bpd.BipartiteLongCollapsed):
+                frame = frame.recollapse(drop_returns_to_stays=self.drop_returns_to_stays, is_sorted=True, copy=False)
+            # Recompute 'm' since it might change from dropping observations or from re-collapsing
+            frame = frame.gen_m(force=True, copy=False)
+        frame.reset_index(drop=True, inplace=True)
+
+        return frame
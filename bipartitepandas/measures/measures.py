@@ -2,9 +2,45 @@
 Classes for computing cluster measures. Note: use classes rather than nested functions because nested functions cannot be pickled (source: https://stackoverflow.com/a/12022055/17333120).
 '''
 import numpy as np
-from bipartitepandas.util import to_list, aggregate_transform
+from bipartitepandas.util import to_list, segment_agg
 from statsmodels.stats.weightstats import DescrStatsW
 
+def _firm_quantiles(y, w, j_min_idx, j_size, quantiles):
+    '''
+    Compute weighted quantiles of compensation for each firm. The quantile for a firm is the compensation of the first observation where the normalized cumulative weight is not at or below the quantile. Firms with the same number of observations are stacked into a matrix, so quantiles for all of them are computed at once (cumulative sums and sums are computed row by row, so they are identical to computing them firm by firm).
+
+    Arguments:
+        y (NumPy Array): compensation, sorted by firm and then by compensation
+        w (NumPy Array): weights, sorted in the same order as y
+        j_min_idx (NumPy Array): first index for each firm
+        j_size (NumPy Array): number of observations for each firm
+        quantiles (NumPy Array): quantiles to compute
+
+    Returns:
+        (NumPy Array): NumPy array of firm quantiles, with one row per firm and one column per quantile
+    '''
+    firm_quantiles = np.zeros([len(j_min_idx), len(quantiles)])
+
+    for size in np.unique(j_size):
+        firms = np.flatnonzero(j_size == size)
+        firm_rows = j_min_idx[firms][:, None] + np.arange(size)
+        # Get the firm-level compensation data (don't need to sort because already sorted)
+        y_j = y[firm_rows]
+        w_j = w[firm_rows]
+        del firm_rows
+
+        # Cumulative weight, normalized by weighted number of observations
+        cum_w = w_j.cumsum(axis=1) / w_j.sum(axis=1)[:, None]
+        del w_j
+
+        for q, quantile in enumerate(quantiles):
+            # Income index at particular quantile (i.e. the first index where the normalized cumulative weight is not at or below the quantile)
+            above_quantile = ~(cum_w <= quantile)
+            idx = np.where(above_quantile.any(axis=1), above_quantile.argmax(axis=1), size)
+            firm_quantiles[firms, q] = y_j[np.arange(len(firms)), np.minimum(idx, size - 1)]
+
+    return firm_quantiles
+
 class CDFs:
     '''
     Generate cdfs of compensation for firms. Used for clustering.
@@ -65,45 +101,29 @@ class CDFs:
             cdfs = (cdfs.T / jsize.T).T
 
         elif measure == 'quantile_firm':
-            # Sort frame by firm + compensation (do this once now, so that don't need to do it again later) (also note it is faster to sort and then manually compute quantiles than to use built-in quantile functions)
-            # NOTE: don't sort in-place, otherwise modifies external data
-            frame = frame.sort_values(['j', outcome_col], inplace=False)
-            frame.reset_index(drop=True, inplace=True)
-            frame.reset_index(drop=False, inplace=True)
-
-            # Convert columns to NumPy (after sorting)
+            # Convert columns to NumPy
+            j = frame.loc[:, 'j'].to_numpy()
             y = frame.loc[:, outcome_col].to_numpy()
             w = frame.loc[:, 'row_weights'].to_numpy()
 
-            # Find min + max index for each firm
-            groupby_j = frame.groupby('j', sort=False)['index']
-            j_min_idx = groupby_j.min().to_numpy()
-            j_max_idx = groupby_j.max().to_numpy()
-            del groupby_j
+            # Force j to be integers so np.lexsort works correctly
+            if j.dtype == 'O':
+                j = j.astype(int, copy=True)
+
+            # Sort by firm + compensation (do this once now, so that don't need to do it again later) (also note it is faster to sort and then manually compute quantiles than to use built-in quantile functions) (np.lexsort is stable, so ties are kept in their original order)
+            sort_order = np.lexsort((y, j))
+            j = j[sort_order]
+            y = y[sort_order]
+            w = w[sort_order]
+            del sort_order
+
+            # Find first index and number of observations for each firm
+            j_min_idx = np.flatnonzero(np.append(True, j[1:] != j[:-1]))
+            j_size = np.diff(np.append(j_min_idx, len(j)))
+            del j
 
             ## Generate the cdfs ##
-            for j in range(n_firms):
-                # Get the firm-level compensation data (don't need to sort because already sorted)
-                y_j = y[j_min_idx[j]: j_max_idx[j] + 1]
-                w_j = w[j_min_idx[j]: j_max_idx[j] + 1]
-
-                # Cumulative weight
-                cum_w = w_j.cumsum()
-
-                # Weighted number of observations
-                weighted_n = w_j.sum()
-
-                for q, quantile in enumerate(quantiles):
-                    ## Generate the firm-level cdf ##
-                    # Income index at particular quantile
-                    idx = 0
-                    for cum_w_val in cum_w:
-                        if cum_w_val / weighted_n <= quantile:
-                            idx += 1
-                        else:
-                            break
-                    # Update cdfs with the firm-level cdf
-                    cdfs[j, q] = y_j[min(idx, len(y_j) - 1)]
+            cdfs = _firm_quantiles(y, w, j_min_idx, j_size, quantiles)
 
         return cdfs
 
@@ -112,7 +132,7 @@ class Moments:
     Generate compensation moments for firms. Used for clustering.
 
     Arguments:
-        measures (str or list of str): how to compute the measures ('mean' to compute average income within each firm; 'var' to compute variance of income within each firm; 'max' to compute max income within each firm; 'min' to compute min income within each firm)
+        measures (str, float, or list of str and floats): how to compute the measures ('mean' to compute average income within each firm; 'var' to compute variance of income within each firm; 'max' to compute max income within each firm; 'min' to compute min income within each firm; 'skew' to compute skewness of income within each firm; 'kurt' to compute excess kurtosis of income within each firm; a float between 0 and 1 to compute that quantile of income within each firm, defined as for CDFs with measure='quantile_firm'). Means, variances, skewness, kurtosis, and quantiles are weighted; variances, skewness, and kurtosis are computed using population moments, and skewness and kurtosis are set to 0 for firms where income has no variation.
         outcome_col (str): outcome_col column to use for data
     '''
 
@@ -130,36 +150,80 @@ class Moments:
             (NumPy Array): NumPy array of firm moments
         '''
         n_firms = len(jids)
-        measures = self.measures
-        n_measures = len(to_list(measures))
+        measures = to_list(self.measures)
+        n_measures = len(measures)
         outcome_col = self.outcome_col
 
         ## Initialize moments array ##
         moments = np.zeros([n_firms, n_measures])
 
-        # Required for aggregate_transform
-        # NOTE: don't sort in-place, otherwise modifies external data
-        frame = frame.sort_values('j', inplace=False)
-
-        for j, measure in enumerate(to_list(measures)):
+        # Convert columns to NumPy
+        j = frame.loc[:, 'j'].to_numpy()
+        y = frame.loc[:, outcome_col].to_numpy()
+        w = frame.loc[:, 'row_weights'].to_numpy()
+
+        # Force j to be integers so sorting works correctly
+        if j.dtype == 'O':
+            j = j.astype(int, copy=True)
+
+        # Quantiles of interest
+        quantiles = np.array([measure for measure in measures if not isinstance(measure, str)], dtype=float)
+
+        ## Sort by firm (do this once now, so all measures share the sorted data) ##
+        if len(quantiles) > 0:
+            # Quantiles also require sorting by compensation within each firm
+            sort_order = np.lexsort((y, j))
+        else:
+            sort_order = np.argsort(j, kind='stable')
+        j = j[sort_order]
+        y = y[sort_order]
+        w = w[sort_order]
+        del sort_order
+
+        # Find first index and number of observations for each firm
+        j_min_idx = np.flatnonzero(np.append(True, j[1:] != j[:-1]))
+        j_size = np.diff(np.append(j_min_idx, len(j)))
+        del j
+
+        ## Shared computations ##
+        if any(measure in ['var', 'skew', 'kurt'] for measure in measures):
+            # Weighted central moments
+            w_sum = np.add.reduceat(w, j_min_idx)
+            y_dev = y - np.repeat(np.add.reduceat(w * y, j_min_idx) / w_sum, j_size)
+            var = np.add.reduceat(w * y_dev ** 2, j_min_idx) / w_sum
+        if any(measure in ['skew', 'kurt'] for measure in measures):
+            # Check for variation directly, since rounding error can make the variance slightly positive even when income has no variation
+            no_variation = (segment_agg(y, j_min_idx, 'min') == segment_agg(y, j_min_idx, 'max'))
+        if len(quantiles) > 0:
+            firm_quantiles = _firm_quantiles(y, w, j_min_idx, j_size, quantiles)
+
+        q = 0
+        for k, measure in enumerate(measures):
             if measure == 'mean':
                 # Group by mean income
-                j_ = frame.loc[:, 'j'].to_numpy()
-                y = frame.loc[:, outcome_col].to_numpy()
-                w = frame.loc[:, 'row_weights'].to_numpy()
-                # Force j and jids to be integers so np.bincount and indexing work correctly
-                if jids.dtype == 'O':
-                    jids = jids.astype(int, copy=True)
-                if j_.dtype == 'O':
-                    j_ = j_.astype(int, copy=True)
-                moments[:, j] = np.bincount(j_, w * y)[jids] / np.bincount(j_, w)[jids]
-                del j_, y, w
+                moments[:, k] = segment_agg(y, j_min_idx, 'mean', weights=w)
             elif measure == 'var':
                 # Group by variance of income
-                moments[:, j] = aggregate_transform(frame, 'j', outcome_col, 'var', weights='row_weights', merge=False)
+                moments[:, k] = var
             elif measure == 'max':
-                moments[:, j] = frame.groupby('j', sort=False)[outcome_col].max().to_numpy()
+                moments[:, k] = segment_agg(y, j_min_idx, 'max')
             elif measure == 'min':
-                moments[:, j] = frame.groupby('j', sort=False)[outcome_col].min().to_numpy()
+                moments[:, k] = segment_agg(y, j_min_idx, 'min')
+            elif measure in ['skew', 'kurt']:
+                # Group by skewness or excess kurtosis of income (firms with no variation have no skewness or excess kurtosis)
+                if measure == 'skew':
+                    standardized_moment = np.add.reduceat(w * y_dev ** 3, j_min_idx) / w_sum
+                    denominator = var ** 1.5
+                else:
+                    standardized_moment = np.add.reduceat(w * y_dev ** 4, j_min_idx) / w_sum
+                    denominator = var ** 2
+                denominator[no_variation] = 1
+                moments[:, k] = np.where(no_variation, 0, standardized_moment / denominator - (3 * (measure == 'kurt')))
+            elif not isinstance(measure, str):
+                # Group by quantile of income
+                moments[:, k] = firm_quantiles[:, q]
+                q += 1
+            else:
+                raise NotImplementedError(f"Invalid measure {measure!r}. Valid options are 'mean', 'var', 'max', 'min', 'skew', 'kurt', or a float between 0 and 1.")
 
         return moments
@@ -263,6 +263,234 @@ def aggregate_transform(frame, col_groupby, col_grouped, func, weights=None, col
         return frame[[col_groupby, col_grouped]].merge(agg_df, how='left', on=col_groupby)[col_name].to_numpy()
     return agg_array
 
+def segment_agg(arr, starts, how, weights=None):
+    '''
+    Aggregate contiguous segments of an array using NumPy reductions (e.g. np.add.reduceat). This gives the same result as a Pandas groupby aggregation when each group is contiguous and there are no NaNs, but avoids constructing a groupby.
+
+    Arguments:
+        arr (NumPy Array): data to aggregate, where observations in the same segment are contiguous
+        starts (NumPy Array): index where each segment starts (must be increasing, starting at 0)
+        how (str): how to aggregate each segment; options are 'first', 'last', 'sum', 'min', 'max', 'mean', 'var', 'std', and 'size'. If weights are given, 'mean' gives the weighted mean, and 'var' and 'std' give the weighted variance and standard deviation (with 0 degrees of freedom); if weights are not given, 'var' and 'std' use 1 degree of freedom, as with Pandas.
+        weights (NumPy Array or None): weights for 'mean', 'var', and 'std'; None is equivalent to equal weights
+
+    Returns:
+        (NumPy Array): aggregated data, one entry per segment
+    '''
+    sizes = np.diff(np.append(starts, len(arr)))
+    if how == 'first':
+        return arr[starts]
+    if how == 'last':
+        return arr[starts + sizes - 1]
+    if how == 'size':
+        return sizes
+    if arr.dtype == bool:
+        # Sum booleans as integers
+        arr = arr.astype(int, copy=False)
+    if how == 'sum':
+        return np.add.reduceat(arr, starts)
+    if how == 'min':
+        return np.minimum.reduceat(arr, starts)
+    if how == 'max':
+        return np.maximum.reduceat(arr, starts)
+    if how in ['mean', 'var', 'std']:
+        if weights is None:
+            mean = np.add.reduceat(arr, starts) / sizes
+        else:
+            weights_sum = np.add.reduceat(weights, starts)
+            mean = np.add.reduceat(weights * arr, starts) / weights_sum
+        if how == 'mean':
+            return mean
+        sq_dev = (arr - np.repeat(mean, sizes)) ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if weights is None:
+                # Segments with 1 observation have undefined variance
+                var = np.add.reduceat(sq_dev, starts) / (sizes - 1)
+            else:
+                var = np.add.reduceat(weights * sq_dev, starts) / weights_sum
+        if how == 'var':
+            return var
+        return np.sqrt(var)
+    raise NotImplementedError(f"Aggregation {how!r} is invalid: it must be one of 'first', 'last', 'sum', 'min', 'max', 'mean', 'var', 'std', or 'size'.")
+
+def sampled_silhouette_samples(data, labels, sample_size=1000, chunk_size=10000, rng=None):
+    '''
+    Estimate the silhouette score for each observation, using a sample of observations from each cluster instead of all observations. For each cluster, up to `sample_size` observations are sampled without replacement (all observations are used for clusters with at most `sample_size` observations, in which case scores match sklearn.metrics.silhouette_samples()). Mean distances from each observation to each cluster are estimated using the sampled observations, and Euclidean distances are computed for `chunk_size` observations at a time, so memory use is bounded by `chunk_size` times the total number of sampled observations. Sampling error is estimated by propagating the standard errors of the estimated mean distances (with a finite population correction) through the silhouette formula using the delta method.
+
+    Arguments:
+        data (NumPy Array): data, with one row per observation
+        labels (NumPy Array): cluster for each observation
+        sample_size (int): maximum number of observations to sample from each cluster; must be at least 2, so that each sampled observation has another sampled observation in its cluster
+        chunk_size (int): number of observations to compute distances for at a time
+        rng (np.random.Generator or None): NumPy random number generator; None is equivalent to np.random.default_rng(None)
+
+    Returns:
+        (tuple of NumPy Arrays): (estimated silhouette score for each observation, standard error of the estimated silhouette score for each observation)
+    '''
+    if sample_size < 2:
+        raise ValueError(f'`sample_size` must be at least 2, but input specifies {sample_size!r}.')
+    if rng is None:
+        rng = np.random.default_rng(None)
+    if len(data.shape) == 1:
+        data = data[:, None]
+
+    n_obs = len(labels)
+    # Convert labels to codes
+    clusters, labels = np.unique(labels, return_inverse=True)
+    n_clusters = len(clusters)
+    cluster_size = np.bincount(labels, minlength=n_clusters)
+
+    ## Stratified sample ##
+    sample = np.concatenate([rng.choice(np.flatnonzero(labels == k), size=min(sample_size, cluster_size[k]), replace=False) for k in range(n_clusters)])
+    sample_labels = labels[sample]
+    n_sampled = np.bincount(sample_labels, minlength=n_clusters)
+    # Position of each observation in the sample (-1 if not sampled)
+    sample_pos = - np.ones(n_obs, dtype=int)
+    sample_pos[sample] = np.arange(len(sample))
+    # Indicator linking sampled observations to clusters (used to sum distances by cluster)
+    sample_clusters = np.zeros([len(sample), n_clusters])
+    sample_clusters[np.arange(len(sample)), sample_labels] = 1
+    data_sample = data[sample, :]
+    data_sample_sq = (data_sample ** 2).sum(axis=1)
+
+    scores = np.zeros(n_obs)
+    scores_se = np.zeros(n_obs)
+    for chunk_start in range(0, n_obs, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, n_obs)
+        chunk_rows = np.arange(chunk_start, chunk_end)
+        chunk_labels = labels[chunk_start: chunk_end]
+        data_chunk = data[chunk_start: chunk_end, :]
+
+        ## Distances to sampled observations ##
+        dist = (data_chunk ** 2).sum(axis=1)[:, None] - 2 * data_chunk @ data_sample.T + data_sample_sq
+        np.maximum(dist, 0, out=dist)
+        np.sqrt(dist, out=dist)
+        # Observations have no distance to themselves
+        chunk_sampled = (sample_pos[chunk_rows] >= 0)
+        dist[np.flatnonzero(chunk_sampled), sample_pos[chunk_rows][chunk_sampled]] = 0
+
+        ## Mean distance to each cluster ##
+        dist_sum = dist @ sample_clusters
+        dist_sq_sum = (dist ** 2) @ sample_clusters
+        del dist
+        # Number of sampled observations and population size for each cluster (excluding the observation itself for its own cluster)
+        n = np.tile(n_sampled, (len(chunk_rows), 1)).astype(float)
+        N = np.tile(cluster_size, (len(chunk_rows), 1)).astype(float)
+        own = (np.arange(len(chunk_rows)), chunk_labels)
+        n[own] -= chunk_sampled
+        N[own] -= 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = dist_sum / n
+            # Variance of the estimated mean, with finite population correction
+            mean_var = np.maximum(dist_sq_sum - n * mean ** 2, 0) / (n - 1) / n * (1 - n / N)
+        mean_var[n <= 1] = 0
+        del dist_sum, dist_sq_sum, n, N
+
+        ## Silhouette scores ##
+        a = mean[own]
+        a_var = mean_var[own]
+        mean[own] = np.inf
+        b_cluster = np.argmin(mean, axis=1)
+        b = mean[np.arange(len(chunk_rows)), b_cluster]
+        b_var = mean_var[np.arange(len(chunk_rows)), b_cluster]
+        denominator = np.maximum(a, b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores_chunk = (b - a) / denominator
+            # Derivatives of the silhouette score with respect to a and b
+            d_a = np.where(b >= a, - 1 / b, - b / a ** 2)
+            d_b = np.where(b >= a, a / b ** 2, 1 / a)
+            scores_se_chunk = np.sqrt(d_a ** 2 * a_var + d_b ** 2 * b_var)
+        # Observations in clusters of size 1, or with no distance to either cluster, have silhouette score 0 (as with sklearn)
+        zero_score = (cluster_size[chunk_labels] == 1) | (denominator == 0)
+        scores_chunk[zero_score] = 0
+        scores_se_chunk[zero_score] = 0
+        scores[chunk_start: chunk_end] = scores_chunk
+        scores_se[chunk_start: chunk_end] = scores_se_chunk
+
+    return scores, scores_se
+
+class GroupAggregator:
+    '''
+    Aggregate columns over groups of observations, using NumPy reductions (see segment_agg()) where possible and Pandas otherwise. Groups are ordered by their first observation. Usage:
+        aggregator = GroupAggregator(group_ids)
+        agg_data = aggregator.agg(col_data, 'mean')
+
+    Arguments:
+        group_ids (NumPy Array): group id for each observation, where group ids are increasing in the order of each group's first observation
+        contiguous (bool): if True, observations in the same group are contiguous
+        weights (NumPy Array or None): weights used when aggregating with `weighted=True`; None is equivalent to no weights
+    '''
+    def __init__(self, group_ids, contiguous=True, weights=None):
+        self.group_ids = group_ids
+        self.weights = weights
+        if contiguous:
+            self.group_order = None
+            self.group_starts = np.concatenate([[0], np.flatnonzero(np.diff(group_ids)) + 1])
+        else:
+            self.group_order = np.argsort(group_ids, kind='stable')
+            sorted_group_ids = group_ids[self.group_order]
+            self.group_starts = np.concatenate([[0], np.flatnonzero(np.diff(sorted_group_ids)) + 1])
+            # Groups are ordered by their first observation
+            self.group_starts_order = np.argsort(self.group_order[self.group_starts], kind='stable')
+        # How to sort Pandas groupby, which is only used for aggregations that can't be computed with NumPy reductions
+        self.groupby_sort = contiguous
+
+    def segment_agg(self, col_data, how, weights=None):
+        '''
+        Aggregate data in each group using NumPy reductions.
+
+        Arguments:
+            col_data (NumPy Array): data to aggregate
+            how (str): how to aggregate each group; options are the same as for segment_agg()
+            weights (NumPy Array or None): weights for 'mean', 'var', and 'std'; None is equivalent to equal weights
+
+        Returns:
+            (NumPy Array): aggregated data, one entry per group
+        '''
+        if self.group_order is not None:
+            col_data = col_data[self.group_order]
+            if weights is not None:
+                weights = weights[self.group_order]
+        agg_data = segment_agg(col_data, self.group_starts, how, weights=weights)
+        if self.group_order is not None:
+            agg_data = agg_data[self.group_starts_order]
+        return agg_data
+
+    def agg(self, col_data, how, weighted=False):
+        '''
+        Aggregate data in each group.
+
+        Arguments:
+            col_data (Pandas Series or NumPy Array): data to aggregate
+            how (str or function): how to aggregate each group; can take any input valid for a Pandas aggregation
+            weighted (bool): if True, and `how` is 'mean', 'var', or 'std', compute weighted statistics (skipping NaNs)
+
+        Returns:
+            (NumPy Array): aggregated data, one entry per group
+        '''
+        col_data = pd.Series(col_data, copy=False)
+        weighted = weighted and (self.weights is not None) and (how in ['mean', 'var', 'std'])
+        # Check whether column can be aggregated using NumPy reductions
+        numpy_agg = isinstance(how, str) and (how in ['first', 'last', 'sum', 'min', 'max', 'mean', 'var', 'std', 'size']) and isinstance(col_data.dtype, np.dtype) and ((how in ['first', 'last', 'size']) or np.issubdtype(col_data.dtype, np.number) or (col_data.dtype == bool))
+        if numpy_agg and (not col_data.isna().any()):
+            # If column can be aggregated using NumPy reductions
+            return self.segment_agg(col_data.to_numpy(), how, weights=(self.weights if weighted else None))
+        if weighted:
+            # Otherwise, if column should be weighted, use Pandas to compute weighted statistics (skipping NaNs)
+            col_data = col_data.to_numpy()
+            w_groups = pd.Series(self.weights).groupby(self.group_ids, sort=self.groupby_sort)
+            weighted_groups = pd.Series(self.weights * col_data).groupby(self.group_ids, sort=self.groupby_sort)
+            if how in ['var', 'std']:
+                # If computing weighted variance
+                col_mean = weighted_groups.transform('sum').to_numpy() / w_groups.transform('sum').to_numpy()
+                weighted_groups = pd.Series(self.weights * ((col_data - col_mean) ** 2)).groupby(self.group_ids, sort=self.groupby_sort)
+            agg_data = weighted_groups.sum().to_numpy() / w_groups.sum().to_numpy()
+            if how == 'std':
+                # Take square root of variance
+                agg_data = np.sqrt(agg_data)
+            return agg_data
+        # Otherwise, use Pandas
+        return col_data.groupby(self.group_ids, sort=self.groupby_sort).agg(how).to_numpy()
+
 def compare_frames(frame1, frame2, size_variable='len', operator='geq', save_to_frame1=False, is_sorted=False):
     '''
     Compare two frames using a particular size property and operator.
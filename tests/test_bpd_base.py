@@ -2337,6 +2337,87 @@ def test_min_movers_frame_35():
         assert np.all(new_frame.loc[:, col].to_numpy() == new_frame4.loc[:, col].to_numpy())
         assert np.all(new_frame.loc[:, col].to_numpy() == new_frame5.loc[:, col].to_numpy())
 
+def test_restrict_35_1():
+    # Apply several minimum thresholds jointly.
+    # Using long/event study/long collapsed/event study collapsed.
+    df = bpd.SimBipartite(bpd.sim_params({'p_move': 0.05})).simulate(np.random.default_rng(1234))
+    bdf = bpd.BipartiteLong(df[['i', 'j', 'y', 't']]).clean()
+
+    for frame, params in [(bdf, {'min_obs': 5, 'min_workers': 20, 'min_movers': 10}), (bdf.collapse(), {'min_obs': 2, 'min_movers': 12})]:
+        # First, manually estimate the new frame by chaining restrictions until the set of observations stays the same between loops
+        new_frame = frame.copy()
+        loop = True
+        n_loops = 0
+        while loop:
+            n_loops += 1
+            prev_frame = new_frame
+            new_frame = prev_frame.min_obs_frame(params['min_obs'], id_col='i')
+            if 'min_workers' in params.keys():
+                new_frame = new_frame.min_workers_frame(params['min_workers'])
+            new_frame = new_frame.min_movers_frame(params['min_movers'])
+            loop = (len(new_frame) != len(prev_frame))
+
+        # Next, estimate the new frame using the built-in function
+        new_frame2 = frame.restrict(**params, id_col='i')
+        new_frame3 = frame.to_eventstudy().restrict(**params, id_col='i').to_long()
+
+        assert n_loops > 1
+        assert (0 < len(new_frame) < len(frame))
+        assert len(new_frame) == len(new_frame2) == len(new_frame3)
+        for col in frame.columns:
+            assert np.all(new_frame.loc[:, col].to_numpy() == new_frame2.loc[:, col].to_numpy())
+            assert np.all(new_frame.loc[:, col].to_numpy() == new_frame3.loc[:, col].to_numpy())
+
+def test_threshold_profile_35_2():
+    # Compute the data that survives a sweep of thresholds.
+    # Using long/long collapsed.
+    df = bpd.SimBipartite(bpd.sim_params({'p_move': 0.05})).simulate(np.random.default_rng(1234))
+    bdf = bpd.BipartiteLong(df[['i', 'j', 'y', 't']]).clean()
+
+    thresholds = [15, 1, 5, 10, 12]
+    for frame in [bdf, bdf.collapse()]:
+        profile = frame.threshold_profile('movers', thresholds, connectedness='connected')
+
+        assert np.all(profile.index.to_numpy() == sorted(thresholds))
+        for threshold in thresholds:
+            new_frame = frame.restrict(min_movers=threshold)
+            if len(new_frame) > 0:
+                new_frame_cc = new_frame._connected_components(connectedness='connected')
+            else:
+                new_frame_cc = new_frame
+            for new_frame_i, suffix in [(new_frame, ''), (new_frame_cc, '_connected')]:
+                assert profile.loc[threshold, f'n_firms{suffix}'] == new_frame_i.n_firms()
+                assert profile.loc[threshold, f'n_workers{suffix}'] == new_frame_i.n_workers()
+                assert profile.loc[threshold, f'n_movers{suffix}'] == new_frame_i.loc[new_frame_i.loc[:, 'm'].to_numpy() > 0, 'i'].nunique()
+                assert profile.loc[threshold, f'n_rows{suffix}'] == len(new_frame_i)
+        # Thresholds only ever drop data
+        assert np.all(np.diff(profile.loc[:, 'n_rows'].to_numpy()) <= 0)
+        assert profile.loc[1, 'n_rows'] == len(frame)
+        assert 0 < profile.loc[12, 'n_rows'] < len(frame)
+
+def test_lazy_35_3():
+    # Chain restrictions lazily.
+    # Using long/long collapsed.
+    rng = np.random.default_rng(1234)
+    df = bpd.SimBipartite(bpd.sim_params({'p_move': 0.05})).simulate(rng)
+    bdf = bpd.BipartiteLong(df[['i', 'j', 'y', 't']]).clean()
+
+    for frame in [bdf, bdf.collapse()]:
+        keep_firms = rng.choice(frame.loc[:, 'j'].unique(), size=frame.n_firms() - 20, replace=False)
+        drop_workers = rng.choice(frame.loc[:, 'i'].unique(), size=100, replace=False)
+        for drop_returns_to_stays in [False, True]:
+            lazy_frame = frame.lazy(drop_returns_to_stays=drop_returns_to_stays)
+            new_frame = lazy_frame.keep_ids('j', keep_firms).min_movers(10).drop_ids('i', drop_workers).min_obs(2, id_col='i').collect()
+            new_frame2 = frame.keep_ids('j', keep_firms, drop_returns_to_stays=drop_returns_to_stays).min_movers_frame(10, drop_returns_to_stays=drop_returns_to_stays).drop_ids('i', drop_workers).min_obs_frame(2, id_col='i', drop_returns_to_stays=drop_returns_to_stays)
+
+            assert isinstance(lazy_frame, bpd.LazyRestriction)
+            # Lazy restrictions don't alter the original chain
+            assert len(lazy_frame) == len(frame)
+            assert 0 < len(new_frame2) < len(frame)
+            assert len(new_frame) == len(new_frame2)
+            for col in frame.columns:
+                assert np.allclose(new_frame.loc[:, col].to_numpy(), new_frame2.loc[:, col].to_numpy())
+
 def test_construct_artificial_time_36():
     # Test construct_artificial_time() methods
     # First, on non-collapsed data
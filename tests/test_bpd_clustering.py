@@ -317,3 +317,211 @@ def test_cluster_5():
     assert bdf.iloc[6]['g'] == 1
     assert bdf.iloc[7]['g'] == 1
     assert bdf.iloc[8]['g'] == 2
+
+def test_cdfs_quantile_firm_6():
+    # Test firm-level quantiles for CDFs match a direct computation for each firm.
+    rng = np.random.default_rng(3456)
+    n_firms = 50
+    firm_size = rng.integers(1, 30, size=n_firms)
+    j = np.repeat(np.arange(n_firms), firm_size)
+    # Round compensation to create ties
+    y = rng.normal(size=len(j)).round(1)
+    w = rng.exponential(size=len(j))
+    frame = pd.DataFrame({'j': j, 'y': y, 'row_weights': w}).sample(frac=1, random_state=3456)
+
+    cdf_resolution = 7
+    cdfs = bpd.measures.CDFs(cdf_resolution=cdf_resolution, measure='quantile_firm')._compute_measure(frame, np.arange(n_firms))
+
+    quantiles = np.linspace(1 / cdf_resolution, 1, cdf_resolution)
+    for firm in range(n_firms):
+        frame_j = frame.loc[frame.loc[:, 'j'].to_numpy() == firm, :].sort_values('y', kind='stable')
+        y_j = frame_j.loc[:, 'y'].to_numpy()
+        w_j = frame_j.loc[:, 'row_weights'].to_numpy()
+        cum_w = w_j.cumsum() / w_j.sum()
+        for q, quantile in enumerate(quantiles):
+            # Index of first observation where the cumulative weight is above the quantile
+            idx = np.sum(cum_w <= quantile)
+            assert cdfs[firm, q] == y_j[min(idx, len(y_j) - 1)]
+
+def test_moments_7():
+    # Test firm-level moments match a direct computation for each firm.
+    rng = np.random.default_rng(4567)
+    n_firms = 50
+    firm_size = rng.integers(1, 30, size=n_firms)
+    j = np.repeat(np.arange(n_firms), firm_size)
+    y = rng.normal(size=len(j))
+    # Firm 0 has no variation in compensation
+    y[: firm_size[0]] = 1
+    w = rng.exponential(size=len(j))
+    frame = pd.DataFrame({'j': j, 'y': y, 'row_weights': w}).sample(frac=1, random_state=4567)
+
+    moments = bpd.measures.Moments(measures=['mean', 'var', 'max', 'min', 'skew', 'kurt', 0.5])._compute_measure(frame, np.arange(n_firms))
+    cdfs = bpd.measures.CDFs(cdf_resolution=2, measure='quantile_firm')._compute_measure(frame, np.arange(n_firms))
+
+    for firm in range(n_firms):
+        frame_j = frame.loc[frame.loc[:, 'j'].to_numpy() == firm, :]
+        y_j = frame_j.loc[:, 'y'].to_numpy()
+        w_j = frame_j.loc[:, 'row_weights'].to_numpy()
+        mean = np.average(y_j, weights=w_j)
+        var = np.average((y_j - mean) ** 2, weights=w_j)
+        assert np.isclose(moments[firm, 0], mean)
+        assert np.isclose(moments[firm, 1], var)
+        assert moments[firm, 2] == np.max(y_j)
+        assert moments[firm, 3] == np.min(y_j)
+        if np.min(y_j) == np.max(y_j):
+            # Includes firm 0 and firms with 1 observation
+            assert moments[firm, 4] == moments[firm, 5] == 0
+        else:
+            assert np.isclose(moments[firm, 4], np.average((y_j - mean) ** 3, weights=w_j) / var ** 1.5)
+            assert np.isclose(moments[firm, 5], np.average((y_j - mean) ** 4, weights=w_j) / var ** 2 - 3)
+        assert moments[firm, 6] == cdfs[firm, 0]
+
+def test_cluster_minibatch_8():
+    # Test cluster function works with mini-batch KMeans, and that it is reproducible.
+    rng = np.random.default_rng(5678)
+    nk = 10
+    sim_data = bpd.SimBipartite(bpd.sim_params({'nk': nk})).simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean()
+
+    grouping = bpd.grouping.MiniBatchKMeans(n_clusters=nk, batch_size=256, n_batches=50, chunk_size=100)
+    bdf_1 = bdf.cluster(bpd.cluster_params({'grouping': grouping}), np.random.default_rng(6789))
+    bdf_2 = bdf.cluster(bpd.cluster_params({'grouping': grouping}), np.random.default_rng(6789))
+
+    assert np.all(bdf_1.loc[:, 'g'].to_numpy() == bdf_2.loc[:, 'g'].to_numpy())
+    assert bdf_1.loc[:, 'g'].nunique() == nk
+
+    # Firms with the same true firm effect should mostly share a cluster
+    clusters = pd.DataFrame({'psi': sim_data.loc[:, 'psi'].to_numpy(), 'g': bdf_1.loc[:, 'g'].to_numpy()})
+    share_largest_cluster = clusters.groupby('psi')['g'].agg(lambda g: g.value_counts().iloc[0] / len(g))
+    assert share_largest_cluster.mean() > 0.8
+
+def test_cluster_silhouette_9():
+    # Test estimating silhouette scores using a sample of firms from each cluster.
+    rng = np.random.default_rng(7890)
+    nk = 10
+    sim_data = bpd.SimBipartite(bpd.sim_params({'nk': nk})).simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean()
+
+    grouping = bpd.grouping.KMeans(n_clusters=nk)
+    bdf_1, scores = bdf.cluster(bpd.cluster_params({'grouping': grouping, 'silhouette': True}), np.random.default_rng(8901))
+    # If the sample includes all firms, estimates are exact
+    bdf_2, scores_2, scores_se_2 = bdf.cluster(bpd.cluster_params({'grouping': grouping, 'silhouette': True, 'silhouette_sample_size': bdf.n_firms(), 'silhouette_chunk_size': 100}), np.random.default_rng(8901))
+    # Otherwise, estimates are close
+    bdf_3, scores_3, scores_se_3 = bdf.cluster(bpd.cluster_params({'grouping': grouping, 'silhouette': True, 'silhouette_sample_size': 20, 'silhouette_chunk_size': 100}), np.random.default_rng(8901))
+
+    assert np.all(bdf_1.loc[:, 'g'].to_numpy() == bdf_2.loc[:, 'g'].to_numpy())
+    assert np.allclose(scores, scores_2)
+    assert np.all(scores_se_2 == 0)
+    assert np.all(scores_se_3 >= 0) and np.any(scores_se_3 > 0)
+    assert abs(np.mean(scores_3) - np.mean(scores)) < 0.05
+    assert np.mean(np.abs(scores_3 - scores)) < 3 * np.mean(scores_se_3)
+
+def test_cluster_grid_10():
+    # Test estimating KMeans for a grid of numbers of clusters and seeds.
+    rng = np.random.default_rng(9012)
+    sim_data = bpd.SimBipartite().simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean().collapse().to_eventstudy()
+
+    params = bpd.cluster_params({'grouping': bpd.grouping.KMeans(n_init=1), 'silhouette': True, 'silhouette_sample_size': 50})
+    grid_1 = bdf.cluster_grid(ks=[2, 4, 6], n_init_seeds=2, n_jobs=1, params=params, rng=np.random.default_rng(123))
+    # Results don't depend on the number of processes
+    grid_2 = bdf.cluster_grid(ks=[2, 4, 6], n_init_seeds=2, n_jobs=2, params=params, rng=np.random.default_rng(123))
+
+    assert len(grid_1) == 6
+    assert np.all(grid_1.results.loc[:, 'k'].to_numpy() == [2, 2, 4, 4, 6, 6])
+    assert np.all(grid_1.results.loc[:, 'seed'].to_numpy() == [0, 1, 0, 1, 0, 1])
+    assert grid_1.results.equals(grid_2.results)
+    assert np.all(grid_1.labels == grid_2.labels)
+    # Inertia decreases with the number of clusters
+    inertia = grid_1.results.groupby('k')['inertia'].min().to_numpy()
+    assert np.all(np.diff(inertia) < 0)
+    assert grid_1.best() == np.argmax(grid_1.results.loc[:, 'silhouette'].to_numpy())
+    assert grid_1.results.loc[grid_1.best(k=4), 'inertia'] == grid_1.results.loc[grid_1.results.loc[:, 'k'] == 4, 'inertia'].min()
+    assert 'g1' not in bdf.columns
+
+    # Attach labels from a configuration
+    config = grid_1.best(k=6)
+    bdf_grid = grid_1.attach(config)
+    clusters = dict(zip(grid_1.jids, grid_1.labels[config]))
+    assert bdf_grid.n_clusters() == 6
+    assert np.all(bdf_grid.loc[:, 'g1'].to_numpy() == bdf_grid.loc[:, 'j1'].map(clusters).to_numpy())
+    assert np.all(bdf_grid.loc[:, 'g2'].to_numpy() == bdf_grid.loc[:, 'j2'].map(clusters).to_numpy())
+
+    # Unsorted data isn't altered, and gives the same results
+    bdf_unsorted = bdf.iloc[rng.permutation(len(bdf))]
+    bdf_unsorted_original = pd.DataFrame(bdf_unsorted).copy()
+    grid_3 = bdf_unsorted.cluster_grid(ks=[2, 4, 6], n_init_seeds=2, n_jobs=1, params=params, rng=np.random.default_rng(123))
+    assert pd.DataFrame(bdf_unsorted).equals(bdf_unsorted_original)
+    assert grid_1.results.equals(grid_3.results)
+
+    # Seeds can be given explicitly, in which case results don't depend on rng
+    grid_4 = bdf.cluster_grid(ks=[2, 4], n_init_seeds=[11, 11, 12], params=params, rng=np.random.default_rng(1))
+    grid_5 = bdf.cluster_grid(ks=[2, 4], n_init_seeds=[12], params=params, rng=np.random.default_rng(2))
+    assert np.all(grid_4.results.loc[:, 'seed'].to_numpy() == [11, 11, 12, 11, 11, 12])
+    assert np.all(grid_4.labels[0] == grid_4.labels[1]) and np.all(grid_4.labels[3] == grid_4.labels[4])
+    assert grid_4.results.iloc[[2, 5]].reset_index(drop=True).equals(grid_5.results)
+    assert np.all(grid_4.labels[[2, 5]] == grid_5.labels)
+
+    # Silhouette scores are skipped if silhouette=False
+    params_no_silhouette = params.copy()
+    params_no_silhouette['silhouette'] = False
+    grid_6 = bdf.cluster_grid(ks=[2, 4], n_init_seeds=[12], params=params_no_silhouette)
+    assert grid_6.results.loc[:, 'silhouette'].isna().all()
+    assert grid_6.results.loc[:, 'inertia'].equals(grid_5.results.loc[:, 'inertia'])
+    assert np.all(grid_6.labels == grid_5.labels)
+    with pytest.raises(ValueError):
+        grid_6.best()
+
+    # Invalid arguments raise an error before estimating
+    for kwargs in [{'ks': []}, {'ks': [1, 2]}, {'n_jobs': 0}, {'n_init_seeds': 0}]:
+        with pytest.raises(ValueError):
+            bdf.cluster_grid(params=params, **kwargs)
+
+def test_cluster_measures_11():
+    # Test clustering using precomputed measures.
+    rng = np.random.default_rng(1234)
+    sim_data = bpd.SimBipartite().simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean()
+
+    measures = [bpd.measures.CDFs(), bpd.measures.Moments(measures='mean')]
+    cm = bdf.compute_cluster_measures(measures=measures, stayers_movers='movers')
+    assert cm.measures.shape == (len(cm), 11)
+    assert len(cm.weights) == len(cm.jids)
+    assert 'row_weights' not in bdf.columns
+
+    for nk in [3, 6]:
+        params = bpd.cluster_params({'measures': measures, 'grouping': bpd.grouping.KMeans(n_clusters=nk), 'stayers_movers': 'movers'})
+        bdf_1 = bdf.cluster(params, rng=np.random.default_rng(2345))
+        bdf_2 = bdf.cluster(params, rng=np.random.default_rng(2345), cluster_measures=cm)
+        assert bdf_2.n_clusters() == nk
+        assert bdf_1.loc[:, 'g'].equals(bdf_2.loc[:, 'g'])
+
+    # Precomputed measures can also be used for clustering grids
+    grid_1 = bdf.cluster_grid(ks=[3, 6], params=params, rng=np.random.default_rng(3456))
+    grid_2 = bdf.cluster_grid(ks=[3, 6], params=params, rng=np.random.default_rng(3456), cluster_measures=cm)
+    assert grid_1.results.equals(grid_2.results)
+
+    # Computing measures doesn't alter unsorted data
+    bdf_es = bdf.to_eventstudy()
+    bdf_es = bdf_es.iloc[rng.permutation(len(bdf_es))]
+    bdf_es_original = pd.DataFrame(bdf_es).copy()
+    cm_es = bdf_es.compute_cluster_measures(measures=measures, stayers_movers='movers', is_sorted=False)
+    assert pd.DataFrame(bdf_es).equals(bdf_es_original)
+    assert np.all(cm_es.jids == cm.jids)
+    assert np.allclose(cm_es.measures, cm.measures)
+
+def test_silhouette_sample_size_12():
+    # Test that estimated silhouette scores are defined for the smallest valid sample size.
+    rng = np.random.default_rng(4567)
+    data = np.concatenate([rng.normal(loc=loc, size=(n, 2)) for loc, n in [(0, 50), (5, 70), (10, 80)]])
+    labels = np.repeat([0, 1, 2], [50, 70, 80])
+
+    scores, scores_se = bpd.util.sampled_silhouette_samples(data, labels, sample_size=2, rng=rng)
+    assert not np.any(np.isnan(scores))
+    assert not np.any(np.isnan(scores_se))
+
+    # Sampling only 1 observation per cluster leaves sampled observations with no other sampled observation in their cluster
+    with pytest.raises(ValueError):
+        bpd.util.sampled_silhouette_samples(data, labels, sample_size=1, rng=rng)
+    with pytest.raises(ValueError):
+        bpd.cluster_params({'silhouette_sample_size': 1})
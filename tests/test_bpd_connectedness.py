@@ -776,3 +776,93 @@ def test_connectedness_strongly_loo():
         # Check that it's strongly connected
         bdf4_strong = bdf4.clean(clean_params_strong)
         assert len(bdf4) == len(bdf4_strong)
+
+def test_component_table():
+    # Test that component tables give the size of each component after restricting the data to that component.
+    sim_params = bpd.sim_params({'n_workers': 1000, 'firm_size': 5, 'p_move': 0.03})
+    sim_data = bpd.SimBipartite(sim_params).simulate(rng=np.random.default_rng(1234))
+    bdf = bpd.BipartiteDataFrame(sim_data).clean(bpd.clean_params({'connectedness': None, 'verbose': False}))
+
+    for collapse in [False, True]:
+        if collapse:
+            bdf = bdf.collapse()
+        for connectedness in ['connected', 'strongly_connected']:
+            cc_table, bdf_cc = bdf.component_table(connectedness, add_labels=True)
+
+            if connectedness == 'connected':
+                # Each observation belongs to exactly one component
+                assert cc_table.loc[:, 'len'].sum() == len(bdf)
+                assert cc_table.loc[:, 'workers'].sum() == bdf.n_workers()
+
+            for cc in cc_table.index[: 10]:
+                bdf_sub = bdf.keep_ids('j', bdf_cc.loc[bdf_cc.loc[:, 'cc'].to_numpy() == cc, 'j'].unique(), is_sorted=True, copy=True)
+                worker_m = bdf_sub.get_worker_m(is_sorted=True)
+                assert cc_table.loc[cc, 'len'] == len(bdf_sub)
+                assert cc_table.loc[cc, 'firms'] == bdf_sub.n_firms()
+                assert cc_table.loc[cc, 'workers'] == bdf_sub.n_workers()
+                assert cc_table.loc[cc, 'stayers'] == bdf_sub.loc[bdf_sub.loc[:, 'm'].to_numpy() == 0, :].n_unique_ids('i')
+                assert cc_table.loc[cc, 'movers'] == bdf_sub.loc[bdf_sub.loc[:, 'm'].to_numpy() > 0, :].n_unique_ids('i')
+                assert cc_table.loc[cc, 'len_stayers'] == (~worker_m).sum()
+                assert cc_table.loc[cc, 'len_movers'] == worker_m.sum()
+                assert cc_table.loc[cc, 'stays'] == (bdf_sub.loc[:, 'm'].to_numpy() == 0).sum()
+                assert cc_table.loc[cc, 'moves'] == (bdf_sub.loc[:, 'm'].to_numpy() > 0).sum()
+
+            # Largest component in the table should match the component kept by cleaning
+            bdf_clean = bdf.clean(bpd.clean_params({'connectedness': connectedness, 'component_size_variable': 'workers', 'verbose': False}))
+            assert bdf_clean.n_workers() == cc_table.loc[:, 'workers'].max()
+
+def test_connectedness_leave_out_worker_block_cut_tree():
+    # Test that the block-cut tree method for leave-one-worker-out connectedness gives the same result as the recursive method.
+    sim_params = bpd.sim_params({'n_workers': 500, 'firm_size': 5, 'p_move': 0.05})
+    sim_data = bpd.SimBipartite(sim_params).simulate(rng=np.random.default_rng(2345))
+
+    for collapse in [False, True]:
+        for component_size_variable in ['firms', 'workers']:
+            bdfs = []
+            for block_cut_tree in [True, False]:
+                clean_params = bpd.clean_params(
+                    {
+                        'connectedness': 'leave_out_worker',
+                        'collapse_at_connectedness_measure': collapse,
+                        'component_size_variable': component_size_variable,
+                        'leave_out_worker_block_cut_tree': block_cut_tree,
+                        'verbose': False
+                    }
+                )
+                bdfs.append(bpd.BipartiteDataFrame(sim_data).clean(clean_params))
+
+            assert len(bdfs[0]) == len(bdfs[1]) > 0
+            assert bdfs[0].n_firms() == bdfs[1].n_firms()
+            assert bdfs[0].n_workers() == bdfs[1].n_workers()
+
+def test_strong_components_min_moves():
+    # Test that updating strongly connected components as firms with fewer than 2 moves are dropped gives the same components as recomputing the full graph after every drop.
+    def _naive_strong_components(bdf):
+        bdf = bdf.min_moves_frame(2, is_sorted=True, copy=True)
+        if len(bdf) == 0:
+            return []
+        G, _ = bdf._construct_graph('strongly_connected', is_sorted=True, copy=False)
+        firms = bdf.loc[:, 'j'].unique()
+        scc_list = [np.array(scc) for scc in G.components(mode='strong')]
+        scc_list = [scc[np.isin(scc, firms)] for scc in scc_list]
+        scc_list = [scc for scc in scc_list if len(scc) > 0]
+        if len(scc_list) == 1:
+            return [frozenset(scc_list[0])]
+        res = []
+        for scc in scc_list:
+            res += _naive_strong_components(bdf.keep_ids('j', scc, is_sorted=True, copy=True))
+        return res
+
+    rng = np.random.default_rng(5)
+    n_workers, n_firms, n_time = 60, 80, 4
+    n_split = 0
+    for _ in range(20):
+        df = pd.DataFrame({'i': np.repeat(np.arange(n_workers), n_time), 'j': rng.integers(n_firms, size=n_workers * n_time), 'y': rng.normal(size=n_workers * n_time), 't': np.tile(np.arange(n_time), n_workers)})
+        bdf = bpd.BipartiteLong(df).clean(bpd.clean_params({'connectedness': None, 'verbose': False}))
+        for bdf_i in [bdf, bdf.collapse()]:
+            scc_list = set(map(frozenset, bdf_i._strong_components_min_moves(is_sorted=True)))
+            assert scc_list == set(_naive_strong_components(bdf_i))
+            n_split += (len(scc_list) > 1)
+
+    # Make sure some components split
+    assert n_split > 0
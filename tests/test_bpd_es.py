@@ -136,3 +136,125 @@ def test_get_cs_2():
     assert movers0.iloc[1]['y2'] == 1
     assert movers0.iloc[1]['t1'] == 2
     assert movers0.iloc[1]['t2'] == 1
+
+def test_to_long_3():
+    # Test that to_long() recovers long data from event study data.
+    rng = np.random.default_rng(1234)
+    a = bpd.BipartiteLong(bpd.SimBipartite().simulate(rng)[['i', 'j', 'y', 't']]).clean(bpd.clean_params({'verbose': False}))
+    a = a.add_column('c', [rng.integers(0, 5, len(a))], long_es_split=True, dtype='int')
+    b = a.to_eventstudy(is_sorted=True, copy=True)
+
+    # Clean data
+    c = b.to_long(is_sorted=True, copy=True)
+    assert pd.DataFrame(a).equals(pd.DataFrame(c).reindex(a.columns, axis=1))
+    assert bpd.util.to_list(c.col_reference_dict['c']) == ['c']
+
+    # Data that isn't clean unstacks each move, so observations that are in two consecutive event studies appear twice
+    d = b.to_long(is_clean=False, is_sorted=True, copy=True)
+    assert len(d) == len(b) + b.get_worker_m(is_sorted=True).sum()
+    cols = ['i', 'j', 'y', 't', 'c']
+    assert pd.DataFrame(a).loc[:, cols].equals(pd.DataFrame(d).loc[:, cols].drop_duplicates().reset_index(drop=True))
+    assert np.all(np.diff(d.loc[:, 'i'].to_numpy()) >= 0)
+
+def test_collapse_4():
+    # Test that collapse() for BipartiteEventStudy gives the same result as converting to long, collapsing, and converting back to event study.
+    rng = np.random.default_rng(1234)
+    df = bpd.SimBipartite().simulate(rng)[['i', 'j', 'y', 't']]
+    # Introduce returns
+    df.loc[:, 'j'] = df.loc[:, 'j'] // 5
+    df.loc[:, 'w'] = rng.uniform(0.5, 2, len(df))
+    a = bpd.BipartiteLong(df)
+    a = a.add_column('c', [rng.normal(size=len(a))], long_es_split=False, dtype='float', how_collapse='var')
+    a = a.clean(bpd.clean_params({'drop_returns': False, 'verbose': False})).to_eventstudy(is_sorted=True, copy=False)
+
+    for level in ['spell', 'match']:
+        b = a.collapse(level=level, is_sorted=True, copy=True)
+        c = a.to_long(is_sorted=True, copy=True).collapse(level=level, is_sorted=True, copy=False).to_eventstudy(is_sorted=True, copy=False)
+        assert isinstance(b, bpd.BipartiteEventStudyCollapsed)
+        assert pd.DataFrame(b).equals(pd.DataFrame(c))
+        assert b.col_reference_dict == c.col_reference_dict
+        assert b.no_returns == c.no_returns
+
+def test_get_cs_lazy_5():
+    # Test that lazy get_cs() for BipartiteEventStudy gives the same data as the materialized cross section.
+    a = bpd.BipartiteLong(bpd.SimBipartite().simulate(np.random.default_rng(1234))[['i', 'j', 'y', 't']]).clean(bpd.clean_params({'verbose': False})).to_eventstudy(is_sorted=True, copy=False)
+    b = a.get_cs(lazy=True)
+    c = a.get_cs()
+
+    assert isinstance(b, bpd.CrossSection)
+    assert len(b) == len(c)
+    assert b.columns == list(c.columns)
+    for col in c.columns:
+        assert np.array_equal(b[col], c.loc[:, col].to_numpy())
+        assert np.array_equal(b.get(col, cs=0), c.loc[c.loc[:, 'cs'].to_numpy() == 0, col].to_numpy())
+    assert b.to_frame().equals(c)
+
+    with pytest.raises(KeyError):
+        b['g1']
+
+def test_drop_i_t_duplicates_6():
+    # Test that _drop_i_t_duplicates() for BipartiteEventStudy only repairs workers with duplicates, and gives the same result as dropping duplicates in long format.
+    rng = np.random.default_rng(1234)
+    a = bpd.BipartiteLong(bpd.SimBipartite().simulate(rng)[['i', 'j', 'y', 't']]).clean(bpd.clean_params({'verbose': False})).to_eventstudy(is_sorted=True, copy=False)
+
+    # Clean data is unchanged
+    assert not a._get_i_t_repair_rows(is_sorted=True).any()
+    assert pd.DataFrame(a._drop_i_t_duplicates(is_sorted=True, copy=True)).equals(pd.DataFrame(a))
+
+    # Duplicate some rows with different income
+    data = pd.DataFrame(a)
+    dup = data.iloc[: 20].copy()
+    dup.loc[:, 'y1'] += 1
+    data = pd.concat([data, dup]).sort_values(['i', 't1'], kind='stable').reset_index(drop=True)
+    b = a._constructor(data, log=False)
+    b._set_attributes(a)
+
+    repair_rows = b._get_i_t_repair_rows(is_sorted=True)
+    assert repair_rows.any() and not repair_rows.all()
+    assert set(b.loc[repair_rows, 'i']) == set(dup.loc[:, 'i'])
+
+    for how in ['max', 'mean']:
+        c = b._drop_i_t_duplicates(how=how, is_sorted=True, copy=True)
+        d = b.to_long(is_clean=False, is_sorted=True, copy=True)
+        d.drop_duplicates(inplace=True)
+        d = d._drop_i_t_duplicates(how=how, is_sorted=True, copy=False).to_eventstudy(is_sorted=True, copy=False)
+        assert c.i_t_unique
+        assert pd.DataFrame(c).equals(pd.DataFrame(d))
+
+def test_leave_out_7():
+    # Test that leave-one-out connected components for BipartiteEventStudy give the same result as computing them in long format.
+    rng = np.random.default_rng(1234)
+    df = bpd.SimBipartite(bpd.sim_params({'n_workers': 400, 'firm_size': 5, 'p_move': 0.3})).simulate(rng)[['i', 'j', 'y', 't']]
+    a = bpd.BipartiteLong(df).clean(bpd.clean_params({'connectedness': None, 'verbose': False}))
+    a = a.add_column('c', [rng.normal(size=len(a))], long_es_split=True, dtype='float')
+
+    for b in [a, a.collapse(is_sorted=True, copy=True)]:
+        c = b.to_eventstudy(is_sorted=True, copy=True)
+        for connectedness in ['connected', 'leave_out_observation', 'leave_out_spell', 'leave_out_match', 'leave_out_worker', 'strongly_leave_out_worker']:
+            d = c._connected_components(connectedness=connectedness, is_sorted=True, copy=True)
+            e = b._connected_components(connectedness=connectedness, is_sorted=True, copy=True).to_eventstudy(is_sorted=True, copy=False)
+            assert pd.DataFrame(d).equals(pd.DataFrame(e))
+
+    # Workers who keep all of their firms are unchanged
+    c = a.to_eventstudy(is_sorted=True, copy=True)
+    firms = c.unique_ids('j')[::2]
+    d = c.keep_ids('j', firms, is_sorted=True, copy=True)
+    assert set(d.unique_ids('j')) <= set(firms)
+    keep_workers = c.loc[c.loc[:, 'j1'].isin(firms) & c.loc[:, 'j2'].isin(firms), 'i'].unique()
+    keep_workers = np.setdiff1d(keep_workers, c.loc[~(c.loc[:, 'j1'].isin(firms) & c.loc[:, 'j2'].isin(firms)), 'i'].unique())
+    assert pd.DataFrame(c.loc[c.loc[:, 'i'].isin(keep_workers), :]).reset_index(drop=True).equals(pd.DataFrame(d.loc[d.loc[:, 'i'].isin(keep_workers), :]).reset_index(drop=True))
+
+def test_keep_ids_unsorted_8():
+    # Test that keeping ids for unsorted BipartiteEventStudy with copy=True doesn't alter the original dataframe.
+    rng = np.random.default_rng(2345)
+    df = bpd.SimBipartite(bpd.sim_params({'n_workers': 400, 'firm_size': 5, 'p_move': 0.3})).simulate(rng)[['i', 'j', 'y', 't']]
+    a = bpd.BipartiteLong(df).clean(bpd.clean_params({'connectedness': None, 'verbose': False})).to_eventstudy(is_sorted=True, copy=False)
+    b = a.iloc[rng.permutation(len(a))]
+    b_original = pd.DataFrame(b).copy()
+
+    firms = a.unique_ids('j')[::2]
+    c = b.keep_ids('j', firms, is_sorted=False, copy=True)
+    d = a.keep_ids('j', firms, is_sorted=True, copy=True)
+
+    assert pd.DataFrame(b).equals(b_original)
+    assert pd.DataFrame(c).equals(pd.DataFrame(d))
@@ -161,6 +161,105 @@ def test_long_to_extendedeventstudy_4_2():
 
     assert len(es_extended_3) == len(es_extended_4)
 
+def test_long_to_extendedeventstudy_5():
+    # Test to_extendedeventstudy() by making sure each row gives consecutive observations for a single worker, and unsorted data gives the same result as sorted data
+    rng = np.random.default_rng(8598)
+    sim_data = bpd.SimBipartite(bpd.sim_params({'n_time': 8})).simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean()
+    bdf_unsorted = bpd.BipartiteLong(pd.DataFrame(bdf).sample(frac=1, random_state=8598), log=False)
+
+    es_extended_1 = bdf.to_extendedeventstudy(periods_pre=2, periods_post=3, stable_post='j', transition_col='j', move_to_worker=False, is_sorted=True)
+    es_extended_2 = bdf_unsorted.to_extendedeventstudy(periods_pre=2, periods_post=3, stable_post='j', transition_col='j', move_to_worker=False)
+
+    assert len(es_extended_1) > 0
+    assert np.all(pd.DataFrame(es_extended_1).to_numpy() == pd.DataFrame(es_extended_2).to_numpy())
+    for t in range(1, 5):
+        assert np.all(es_extended_1.loc[:, f't{t + 1}'].to_numpy() == es_extended_1.loc[:, f't{t}'].to_numpy() + 1)
+    assert np.all(es_extended_1.loc[:, 'j2'].to_numpy() != es_extended_1.loc[:, 'j3'].to_numpy())
+    assert np.all(es_extended_1.loc[:, 'm'].to_numpy() == 1)
+    # Each row starts at an observation of its worker
+    starts = pd.DataFrame(es_extended_1).merge(pd.DataFrame(bdf), left_on=['i', 't1', 'j1', 'y1'], right_on=['i', 't', 'j', 'y'], how='left')
+    assert not starts.loc[:, 'j'].isna().any()
+
+def test_long_to_extendedeventstudy_6():
+    # Test that extended event study data can be accessed as (n_rows, n_periods, n_subcols) arrays, and that to_long(), gen_m(), and _drop_returns() are consistent with them
+    rng = np.random.default_rng(8599)
+    sim_data = bpd.SimBipartite(bpd.sim_params({'n_time': 6})).simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean().collapse()
+
+    es_extended = bdf.to_extendedeventstudy(periods_pre=2, periods_post=2, stable_pre='j', stable_post='j', move_to_worker=False, is_sorted=True)
+    t = es_extended._get_period_array('t')
+    assert t.shape == (len(es_extended), 4, 2)
+    assert np.all(t[:, 2, 1] == es_extended.loc[:, 't32'].to_numpy())
+    j = es_extended._get_period_array('j')[:, :, 0]
+    assert np.all(j[:, 0] == j[:, 1]) and np.all(j[:, 2] == j[:, 3])
+
+    # m is recomputed from all periods
+    assert np.all(es_extended.drop('m', axis=1, allow_optional=True).gen_m().loc[:, 'm'].to_numpy() == es_extended.loc[:, 'm'].to_numpy())
+
+    # Converting to long gives the original observations
+    long_data = pd.DataFrame(es_extended.to_long(is_sorted=True)).loc[:, ['i', 'j', 'y', 't1', 't2', 'w']]
+    merged = long_data.merge(pd.DataFrame(bdf), on=['i', 'j', 'y', 't1', 't2', 'w'], how='left', indicator=True)
+    assert np.all(merged.loc[:, '_merge'] == 'both')
+
+    # Period arrays computed once in an operation are reused, and give the same result
+    period_arrays = {}
+    assert es_extended._get_period_array('j', period_arrays) is es_extended._get_period_array('j', period_arrays)
+    assert pd.DataFrame(es_extended._to_long(is_sorted=True, period_arrays=period_arrays)).equals(pd.DataFrame(es_extended.to_long(is_sorted=True)))
+
+    # Data without returns is unchanged by dropping returns
+    es_no_returns = es_extended._drop_returns(how='returns', is_sorted=True, copy=True)
+    assert es_no_returns.no_returns
+    assert pd.DataFrame(es_no_returns).equals(pd.DataFrame(es_extended))
+
+def test_long_to_eventstudy_5():
+    # Test to_eventstudy() by making sure unsorted data gives event study data sorted by i and t, with one row for each observation of a stayer and for each pair of consecutive observations of a mover
+    rng = np.random.default_rng(8597)
+    sim_data = bpd.SimBipartite().simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean()
+    bdf_unsorted = bpd.BipartiteLong(pd.DataFrame(bdf).sample(frac=1, random_state=8597), log=False)
+
+    es = bdf_unsorted.to_eventstudy()
+
+    i_col = bdf.loc[:, 'i'].to_numpy()
+    worker_m = bdf.get_worker_m(is_sorted=True)
+    assert len(es) == np.sum(~worker_m) + np.sum(worker_m[1:] & (i_col[1:] == i_col[: -1]))
+    assert np.all(es.index.to_numpy() == np.arange(len(es)))
+    assert np.all(np.diff(es.loc[:, 'i'].to_numpy()) >= 0)
+    same_i = (np.diff(es.loc[:, 'i'].to_numpy()) == 0)
+    assert np.all(np.diff(es.loc[:, 't1'].to_numpy())[same_i] > 0)
+    assert np.all(es.loc[:, 'm'].to_numpy() == (es.loc[:, 'j1'].to_numpy() != es.loc[:, 'j2'].to_numpy()))
+    assert np.all(es.loc[es.loc[:, 'm'].to_numpy() > 0, 't2'].to_numpy() == es.loc[es.loc[:, 'm'].to_numpy() > 0, 't1'].to_numpy() + 1)
+    assert np.all(es.to_long(is_sorted=True).loc[:, ['i', 'j', 'y', 't']].to_numpy() == bdf.loc[:, ['i', 'j', 'y', 't']].to_numpy())
+
+def test_long_iter_eventstudy_6(tmp_path):
+    # Test iter_eventstudy() by making sure the chunks combine into the same data as to_eventstudy(), and that chunks are bounded by the chunk size and written to Parquet
+    rng = np.random.default_rng(8598)
+    sim_data = bpd.SimBipartite().simulate(rng)
+    bdf = bpd.BipartiteLong(sim_data[['i', 'j', 'y', 't']]).clean()
+    bdf_unsorted = bpd.BipartiteLong(pd.DataFrame(bdf).sample(frac=1, random_state=8598), log=False)
+
+    for move_to_worker in [False, True]:
+        path = tmp_path / f'es_{move_to_worker}'
+        es = bdf.to_eventstudy(move_to_worker=move_to_worker, is_sorted=True)
+        es_chunks = list(bdf_unsorted.iter_eventstudy(chunk_size=1000, path=str(path), move_to_worker=move_to_worker))
+
+        assert len(es_chunks) > 1
+        assert all(isinstance(es_chunk, bpd.BipartiteEventStudy) for es_chunk in es_chunks)
+        if not move_to_worker:
+            # No worker is split between chunks, and chunks are bounded by the chunk size
+            assert sum(es_chunk.n_workers() for es_chunk in es_chunks) == es.n_workers()
+            assert all(len(es_chunk.to_long(is_sorted=True)) <= 1000 for es_chunk in es_chunks)
+        assert pd.concat([pd.DataFrame(es_chunk) for es_chunk in es_chunks], ignore_index=True).equals(pd.DataFrame(es))
+        assert pd.read_parquet(path).equals(pd.DataFrame(es))
+
+    # Invalid chunk sizes raise an error when the method is called, rather than when iteration starts
+    with pytest.raises(ValueError):
+        bdf.iter_eventstudy(chunk_size=0)
+    # Reusing a directory with part files raises an error when the method is called, rather than mixing old and new chunks
+    with pytest.raises(ValueError):
+        bdf.iter_eventstudy(chunk_size=1000, path=str(tmp_path / 'es_False'))
+
 # Only uncomment for manual testing - this produces a graph which pauses the testing
 # def test_long_plot_extended_eventstudy_5():
 #     # Test plot_extended_eventstudy() by making sure it doesn't crash
@@ -354,3 +453,40 @@ def test_weighted_collapse_2():
     y_mean = (1 * 1 + 2 * 1.5) / (1 + 2)
     assert bdf.iloc[5]['y'] == (1 * (1 - y_mean) ** 2 + 2 * (1.5 - y_mean) ** 2) / (1 + 2)
     assert bdf.iloc[6]['y'] == 0
+
+def test_weighted_collapse_3():
+    # Test that collapsing with NumPy reductions matches a Pandas groupby, and that collapsing doesn't modify the original dataframe.
+    rng = np.random.default_rng(1234)
+    sim_data = bpd.SimBipartite(bpd.sim_params({'n_workers': 500, 'p_move': 0.3})).simulate(rng)
+    sim_data.loc[:, 'w'] = rng.uniform(0.5, 2, len(sim_data))
+    bdf = bpd.BipartiteLong(sim_data.loc[:, ['i', 'j', 'y', 't', 'w']], log=False).clean()
+    bdf = bdf.add_column('v', [rng.normal(size=len(bdf))], dtype='float', how_collapse='std')
+    bdf = bdf.add_column('x', [rng.integers(10, size=len(bdf))], dtype='int', how_collapse='max')
+    bdf = bdf.add_column('z', [rng.normal(size=len(bdf))], dtype='float', how_collapse=lambda a: a.iloc[-1] - a.iloc[0])
+    cols = list(bdf.columns)
+
+    for level in ['spell', 'match']:
+        bdf_collapsed = bdf.collapse(level=level, is_sorted=True, copy=False)
+
+        assert list(bdf.columns) == cols
+
+        if level == 'spell':
+            group_ids = bdf._get_spell_ids(is_sorted=True, copy=False)
+        else:
+            group_ids = bdf.groupby(['i', 'j'], sort=False).ngroup().to_numpy()
+        w = bdf.loc[:, 'w'].to_numpy()
+        groups = pd.DataFrame(bdf).groupby(group_ids, sort=False)
+        w_sum = groups['w'].sum().to_numpy()
+        y_mean = pd.Series(w * bdf.loc[:, 'y'].to_numpy()).groupby(group_ids, sort=False).sum().to_numpy() / w_sum
+        v_mean = pd.Series(w * bdf.loc[:, 'v'].to_numpy()).groupby(group_ids, sort=False).transform('sum').to_numpy() / groups['w'].transform('sum').to_numpy()
+        v_std = np.sqrt(pd.Series(w * (bdf.loc[:, 'v'].to_numpy() - v_mean) ** 2).groupby(group_ids, sort=False).sum().to_numpy() / w_sum)
+
+        assert np.all(bdf_collapsed.loc[:, 'i'].to_numpy() == groups['i'].first().to_numpy())
+        assert np.all(bdf_collapsed.loc[:, 'j'].to_numpy() == groups['j'].first().to_numpy())
+        assert np.all(bdf_collapsed.loc[:, 't1'].to_numpy() == groups['t'].min().to_numpy())
+        assert np.all(bdf_collapsed.loc[:, 't2'].to_numpy() == groups['t'].max().to_numpy())
+        assert np.allclose(bdf_collapsed.loc[:, 'w'].to_numpy(), w_sum)
+        assert np.allclose(bdf_collapsed.loc[:, 'y'].to_numpy(), y_mean)
+        assert np.allclose(bdf_collapsed.loc[:, 'v'].to_numpy(), v_std)
+        assert np.all(bdf_collapsed.loc[:, 'x'].to_numpy() == groups['x'].max().to_numpy())
+        assert np.allclose(bdf_collapsed.loc[:, 'z'].to_numpy(), groups['z'].agg(lambda a: a.iloc[-1] - a.iloc[0]).to_numpy())
@@ -66,6 +66,32 @@ def test_collapsed_weights_2():
     assert len(c) < len(b)
     assert np.sum(c.loc[:, 'w'].to_numpy()) == len(b)
 
+def test_recollapse_3():
+    # Test that recollapsing after dropping firms gives the same result as collapsing after dropping firms, and that spells that aren't recollapsed are unchanged.
+    rng = np.random.default_rng(1234)
+    a = bpd.SimBipartite(bpd.sim_params({'n_workers': 1000, 'n_time': 8})).simulate(rng)
+    a.loc[:, 'w'] = rng.uniform(0.5, 2, len(a))
+    # Non-collapsed data
+    b = bpd.BipartiteLong(a.loc[:, ['i', 'j', 'y', 't', 'w']], log=False).clean(bpd.clean_params({'drop_returns': False, 'verbose': False}))
+    b = b.add_column('c', [rng.normal(size=len(b))], how_collapse='max')
+    # Collapsed data
+    c = b.collapse(is_sorted=True)
+    drop_firms = rng.choice(b.unique_ids('j'), size=b.n_firms() // 3, replace=False)
+    b = b.drop_ids('j', drop_firms, is_sorted=True).collapse(is_sorted=True)
+    c_drop = c.drop_ids('j', drop_firms, is_sorted=True)
+
+    assert len(c_drop) < len(c.loc[~c.loc[:, 'j'].isin(drop_firms), :])
+    for col in ['i', 'j', 't1', 't2', 'm']:
+        assert np.all(b.loc[:, col].to_numpy() == c_drop.loc[:, col].to_numpy())
+    for col in ['y', 'w', 'c']:
+        assert np.allclose(b.loc[:, col].to_numpy(), c_drop.loc[:, col].to_numpy())
+
+    # Spells that aren't recollapsed are unchanged
+    c_keep = pd.DataFrame(c.loc[~c.loc[:, 'j'].isin(drop_firms), :]).merge(pd.DataFrame(c_drop), on=['i', 'j', 't1', 't2'], suffixes=('', '_drop'))
+    assert len(c_keep) > 0.9 * len(c_drop)
+    for col in ['y', 'w', 'c']:
+        assert np.all(c_keep.loc[:, col].to_numpy() == c_keep.loc[:, col + '_drop'].to_numpy())
+
 def test_permutedeventstudy_3():
     # Test that permuted event study is computed correctly.
     a = bpd.BipartiteDataFrame(bpd.SimBipartite().simulate(np.random.default_rng(1234))).clean(bpd.clean_params({'drop_returns': 'returns', 'verbose': False})).collapse(is_sorted=True, copy=False)
@@ -83,3 +109,40 @@ def test_permutedeventstudy_3():
     expected_length = len(stayers) + np.sum(movers_length)
 
     assert len(b) == expected_length == len(c)
+
+def test_permutedeventstudy_4():
+    # Test that permuted event study generates each pair of observations for each worker, and that pairs are ordered correctly.
+    a = bpd.BipartiteDataFrame(bpd.SimBipartite().simulate(np.random.default_rng(1234))).clean(bpd.clean_params({'drop_returns': 'returns', 'verbose': False})).collapse(is_sorted=True, copy=False)
+    b = a.to_permutedeventstudy(order='sequential', is_sorted=True, copy=False, rng=np.random.default_rng(12345))
+    c = a.to_permutedeventstudy(order='income', is_sorted=True, copy=False, rng=np.random.default_rng(12345))
+
+    # Expected pairs
+    expected_pairs = set()
+    for i, t1s in a.groupby('i')['t1']:
+        t1s = sorted(t1s.to_numpy())
+        if len(t1s) == 1:
+            expected_pairs.add((i, t1s[0], t1s[0]))
+        for k, t1_a in enumerate(t1s):
+            for t1_b in t1s[k + 1:]:
+                expected_pairs.add((i, t1_a, t1_b))
+
+    # Sequential order
+    assert np.all(b.loc[:, 't11'].to_numpy() <= b.loc[:, 't21'].to_numpy())
+    assert set(zip(b.loc[:, 'i'], b.loc[:, 't11'], b.loc[:, 't21'])) == expected_pairs
+    # Income order
+    t_lo = np.minimum(c.loc[:, 't11'].to_numpy(), c.loc[:, 't21'].to_numpy())
+    t_hi = np.maximum(c.loc[:, 't11'].to_numpy(), c.loc[:, 't21'].to_numpy())
+    assert set(zip(c.loc[:, 'i'], t_lo, t_hi)) == expected_pairs
+    assert np.all(c.loc[:, 'm'].to_numpy() == (c.loc[:, 'j1'].to_numpy() != c.loc[:, 'j2'].to_numpy()))
+
+    # Moves between each pair of firms are split evenly between directions
+    movers = c.loc[c.loc[:, 'm'].to_numpy() == 1, :]
+    j_lo = np.minimum(movers.loc[:, 'j1'].to_numpy(), movers.loc[:, 'j2'].to_numpy())
+    j_hi = np.maximum(movers.loc[:, 'j1'].to_numpy(), movers.loc[:, 'j2'].to_numpy())
+    n_entering = pd.Series(movers.loc[:, 'j1'].to_numpy() == j_hi).groupby([j_lo, j_hi]).agg(['sum', 'size'])
+    assert np.all(np.abs(2 * n_entering.loc[:, 'sum'] - n_entering.loc[:, 'size']) <= 1)
+
+    # Sorted by i and t
+    assert np.all(np.diff(c.loc[:, 'i'].to_numpy()) >= 0)
+    same_i = (np.diff(c.loc[:, 'i'].to_numpy()) == 0)
+    assert np.all(np.diff(c.loc[:, 't11'].to_numpy())[same_i] >= 0)